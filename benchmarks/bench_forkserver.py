@@ -0,0 +1,77 @@
+#
+# (c) 2025 Yoichi Tanibayashi
+#
+# フォークサーバーによる、1回あたりの起動時間を計測する。
+#
+#   $ uv run benchmarks/bench_forkserver.py
+#
+#   - cold       : 毎回 Python を起動して、コマンドツリーを import する
+#   - forkserver : `python -m pyclickutils.forkserver call ...`
+#
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+N = 30
+ARGS = ["sub2", "sub2sub"]
+CLI_SPEC = "pyclickutils.__main__:cli"
+
+COLD_CMD = [
+    sys.executable,
+    "-c",
+    "from pyclickutils.__main__ import cli; cli()",
+]
+
+
+def bench(label, cmdline, number):
+    """Run `cmdline` `number` times and print per-call latency."""
+    start = time.perf_counter()
+    for _ in range(number):
+        subprocess.run(cmdline, check=True, stdout=subprocess.DEVNULL)
+    msec = (time.perf_counter() - start) / number * 1000
+    print(f"{label:10s}: {msec:8.2f} msec/call ({number} calls)")
+    return msec
+
+
+def wait_for_socket(path, timeout=10.0):
+    limit = time.monotonic() + timeout
+    while not os.path.exists(path):
+        if time.monotonic() > limit:
+            raise TimeoutError(path)
+        time.sleep(0.01)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        sock_path = os.path.join(tmpdir, "bench.sock")
+        server = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "pyclickutils.forkserver",
+                "serve",
+                sock_path,
+                CLI_SPEC,
+            ]
+        )
+        try:
+            wait_for_socket(sock_path)
+            client_cmd = [
+                sys.executable,
+                "-m",
+                "pyclickutils.forkserver",
+                "call",
+                sock_path,
+            ]
+            cold = bench("cold", COLD_CMD + ARGS, N)
+            warm = bench("forkserver", client_cmd + ARGS, N)
+            print(f"speedup   : {cold / warm:8.2f} x")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#
+# (c) 2025 Yoichi Tanibayashi
+#
+# `get_logger()` の呼び出しコストを計測する。
+#
+#   $ uv run benchmarks/bench_get_logger.py
+#
+# 変更前の実装 (inspect.stack() + 毎回ハンドラー再生成) を
+# `legacy_get_logger()` として再現し、現在の実装と比較する。
+#
+import inspect
+import timeit
+from logging import DEBUG, INFO, Formatter, StreamHandler, getLogger
+
+from pyclickutils import get_logger
+
+N = 20000
+
+
+def legacy_get_logger(name, debug=False):
+    """Old implementation of `get_logger()`."""
+    filename = inspect.stack()[1].filename.split("/")[-1]
+    name = filename + "." + name
+    logger = getLogger(name)
+    logger.propagate = False
+    if logger.handlers:
+        logger.handlers.clear()
+
+    fmt_hdr = "%(asctime)s %(levelname)s "
+    fmt_loc = "%(name)s.%(funcName)s:%(lineno)d> "
+    handler_fmt = Formatter(
+        fmt_hdr + fmt_loc + "%(message)s", datefmt="%H:%M:%S"
+    )
+    console_handler = StreamHandler()
+    console_handler.setFormatter(handler_fmt)
+    console_handler.setLevel(DEBUG)
+    logger.addHandler(console_handler)
+    logger.setLevel(INFO)
+    if debug:
+        logger.setLevel(DEBUG)
+    return logger
+
+
+class Legacy:
+    def __init__(self, debug=False):
+        self.__log = legacy_get_logger(__class__.__name__, debug)
+
+
+class Current:
+    def __init__(self, debug=False):
+        self.__log = get_logger(__class__.__name__, debug)
+
+
+def bench(label, func, number):
+    """Run `func` `number` times and print per-call cost."""
+    sec = min(timeit.repeat(func, number=number, repeat=3))
+    usec = sec / number * 1e6
+    print(f"{label:10s}: {usec:10.3f} usec/call ({number} calls)")
+    return usec
+
+
+def main():
+    # legacy は非常に遅いので回数を減らす
+    before = bench("before", Legacy, N // 20)
+    after = bench("after", Current, N)
+    print(f"speedup   : {before / after:10.1f} x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#
+# (c) 2025 Yoichi Tanibayashi
+#
+# ログのフォーマット性能 (records/sec) を比較する。
+#
+#   $ uv run benchmarks/bench_log_formatter.py
+#
+#   - text       : `get_logger()` 標準のテキスト形式
+#   - json       : `JsonFormatter` (fmt="json")
+#   - json.dumps : レコードごとに dict を作って `json.dumps()` する素朴な実装
+#
+import json
+import time
+from logging import INFO, Formatter, getLogger
+
+from pyclickutils.logjson import JsonFormatter
+from pyclickutils.mylogger import DATEFMT, FMT_HDR, FMT_LOC, FMT_MSG
+
+N = 100000
+
+
+class NaiveJsonFormatter(Formatter):
+    """Build a dict for each record and call `json.dumps()`."""
+
+    def format(self, record):
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "name": record.name,
+            "func": record.funcName,
+            "line": record.lineno,
+            "msg": record.getMessage(),
+        }
+        data.update({"user": record.__dict__.get("user")})
+        return json.dumps(data, ensure_ascii=False)
+
+
+def make_records(n):
+    log = getLogger("bench")
+    return [
+        log.makeRecord(
+            log.name,
+            INFO,
+            __file__,
+            i,
+            "message %d: %s",
+            (i, "abc"),
+            None,
+            func="main",
+            extra={"user": "alice"},
+        )
+        for i in range(n)
+    ]
+
+
+def bench(label, formatter, records):
+    """Format all records and print records/sec."""
+    fmt = formatter.format
+    start = time.perf_counter()
+    for record in records:
+        fmt(record)
+    sec = time.perf_counter() - start
+    rate = len(records) / sec
+    print(f"{label:12s}: {rate:12,.0f} records/sec")
+    return rate
+
+
+def main():
+    records = make_records(N)
+    text = bench(
+        "text",
+        Formatter(FMT_HDR + FMT_LOC + FMT_MSG, datefmt=DATEFMT),
+        records,
+    )
+    fast = bench("json", JsonFormatter(extra_fields=("user",)), records)
+    bench("json.dumps", NaiveJsonFormatter(), records)
+    print(f"json / text : {fast / text:12.2f}")
+
+
+if __name__ == "__main__":
+    main()
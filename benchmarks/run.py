@@ -0,0 +1,274 @@
+#
+# (c) 2025 Yoichi Tanibayashi
+#
+# ベンチマークスイート
+#
+#   $ uv run benchmarks/run.py                 # 計測して表示
+#   $ uv run benchmarks/run.py --save          # baseline.json に保存
+#   $ uv run benchmarks/run.py --compare       # baseline.json と比較
+#   $ uv run benchmarks/run.py --compare --threshold 10
+#
+# 値はすべて秒 (小さいほど良い)。繰り返して計測した最小値を使う。
+# `--compare` では、ベースラインより threshold [%] 以上遅くなった
+# 項目があれば、終了コード 1 で終了する。
+#
+# ベースラインは計測したマシンに依存するので、比較する前に
+# 同じマシンで `--save` すること。
+#
+import glob
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import timeit
+from contextlib import redirect_stderr
+from importlib.metadata import version
+
+import click
+
+from pyclickutils import click_common_opts, errmsg, get_logger
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+TOP_DIR = os.path.dirname(BENCH_DIR)
+BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+
+DEFAULT_THRESHOLD = 25.0  # [%]
+
+N_COMMANDS = 200  # click_common_opts を適用するコマンド数
+N_SUBCOMMANDS = 300  # --help を表示するグループのサブコマンド数
+REPEAT = 5
+
+
+def best(func, number: int = 1, repeat: int = REPEAT) -> float:
+    """Minimum time [sec] of one call."""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+#
+# 計測項目
+#
+def _importtime(code: str) -> dict[str, int]:
+    """Cumulative import time [us] of the top level modules."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    result = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _label, times = line.split(":", 1)
+        _self, cumulative, name = times.split("|")
+        if not name[1:].startswith(" "):  # 最上位の import のみ
+            result[name.strip()] = int(cumulative)
+    return result
+
+
+def bench_import(code: str) -> float:
+    """Import time [sec] of `code` (without Python's startup imports)."""
+
+    def _once() -> float:
+        startup = _importtime("pass")
+        imported = _importtime(code)
+        us = sum(t for n, t in imported.items() if n not in startup)
+        return us / 1e6
+
+    return min(_once() for _ in range(REPEAT))
+
+
+def bench_common_opts() -> float:
+    """Apply `click_common_opts` to N_COMMANDS commands."""
+
+    def _apply():
+        for i in range(N_COMMANDS):
+
+            @click.command(f"cmd{i}")
+            @click_common_opts("1.0.0")
+            def _cmd(ctx, debug):
+                pass
+
+    return best(_apply)
+
+
+def bench_get_logger() -> float:
+    return best(lambda: get_logger("bench", False), number=10000)
+
+
+def bench_errmsg() -> float:
+    try:
+        raise ValueError("bench")
+    except ValueError as e:
+        exc = e
+    return best(lambda: errmsg(exc), number=10000)
+
+
+def _large_group() -> click.Group:
+    @click.group()
+    @click_common_opts("1.0.0")
+    def cli(ctx, debug):
+        """Large generated group."""
+
+    for i in range(N_SUBCOMMANDS):
+
+        @cli.command(f"cmd{i:03d}", help=f"Subcommand #{i}. " * 3)
+        @click.option("--value", help="some value")
+        @click_common_opts("1.0.0")
+        def _cmd(ctx, value, debug):
+            pass
+
+    return cli
+
+
+def bench_help() -> float:
+    """Render `--help` of a group with N_SUBCOMMANDS commands."""
+    cli = _large_group()
+
+    def _help():
+        ctx = cli.make_context("cli", [], resilient_parsing=True)
+        ctx.get_help()
+
+    return best(_help, number=10)
+
+
+def bench_sample(path: str) -> float:
+    """End-to-end latency of `python samples/xxx.py --help`."""
+    cmdline = [sys.executable, path, "--help"]
+
+    def _run():
+        subprocess.run(cmdline, check=True, stdout=subprocess.DEVNULL)
+
+    return best(_run)
+
+
+def run_all(quick: bool = False) -> dict[str, float]:
+    """Run the benchmarks and return {name: seconds}."""
+    benches = {
+        "import pyclickutils": lambda: bench_import("import pyclickutils"),
+        "import click_common_opts": lambda: bench_import(
+            "from pyclickutils import click_common_opts"
+        ),
+        f"click_common_opts x{N_COMMANDS}": bench_common_opts,
+        "get_logger": bench_get_logger,
+        "errmsg": bench_errmsg,
+        f"--help ({N_SUBCOMMANDS} commands)": bench_help,
+    }
+    if not quick:
+        samples = sorted(
+            glob.glob(os.path.join(TOP_DIR, "samples", "*-*.py"))
+        )
+        for path in samples:
+            name = os.path.basename(path)
+            benches[f"samples/{name} --help"] = lambda p=path: bench_sample(p)
+
+    results = {}
+    for name, func in benches.items():
+        # get_logger などの出力は捨てる
+        with redirect_stderr(io.StringIO()):
+            results[name] = func()
+        print(f"{name:40s} {format_sec(results[name]):>12s}")
+    return results
+
+
+#
+# 保存と比較
+#
+def format_sec(sec: float) -> str:
+    if sec >= 1e-3:
+        return f"{sec * 1e3:.2f} ms"
+    return f"{sec * 1e6:.2f} us"
+
+
+def compare(
+    baseline: dict[str, float],
+    current: dict[str, float],
+    threshold: float = DEFAULT_THRESHOLD,
+) -> list[str]:
+    """Return the names of the metrics regressed more than threshold [%]."""
+    regressed = []
+    for name, cur in current.items():
+        base = baseline.get(name)
+        if not base:
+            print(f"{name:40s} {format_sec(cur):>12s}  (new)")
+            continue
+
+        change = (cur - base) / base * 100
+        mark = ""
+        if change > threshold:
+            regressed.append(name)
+            mark = "  ** REGRESSION **"
+        print(
+            f"{name:40s} {format_sec(base):>12s} -> {format_sec(cur):>12s}"
+            f" {change:+7.1f}%{mark}"
+        )
+
+    # スイートから消えた (または `--quick` で省いた) 項目
+    for name, base in baseline.items():
+        if name not in current:
+            print(f"{name:40s} {format_sec(base):>12s}  (missing)")
+    return regressed
+
+
+def load_baseline(path: str) -> dict[str, float]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def save_baseline(path: str, results: dict[str, float]) -> None:
+    data = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "click": version("click"),
+        "platform": platform.platform(),
+        "results": {k: round(v, 9) for k, v in results.items()},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+
+
+@click.command()
+@click.option("--save", is_flag=True, help="save results as the baseline")
+@click.option("--compare", "do_compare", is_flag=True, help="compare")
+@click.option(
+    "--baseline",
+    "baseline_path",
+    type=click.Path(dir_okay=False),
+    default=BASELINE,
+    show_default=True,
+    help="baseline file",
+)
+@click.option(
+    "--threshold",
+    type=float,
+    default=DEFAULT_THRESHOLD,
+    show_default=True,
+    help="allowed slowdown [%]",
+)
+@click.option("--quick", is_flag=True, help="skip samples/*.py")
+@click_common_opts("1.0.0")
+def main(ctx, save, do_compare, baseline_path, threshold, quick, debug):
+    """Run the benchmark suite."""
+    __log = get_logger(__name__, debug)
+
+    results = run_all(quick)
+
+    if do_compare:
+        print(f"\n# compare with {baseline_path} (threshold {threshold}%)")
+        regressed = compare(load_baseline(baseline_path), results, threshold)
+        if regressed:
+            print(f"\n{len(regressed)} regression(s): {regressed}")
+            ctx.exit(1)
+
+    if save:
+        save_baseline(baseline_path, results)
+        __log.debug("saved: %s", baseline_path)
+        print(f"\nsaved: {baseline_path}")
+
+
+if __name__ == "__main__":
+    main()
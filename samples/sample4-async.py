@@ -1,10 +1,9 @@
 #
 # 非同期のサンプル
 #
-# **重要**
-#  - ``click``は、非同期対応してない。
-#  - ``asyncclickは``、バグがあり、使い物にならない。
-#  - **回避策**: 通常の main から、asyncio.run で async_main を呼び出す。
+# `async def` のコールバックに、そのまま `@click_common_opts()` を付ける。
+#  - イベントループは、グループとサブコマンドで共有される。
+#  - `async_workers` で、デフォルトの executor のスレッド数を制限できる。
 #
 #
 #  func1()
@@ -45,34 +44,25 @@ async def func3():
     print("    func3 done.")
 
 
-async def async_main(ctx, debug):
+@click.command()
+@click_common_opts("4.0.0", async_workers=4)
+async def main(ctx, debug):
     """async main."""
     if debug:
-        print(f"[DEBUG] async_main> command.name = '{ctx.command.name}'")
-        print("[DEBUG] async_main> call async functions ..")
+        print(f"[DEBUG] main> command.name = '{ctx.command.name}'")
+
+    print("main> call async functions ..")
     await asyncio.gather(
         func1(),
         func2(),
         func3()
     )
-    if debug:
-        print("[DEBUG] async_main> all done.")
-    return "done"
-
-
-@click.command()
-@click_common_opts("4.0.0")
-def main(ctx, debug):
-    """normal main.
-
-       asyncio.run(async_main())
-    """
-    print("main> call async_main()")
-
-    result = asyncio.run(async_main(ctx, debug))  # 重要！
 
-    print(f"main> result from async_main(): {result}")
+    # ブロッキングする処理は、デフォルトの executor で実行する
+    loop = asyncio.get_running_loop()
+    result = await loop.run_in_executor(None, lambda: "done")
 
+    print(f"main> result: {result}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,33 @@
+#
+# サブコマンドを必要になった時に import するサンプル。
+#
+# `LazyGroup` に、サブコマンド名と "module:attr" を登録する。
+# `--help` では、登録した short help を表示するので、
+# サブコマンドのモジュール (sample5_subcmds.py) は import されない。
+#
+# e.g.   ``... sample5-lazy.py hello -d``
+#
+import sys
+
+import click
+
+from pyclickutils import LazyGroup, click_common_opts
+
+
+@click.group(
+    cls=LazyGroup,
+    lazy_subcommands={
+        "hello": ("sample5_subcmds:hello", "Say hello."),
+        "bye": ("sample5_subcmds:bye", "Say good-bye."),
+    },
+)
+@click_common_opts("5.0.0")
+def main(ctx, debug):
+    if debug:
+        print(f"[DEBUG] command.name = '{ctx.command.name}'")
+        loaded = "sample5_subcmds" in sys.modules
+        print(f"[DEBUG] sample5_subcmds is loaded: {loaded}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+#
+# `sample5-lazy.py` のサブコマンド。
+#
+# `sample5-lazy.py` から、必要になった時に import される。
+#
+import click
+
+from pyclickutils import click_common_opts
+
+
+@click.command()
+@click_common_opts("5.1.0")
+def hello(ctx, debug):
+    """Say hello."""
+    if debug:
+        print(f"[DEBUG] command.name =   '{ctx.command.name}'")
+
+    print("Hello, lazy world")
+
+
+@click.command()
+@click_common_opts("5.2.0")
+def bye(ctx, debug):
+    """Say good-bye."""
+    if debug:
+        print(f"[DEBUG] command.name =   '{ctx.command.name}'")
+
+    print("Good-bye, lazy world")
@@ -1,20 +1,105 @@
 #
 # (c) 2025 Yoichi Tanibayashi
 #
-from importlib.metadata import version as get_version
+# 起動を速くするため、サブモジュールは属性に初めてアクセスした時に
+# import する (`__getattr__`)。`__version__` も同様に、
+# アクセスされた時に一度だけ求める。
+#
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from .batch import run_batch
+    from .chunkio import ChunkedFile, ChunkReader
+    from .completion import completion_main
+    from .erragg import ErrorAggregator, error_aggregator
+    from .fanout import fan_out
+    from .flightrec import dump_flight_recorders
+    from .helpcache import cached_help
+    from .lazygroup import LazyGroup
+    from .logqueue import (
+        disable_queue_logging,
+        enable_queue_logging,
+        init_worker_logging,
+        worker_log_queue,
+    )
+    from .metrics import command_metrics
+    from .mylogger import errmsg, get_logger
+    from .plugins import discover_plugins
+    from .pyclickutils import click_common_opts
+
+    __version__: str
+
+# 属性名 -> サブモジュール
+_LAZY_ATTRS = {
+    "ChunkReader": ".chunkio",
+    "ChunkedFile": ".chunkio",
+    "ErrorAggregator": ".erragg",
+    "LazyGroup": ".lazygroup",
+    "cached_help": ".helpcache",
+    "click_common_opts": ".pyclickutils",
+    "command_metrics": ".metrics",
+    "completion_main": ".completion",
+    "disable_queue_logging": ".logqueue",
+    "discover_plugins": ".plugins",
+    "dump_flight_recorders": ".flightrec",
+    "error_aggregator": ".erragg",
+    "enable_queue_logging": ".logqueue",
+    "errmsg": ".mylogger",
+    "fan_out": ".fanout",
+    "get_logger": ".mylogger",
+    "init_worker_logging": ".logqueue",
+    "run_batch": ".batch",
+    "worker_log_queue": ".logqueue",
+}
+
+
+def _get_version() -> str:
+    if not __package__:
+        return "?.?.?"
+
+    from importlib.metadata import version as get_version
+
+    return get_version(__package__)
+
+
+def __getattr__(name: str):
+    if name == "__version__":
+        value = _get_version()
+    elif name in _LAZY_ATTRS:
+        import importlib
+
+        module = importlib.import_module(_LAZY_ATTRS[name], __name__)
+        value = getattr(module, name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    # 次回からは `__getattr__` を経由しない
+    globals()[name] = value
+    return value
 
-from .mylogger import errmsg, get_logger
-from .pyclickutils import click_common_opts
 
-if __package__:
-    __version__ = get_version(__package__)
-else:
-    __version__ = "?.?.?"
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
 
 
 __all__ = [
     "__version__",
+    "ChunkReader",
+    "ChunkedFile",
+    "ErrorAggregator",
+    "LazyGroup",
+    "cached_help",
     "click_common_opts",
+    "command_metrics",
+    "completion_main",
+    "disable_queue_logging",
+    "discover_plugins",
+    "dump_flight_recorders",
+    "error_aggregator",
+    "enable_queue_logging",
     "errmsg",
+    "fan_out",
     "get_logger",
+    "init_worker_logging",
+    "run_batch",
+    "worker_log_queue",
 ]
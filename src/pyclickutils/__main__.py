@@ -3,11 +3,14 @@
 #
 import click
 
-from . import __version__, click_common_opts, get_logger
+from . import cached_help, click_common_opts, get_logger
+
+# バージョンは `--version` の時に初めて調べる
+DIST = "pyclickutils"
 
 
 @click.group(invoke_without_command=True)
-@click_common_opts(__version__)
+@click_common_opts(dist=DIST)
 def cli(ctx, debug):
     """CLI top."""
 
@@ -20,11 +23,11 @@ def cli(ctx, debug):
     if ctx.invoked_subcommand:
         __log.debug("subcommand = %a", ctx.invoked_subcommand)
     else:
-        click.echo(ctx.get_help())
+        click.echo(cached_help(ctx))
 
 
 @cli.command()
-@click_common_opts(__version__)
+@click_common_opts(dist=DIST)
 def sub1(ctx, debug):
     """Subcommand #1."""
     __log = get_logger(__name__, debug)
@@ -34,7 +37,7 @@ def sub1(ctx, debug):
 
 
 @cli.group(invoke_without_command=True)
-@click_common_opts(__version__)
+@click_common_opts(dist=DIST)
 def sub2(ctx, debug):
     """Subcommand #2.(command group)"""
 
@@ -46,11 +49,11 @@ def sub2(ctx, debug):
     if ctx.invoked_subcommand:
         __log.debug("subcommand = %a", ctx.invoked_subcommand)
     else:
-        click.echo(ctx.get_help())
+        click.echo(cached_help(ctx))
 
 
 @sub2.command()
-@click_common_opts(__version__)
+@click_common_opts(dist=DIST)
 def sub2sub(ctx, debug):
     """Subcommand of `sub2`."""
     __log = get_logger(__name__, debug)
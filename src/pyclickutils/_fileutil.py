@@ -0,0 +1,49 @@
+#
+# (c) 2025 Yoichi Tanibayashi
+#
+"""File helpers shared by the submodules."""
+
+import contextlib
+import os
+import tempfile
+
+
+def atomic_write_text(path: str, text: str) -> None:
+    """Write `text` to `path` atomically (write a temporary file, rename).
+
+    読み込む側からは、古い内容か新しい内容のどちらかしか見えない。
+    """
+    dirname = os.path.dirname(path) or "."
+    fd, tmp = tempfile.mkstemp(
+        dir=dirname, prefix="." + os.path.basename(path) + "."
+    )
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp)
+        raise
+
+
+@contextlib.contextmanager
+def locked(path: str):
+    """Hold an exclusive lock on `path` + ".lock" (between processes)."""
+    import fcntl
+
+    with open(path + ".lock", "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def user_cache_dir(*names: str) -> str:
+    """`$XDG_CACHE_HOME/pyclickutils/...` (default: `~/.cache`)."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "pyclickutils", *names)
@@ -0,0 +1,110 @@
+#
+# (c) 2025 Yoichi Tanibayashi
+#
+"""
+Batch mode: run many command lines in one interpreter.
+
+ファイルまたは標準入力から、1行に1コマンドラインを読み込み、
+同じプロセスの中でコマンドツリーに渡す。
+各行は新しい `click.Context` で実行され、結果は1行ごとに
+JSON lines で出力される。
+
+  {"line": 1, "args": ["sub1"], "returncode": 0,
+   "stdout": "...", "stderr": "", "elapsed": 0.0012}
+
+空行と `#` で始まる行は無視する。
+
+Usage:
+
+  # `click_common_opts(use_batch=True)` の場合
+  $ mytool --batch commands.txt
+  $ cat commands.txt | mytool --batch -
+
+  # 任意の click コマンド
+  $ python -m pyclickutils.batch pyclickutils.__main__:cli commands.txt
+
+  # Python から
+  code = run_batch(cli, open("commands.txt"))
+"""
+
+import json
+import shlex
+import sys
+import time
+from typing import Any, Iterable, TextIO
+
+from .fanout import capture_main
+
+
+def run_batch(
+    cli,
+    lines: Iterable[str],
+    out: TextIO | None = None,
+    prog_name: str | None = None,
+) -> int:
+    """Run each line and report the results. Return 1 if any failed."""
+    stream = sys.stdout if out is None else out
+
+    failed = False
+    for lineno, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+
+        result: dict[str, Any]
+        start = time.perf_counter()
+        try:
+            argv = shlex.split(line)
+        except ValueError as e:
+            result = {
+                "line": lineno,
+                "args": None,
+                "returncode": 2,
+                "stdout": "",
+                "stderr": f"{e}\n",
+            }
+        else:
+            proc = capture_main(cli, argv, prog_name)
+            result = {
+                "line": lineno,
+                "args": argv,
+                "returncode": proc.returncode,
+                "stdout": proc.stdout,
+                "stderr": proc.stderr,
+            }
+        result["elapsed"] = round(time.perf_counter() - start, 6)
+
+        failed = failed or result["returncode"] != 0
+        stream.write(json.dumps(result, ensure_ascii=False) + "\n")
+        stream.flush()
+
+    return 1 if failed else 0
+
+
+def batch_callback(ctx, _param, value) -> None:
+    """Callback of the `--batch` option."""
+    if value is None or ctx.resilient_parsing:
+        return
+    ctx.exit(run_batch(ctx.command, value, prog_name=ctx.info_name))
+
+
+def main(argv: list[str] | None = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2:
+        print(
+            "Usage: python -m pyclickutils.batch MODULE:ATTR FILE",
+            file=sys.stderr,
+        )
+        return 2
+
+    from .lazygroup import import_command
+
+    cli = import_command(argv[0])
+    if argv[1] == "-":
+        return run_batch(cli, sys.stdin)
+    with open(argv[1], encoding="utf-8") as f:
+        return run_batch(cli, f)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,351 @@
+#
+# (c) 2025 Yoichi Tanibayashi
+#
+"""
+Precomputed shell-completion index.
+
+click のシェル補完は、TAB を押すたびにプログラム全体を import して、
+コマンドツリーを作る。ここでは、コマンドツリーから、
+コマンドパス、オプション (`-V/-d/-h` を含む)、選択肢を集めた
+インデックス (JSON) を作っておき、補完はインデックスだけで答える。
+
+インデックスは `$XDG_CACHE_HOME/pyclickutils/completion/PROG.json`
+に保存する。パッケージ (ディストリビューション) のバージョンが
+変わると、次の補完の時に、コマンドを import して作り直す。
+
+Usage:
+
+  # mytool/_entry.py (ここでは mytool.cli を import しない)
+  from pyclickutils.completion import completion_main
+
+  main = completion_main("mytool.cli:cli", dist="mytool")
+
+  # pyproject.toml
+  [project.scripts]
+  mytool = "mytool._entry:main"
+
+  # 補完の設定は click と同じ
+  $ eval "$(_MYTOOL_COMPLETE=bash_source mytool)"
+
+  # インデックスを (作り直して) 保存する
+  $ python -m pyclickutils.completion mytool.cli:cli mytool
+"""
+
+import json
+import os
+import sys
+
+import click
+
+from ._fileutil import atomic_write_text, user_cache_dir
+
+INDEX_FORMAT = 1
+
+
+def index_path(prog_name: str) -> str:
+    return os.path.join(user_cache_dir("completion"), f"{prog_name}.json")
+
+
+def _default_dist(import_path: str) -> str:
+    """Top level package name of "module:attr"."""
+    return import_path.split(":")[0].split(".")[0]
+
+
+def _dist_version(dist: str) -> str | None:
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        return version(dist)
+    except PackageNotFoundError:
+        return None
+
+
+#
+# インデックスの作成
+#
+def _value_type(param: click.Parameter) -> dict:
+    """Completion of the value: choices or file/dir."""
+    ptype = param.type
+    if isinstance(ptype, click.Choice):
+        return {
+            "choices": [str(c) for c in ptype.choices],
+            "case_sensitive": ptype.case_sensitive,
+        }
+    if isinstance(ptype, click.Path) and not ptype.file_okay:
+        return {"type": "dir"}
+    if isinstance(ptype, (click.Path, click.File)):
+        return {"type": "file"}
+    return {}
+
+
+def _command_node(ctx: click.Context) -> dict:
+    cmd = ctx.command
+    node: dict = {"options": [], "arguments": []}
+    for param in cmd.get_params(ctx):
+        if isinstance(param, click.Option):
+            if param.hidden:
+                continue
+            # `--opt[=VALUE]` (`flag_value`) の値は、"=" の後だけ
+            optional = getattr(param, "_flag_needs_value", False)
+            takes_value = not (param.is_flag or param.count or optional)
+            node["options"].append(
+                {
+                    "name": param.name,
+                    "opts": [*param.opts, *param.secondary_opts],
+                    "nargs": param.nargs if takes_value else 0,
+                    "multiple": param.multiple or param.count,
+                    "help": param.help or "",
+                    **_value_type(param),
+                }
+            )
+        elif isinstance(param, click.Argument):
+            node["arguments"].append(
+                {"nargs": param.nargs, **_value_type(param)}
+            )
+
+    if isinstance(cmd, click.Group):
+        commands = {}
+        for name in cmd.list_commands(ctx):
+            sub = cmd.get_command(ctx, name)
+            if sub is None or sub.hidden:
+                continue
+            sub_ctx = click.Context(sub, info_name=name, parent=ctx)
+            commands[name] = {
+                "help": sub.get_short_help_str(),
+                **_command_node(sub_ctx),
+            }
+        node["commands"] = commands
+    return node
+
+
+def build_index(
+    cli: click.Command, prog_name: str, version: str | None = None
+) -> dict:
+    """Build the completion index of the command tree `cli`."""
+    ctx = click.Context(cli, info_name=prog_name, resilient_parsing=True)
+    return {
+        "format": INDEX_FORMAT,
+        "prog_name": prog_name,
+        "version": version,
+        "command": _command_node(ctx),
+    }
+
+
+def save_index(index: dict, path: str | None = None) -> str:
+    path = path or index_path(index["prog_name"])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    atomic_write_text(path, json.dumps(index))
+    return path
+
+
+def load_index(prog_name: str) -> dict | None:
+    try:
+        with open(index_path(prog_name), encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if index.get("format") != INDEX_FORMAT:
+        return None
+    return index
+
+
+#
+# 補完
+#
+def _find_option(node: dict, name: str) -> dict | None:
+    for opt in node["options"]:
+        if name in opt["opts"]:
+            return opt
+    return None
+
+
+def _complete_value(spec: dict, incomplete: str) -> list:
+    from click.shell_completion import (  # type: ignore[import-not-found]
+        CompletionItem,
+    )
+
+    if "choices" in spec:
+        if spec["case_sensitive"]:
+            return [
+                CompletionItem(c)
+                for c in spec["choices"]
+                if c.startswith(incomplete)
+            ]
+        return [
+            CompletionItem(c)
+            for c in spec["choices"]
+            if c.lower().startswith(incomplete.lower())
+        ]
+    if "type" in spec:
+        # ファイル名の補完は、シェルに任せる
+        return [CompletionItem(incomplete, type=spec["type"])]
+    return []
+
+
+def complete(index: dict, args: list[str], incomplete: str) -> list:
+    """Completion items (`click.shell_completion.CompletionItem`)."""
+    from click.shell_completion import (  # type: ignore[import-not-found]
+        CompletionItem,
+    )
+
+    node = index["command"]
+    used: set[str] = set()
+    n_args = 0  # 位置引数の数
+    pending: dict | None = None  # 値を待っているオプション
+    remaining = 0
+    only_args = False  # "--" の後
+
+    for arg in args:
+        if pending is not None:
+            remaining -= 1
+            if remaining <= 0:
+                pending = None
+            continue
+
+        if arg == "--" and not only_args:
+            only_args = True
+            continue
+
+        if arg.startswith("-") and len(arg) > 1 and not only_args:
+            name, eq, _ = arg.partition("=")
+            opt = _find_option(node, name)
+            if opt is not None:
+                used.add(opt["name"])
+                if opt["nargs"] and not eq:
+                    pending, remaining = opt, opt["nargs"]
+            continue
+
+        sub = node.get("commands", {}).get(arg)
+        if sub is not None and n_args == 0:
+            node, used, only_args = sub, set(), False
+            continue
+        n_args += 1
+
+    if (
+        pending is None
+        and "=" in incomplete
+        and incomplete.startswith("-")
+        and not only_args
+    ):
+        name, _, incomplete = incomplete.partition("=")
+        opt = _find_option(node, name)
+        if opt is None or not opt["nargs"]:
+            return []
+        pending = opt
+
+    if pending is not None:
+        return _complete_value(pending, incomplete)
+
+    if incomplete.startswith("-") and not only_args:
+        return [
+            CompletionItem(name, help=opt["help"])
+            for opt in node["options"]
+            if opt["multiple"] or opt["name"] not in used
+            for name in opt["opts"]
+            if name.startswith(incomplete)
+        ]
+
+    if "commands" in node:
+        return [
+            CompletionItem(name, help=sub["help"])
+            for name, sub in node["commands"].items()
+            if name.startswith(incomplete)
+        ]
+
+    # 位置引数: nargs=-1 は残りをすべて受け取る
+    pos = 0
+    for spec in node["arguments"]:
+        if spec["nargs"] < 0 or n_args < pos + spec["nargs"]:
+            return _complete_value(spec, incomplete)
+        pos += spec["nargs"]
+    return []
+
+
+#
+# エントリーポイント
+#
+def _answer(
+    import_path: str,
+    prog_name: str,
+    complete_var: str,
+    shell: str,
+    dist: str,
+) -> bool:
+    """Print the completion from the index. False if not supported."""
+    from click.shell_completion import (  # type: ignore[import-not-found]
+        get_completion_class,
+    )
+
+    comp_cls = get_completion_class(shell)
+    if comp_cls is None:
+        return False
+
+    version = _dist_version(dist)
+    index = load_index(prog_name)
+    if index is None or version is None or index["version"] != version:
+        # バージョンが変わった (または不明): import して作り直す
+        from .lazygroup import import_command
+
+        index = build_index(import_command(import_path), prog_name, version)
+        try:
+            save_index(index)
+        except OSError:
+            pass  # 保存できなくても、補完はする
+
+    comp = comp_cls(click.Command(prog_name), {}, prog_name, complete_var)
+    args, incomplete = comp.get_completion_args()
+    items = complete(index, args, incomplete)
+    click.echo("\n".join(comp.format_completion(i) for i in items))
+    return True
+
+
+def completion_main(
+    import_path: str, dist: str | None = None, prog_name: str | None = None
+):
+    """Entry point that answers shell completion without importing.
+
+    `import_path` ("module:attr") のコマンドは、補完以外の場合と、
+    インデックスを作り直す場合だけ import する。
+    `dist` はバージョンを調べるディストリビューション名
+    (デフォルトは `import_path` の最上位のパッケージ名)。
+    """
+    dist = dist or _default_dist(import_path)
+
+    def _main():
+        name = prog_name or os.path.basename(sys.argv[0])
+        complete_var = f"_{name}_COMPLETE".replace("-", "_").upper()
+        shell, _, action = os.environ.get(complete_var, "").partition("_")
+        if action == "complete" and _answer(
+            import_path, name, complete_var, shell, dist
+        ):
+            sys.exit(0)
+
+        from .lazygroup import import_command
+
+        return import_command(import_path)(prog_name=name)
+
+    return _main
+
+
+def main(argv: list[str] | None = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) not in (2, 3):
+        print(
+            "Usage: python -m pyclickutils.completion"
+            " MODULE:ATTR PROG_NAME [DIST]",
+            file=sys.stderr,
+        )
+        return 2
+
+    from .lazygroup import import_command
+
+    import_path, prog_name = argv[:2]
+    dist = argv[2] if len(argv) == 3 else _default_dist(import_path)
+    version = _dist_version(dist)
+    index = build_index(import_command(import_path), prog_name, version)
+    print(save_index(index))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
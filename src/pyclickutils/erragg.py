@@ -0,0 +1,170 @@
+#
+# (c) 2025 Yoichi Tanibayashi
+#
+"""
+Exception aggregation and fingerprinting.
+
+同じ例外を何千回も整形して出力する代わりに、例外の型と
+raise された場所 (ファイル, 関数, 行) で分類して数える。
+traceback は、分類ごとに最初の一つだけ整形して保持する。
+
+Usage:
+
+  agg = ErrorAggregator()
+  for row in rows:
+      with agg.catch():
+          process(row)
+  agg.report()
+
+  # click のコマンドでは、終了時に自動的に出力する
+  @cli.command()
+  @click_common_opts(VERSION)
+  def load(ctx, debug):
+      agg = error_aggregator(ctx)
+      for row in rows:
+          with agg.catch():
+              process(row)
+
+出力 (stderr):
+
+  errors: 12034 in 2 kinds
+    12000 x ValueError: bad row 17  (loader.py:42 in parse)
+       34 x mymod.DbError: timeout  (db.py:10 in query)
+
+メッセージは、それぞれの最初の例外のもの (`errmsg()` の形式)。
+"""
+
+import contextlib
+import sys
+import threading
+import traceback
+
+import click
+
+from .mylogger import errmsg
+
+# 分類の数の上限。超えた分は、数だけ数える。
+MAX_FINGERPRINTS = 256
+
+# ルートのコンテキストの `meta` に保存する、実行中の集計
+ERRORS_KEY = "pyclickutils.errors"
+
+
+class _Entry:
+    __slots__ = ("count", "message", "site", "traceback")
+
+    def __init__(self, exc: BaseException, site: tuple):
+        self.count = 0
+        self.message = errmsg(exc)
+        self.site = site
+        self.traceback = "".join(traceback.format_exception(exc))
+
+
+def fingerprint(exc: BaseException) -> tuple:
+    """(type, file, function, line) of the raise site."""
+    exc_type = type(exc)
+    name = f"{exc_type.__module__}.{exc_type.__qualname__}"
+    tb = exc.__traceback__
+    if tb is None:
+        return (name, None, None, None)
+    while tb.tb_next is not None:
+        tb = tb.tb_next
+    code = tb.tb_frame.f_code
+    return (name, code.co_filename, code.co_name, tb.tb_lineno)
+
+
+class ErrorAggregator:
+    """Count exceptions by fingerprint with a bounded table."""
+
+    def __init__(self, max_fingerprints: int = MAX_FINGERPRINTS):
+        self.max_fingerprints = max_fingerprints
+        self.entries: dict[tuple, _Entry] = {}
+        self.total = 0
+        self.untracked = 0  # 上限を超えた分類の例外の数
+        # スレッド (asyncio.to_thread など) からも呼ばれる
+        self._lock = threading.Lock()
+
+    def _count(self, key: tuple) -> bool:
+        """Count an existing or untracked fingerprint (with lock)."""
+        entry = self.entries.get(key)
+        if entry is not None:
+            entry.count += 1
+            return True
+        if len(self.entries) >= self.max_fingerprints:
+            self.untracked += 1
+            return True
+        return False
+
+    def add(self, exc: BaseException) -> bool:
+        """Count `exc`. Return True if its fingerprint is new."""
+        key = fingerprint(exc)
+        with self._lock:
+            self.total += 1
+            if self._count(key):
+                return False
+
+        # 整形 (traceback) は時間がかかるので、ロックの外で行う
+        entry = _Entry(exc, key[1:])
+        entry.count = 1
+        with self._lock:
+            # その間に、他のスレッドが追加した場合
+            if self._count(key):
+                return False
+            self.entries[key] = entry
+        return True
+
+    @contextlib.contextmanager
+    def catch(self, *exc_types: type[BaseException]):
+        """Count and suppress exceptions (default: `Exception`)."""
+        try:
+            yield self
+        except exc_types or (Exception,) as e:
+            self.add(e)
+
+    def summary(self) -> list[str]:
+        """Compact summary lines (most frequent first)."""
+        with self._lock:
+            total = self.total
+            untracked = self.untracked
+            entries = list(self.entries.values())
+        if not total:
+            return []
+
+        entries.sort(key=lambda e: -e.count)
+        width = len(str(entries[0].count)) if entries else 1
+        lines = [f"errors: {total} in {len(entries)} kinds"]
+        for entry in entries:
+            filename, func, lineno = entry.site
+            where = ""
+            if filename is not None:
+                where = f"  ({filename.split('/')[-1]}:{lineno} in {func})"
+            lines.append(f"  {entry.count:>{width}} x {entry.message}{where}")
+        if untracked:
+            lines.append(f"  {untracked} x (other kinds, table is full)")
+        return lines
+
+    def tracebacks(self) -> list[str]:
+        """One full traceback per fingerprint."""
+        with self._lock:
+            entries = list(self.entries.values())
+        return [entry.traceback for entry in entries]
+
+    def report(self, file=None, tracebacks: bool = False) -> None:
+        """Print the summary (and the tracebacks) to `file` (stderr)."""
+        file = file or sys.stderr
+        if tracebacks:
+            for text in self.tracebacks():
+                print(text, file=file)
+        for line in self.summary():
+            print(line, file=file)
+
+
+def error_aggregator(ctx: click.Context) -> ErrorAggregator:
+    """Get the aggregator of the invocation (reported at exit)."""
+    root = ctx.find_root()
+    agg = root.meta.get(ERRORS_KEY)
+    if agg is None:
+        agg = ErrorAggregator()
+        root.meta[ERRORS_KEY] = agg
+        root.call_on_close(agg.report)
+    return agg
@@ -0,0 +1,154 @@
+#
+# (c) 2025 Yoichi Tanibayashi
+#
+"""
+Run several subcommands of a group concurrently in one interpreter.
+
+Usage:
+
+  results = fan_out(cli, [["sub1"], ["sub2", "sub2sub"]])
+  for r in results:
+      print(r.args, r.returncode, r.stdout, r.stderr)
+
+  # プロセスプールで実行する場合
+  results = fan_out(cli, argv_list, mode="process", max_workers=4)
+
+結果は、argv のリストと同じ順番の `subprocess.CompletedProcess`。
+stdout, stderr は、サブコマンドごとに別々に取り込む。
+
+mode="process" で `cli` にコマンドオブジェクトを渡す場合は、
+fork で起動したプロセスを使う。spawn などを使う場合は、
+`cli` に "module:attr" を指定すること。
+"""
+
+import io
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from subprocess import CompletedProcess
+
+from .lazygroup import import_command
+from .pyclickutils import run_main
+
+MODES = ("thread", "process")
+
+
+class _ThreadLocalStream:
+    """Dispatch to the capturing stream of the current thread."""
+
+    def __init__(self, default):
+        self._default = default
+        self._local = threading.local()
+
+    def _target(self):
+        return getattr(self._local, "stream", None) or self._default
+
+    def write(self, s):
+        return self._target().write(s)
+
+    def flush(self):
+        return self._target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self._target(), name)
+
+
+_install_lock = threading.Lock()
+_install_count = 0
+_stdout: _ThreadLocalStream | None = None
+_stderr: _ThreadLocalStream | None = None
+
+
+def _install() -> None:
+    """Replace sys.stdout/sys.stderr with thread local streams."""
+    global _install_count, _stdout, _stderr
+
+    with _install_lock:
+        if _install_count == 0:
+            _stdout = _ThreadLocalStream(sys.stdout)
+            _stderr = _ThreadLocalStream(sys.stderr)
+            sys.stdout = _stdout  # type: ignore[assignment]
+            sys.stderr = _stderr  # type: ignore[assignment]
+        _install_count += 1
+
+
+def _uninstall() -> None:
+    global _install_count, _stdout, _stderr
+
+    with _install_lock:
+        _install_count -= 1
+        if _install_count == 0 and _stdout and _stderr:
+            sys.stdout = _stdout._default
+            sys.stderr = _stderr._default
+            _stdout = _stderr = None
+
+
+def capture_main(
+    cli, argv: list[str], prog_name: str | None = None
+) -> CompletedProcess:
+    """Run the command, capturing stdout and stderr of this thread."""
+    _install()
+    assert _stdout is not None and _stderr is not None
+    out, err = io.StringIO(), io.StringIO()
+    _stdout._local.stream = out
+    _stderr._local.stream = err
+    try:
+        code = run_main(cli, argv, prog_name)
+    finally:
+        _stdout._local.stream = None
+        _stderr._local.stream = None
+        _uninstall()
+    return CompletedProcess(argv, code, out.getvalue(), err.getvalue())
+
+
+# fork したプロセスに引き継ぐコマンド
+_fork_cli = None
+
+
+def _run_in_process(
+    spec: str | None, argv: list[str], prog_name: str | None
+) -> CompletedProcess:
+    cli = _fork_cli if spec is None else import_command(spec)
+    return capture_main(cli, argv, prog_name)
+
+
+def fan_out(
+    cli,
+    argv_list: list[list[str]],
+    mode: str = "thread",
+    max_workers: int | None = None,
+    prog_name: str | None = None,
+) -> list[CompletedProcess]:
+    """Run subcommands of `cli` concurrently and collect the results."""
+    global _fork_cli
+
+    if mode not in MODES:
+        raise ValueError(f"invalid mode: {mode!r}")
+
+    if mode == "thread":
+        if isinstance(cli, str):
+            cli = import_command(cli)
+        with ThreadPoolExecutor(max_workers) as pool:
+            futures = [
+                pool.submit(capture_main, cli, list(argv), prog_name)
+                for argv in argv_list
+            ]
+            return [f.result() for f in futures]
+
+    mp_context = None
+    spec = cli if isinstance(cli, str) else None
+    if spec is None:
+        import multiprocessing
+
+        mp_context = multiprocessing.get_context("fork")
+        _fork_cli = cli
+
+    try:
+        with ProcessPoolExecutor(max_workers, mp_context=mp_context) as pool:
+            futures = [
+                pool.submit(_run_in_process, spec, list(argv), prog_name)
+                for argv in argv_list
+            ]
+            return [f.result() for f in futures]
+    finally:
+        _fork_cli = None
@@ -0,0 +1,173 @@
+#
+# (c) 2025 Yoichi Tanibayashi
+#
+"""
+Crash flight recorder for `get_logger()`.
+
+Usage:
+
+  # debug=False でも、DEBUG のレコードを直近 1000 件だけ保持する
+  log = get_logger(__name__, debug, flight_recorder=1000)
+  log.debug("state=%s", state)   # 出力せず、リングバッファに保存するだけ
+
+以下の場合に、保持しているレコードをフォーマットして stderr に出力する。
+
+- 捕捉されない例外 (`sys.excepthook`, `threading.excepthook`)
+- シグナル SIGTERM, SIGHUP (出力した後、元のハンドラーで処理する)
+- シグナル SIGUSR1 (出力して、実行を続ける)
+- `dump_flight_recorders()` の呼び出し
+
+レコードはフォーマットせずに保存するので、通常の実行のコストは、
+レコードの作成とリングバッファへの追加だけ。
+ただし、引数のオブジェクトは参照を保持するので、後で変更されると、
+出力される内容も変わる。
+"""
+
+import os
+import signal
+import sys
+import threading
+import weakref
+from collections import deque
+from logging import DEBUG, Formatter, Handler, LogRecord
+
+DEFAULT_CAPACITY = 1000
+
+HEADER = "---- flight recorder: %s (last %d records) ----"
+FOOTER = "---- end of flight recorder ----"
+
+# (シグナル, 出力した後も実行を続けるか)
+DUMP_SIGNALS = (("SIGTERM", False), ("SIGHUP", False), ("SIGUSR1", True))
+
+_recorders: "weakref.WeakSet[FlightRecorder]" = weakref.WeakSet()
+_hooks_installed = False  # sys.excepthook, threading.excepthook
+_signals_installed = False  # メインスレッドでしか設定できない
+_prev_handlers: dict[int, object] = {}
+
+
+class FlightRecorder(Handler):
+    """Keep all records in a ring buffer, forward some to `target`.
+
+    Args:
+        capacity: 保持するレコードの数
+        target: 通常の出力先のハンドラー
+        output_level: `target` に渡すレコードのレベル
+        formatter: 出力する時のフォーマッター
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        target: Handler,
+        output_level: int,
+        formatter: Formatter,
+    ):
+        if capacity < 1:
+            raise ValueError("invalid `capacity` value: %s" % (capacity))
+        super().__init__(DEBUG)
+        self.buffer: deque[LogRecord] = deque(maxlen=capacity)
+        self.target = target
+        self.output_level = output_level
+        self.setFormatter(formatter)
+        _recorders.add(self)
+        _install_hooks()
+
+    def handle(self, record: LogRecord):
+        # ロックを取らずに、フォーマットもせずに保存するだけ
+        self.buffer.append(record)
+        if record.levelno >= self.output_level:
+            self.target.handle(record)
+        return True
+
+    def emit(self, record: LogRecord):
+        self.handle(record)
+
+    def dump(self, reason: str, file=None) -> None:
+        """Format and write the buffered records, then clear them."""
+        records = list(self.buffer)
+        self.buffer.clear()
+        if not records:
+            return
+
+        file = file or sys.stderr
+        lines = [HEADER % (reason, len(records))]
+        for record in records:
+            try:
+                lines.append(self.format(record))
+            except Exception as e:
+                lines.append(f"(format error: {e!r}: {record.msg!r})")
+        lines.append(FOOTER)
+        try:
+            file.write("\n".join(lines) + "\n")
+            file.flush()
+        except (OSError, ValueError):
+            pass  # 出力先が閉じられている
+
+
+def dump_flight_recorders(reason: str = "requested", file=None) -> None:
+    """Dump all flight recorders."""
+    for recorder in list(_recorders):
+        recorder.dump(reason, file)
+
+
+#
+# フック
+#
+def _excepthook(exc_type, exc, tb):
+    dump_flight_recorders(f"uncaught {exc_type.__name__}")
+    _prev_excepthook(exc_type, exc, tb)
+
+
+def _thread_excepthook(args):
+    if args.exc_type is not SystemExit:
+        name = args.thread.name if args.thread else "?"
+        dump_flight_recorders(
+            f"uncaught {args.exc_type.__name__} in thread {name}"
+        )
+    _prev_thread_excepthook(args)
+
+
+def _signal_handler(signum, frame):
+    name = signal.Signals(signum).name
+    dump_flight_recorders(f"signal {name}")
+
+    prev = _prev_handlers.get(signum)
+    if callable(prev):
+        prev(signum, frame)
+    elif dict(DUMP_SIGNALS).get(name) is False:
+        # デフォルトの動作 (終了) に戻して、もう一度受け取る
+        signal.signal(signum, signal.SIG_DFL)
+        os.kill(os.getpid(), signum)
+
+
+def _install_hooks() -> None:
+    global _hooks_installed, _signals_installed
+    global _prev_excepthook, _prev_thread_excepthook
+
+    if not _hooks_installed:
+        _hooks_installed = True
+        _prev_excepthook = sys.excepthook
+        sys.excepthook = _excepthook
+        _prev_thread_excepthook = threading.excepthook
+        threading.excepthook = _thread_excepthook
+
+    if _signals_installed:
+        return
+    if threading.current_thread() is not threading.main_thread():
+        # シグナルハンドラーは、メインスレッドでしか設定できない。
+        # 次にメインスレッドでレコーダーを作る時に設定する
+        return
+    _signals_installed = True
+    for name, _resume in DUMP_SIGNALS:
+        signum = getattr(signal, name, None)
+        if signum is None:
+            continue  # Windows など
+        prev = signal.getsignal(signum)
+        if prev is signal.SIG_IGN:
+            continue  # 無視する設定は変えない
+        _prev_handlers[signum] = prev
+        signal.signal(signum, _signal_handler)
+
+
+_prev_excepthook = sys.excepthook
+_prev_thread_excepthook = threading.excepthook
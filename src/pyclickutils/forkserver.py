@@ -0,0 +1,248 @@
+#
+# (c) 2025 Yoichi Tanibayashi
+#
+"""
+Pre-forked server mode.
+
+コマンドツリーを import 済みの常駐サーバーが、リクエストごとに
+ワーカーを fork して、コマンドを実行する。
+クライアントは argv, 環境変数, cwd, 標準入出力 (ファイルディスクリプター)
+を UNIX ドメインソケットで送り、ワーカーの終了コードを返す。
+
+Usage:
+
+  # サーバー (既存のエントリーポイント)
+  $ python -m pyclickutils.forkserver serve /tmp/pcu.sock \\
+        pyclickutils.__main__:cli --prog-name pyclickutils &
+
+  # クライアント
+  $ python -m pyclickutils.forkserver call /tmp/pcu.sock sub2 sub2sub
+
+  # 自作の CLI
+  serve(cli, "/tmp/mytool.sock", prog_name="mytool")
+
+クライアントは click などを import しないので、すぐに起動する。
+"""
+
+import array
+import marshal
+import os
+import signal
+import socket
+import struct
+import sys
+import traceback
+
+USAGE = """\
+Usage:
+  python -m pyclickutils.forkserver serve SOCKET MODULE:ATTR \\
+                                    [--prog-name NAME]
+  python -m pyclickutils.forkserver call SOCKET [ARGS]...
+"""
+
+# クライアントが転送するシグナル
+FORWARD_SIGNALS = (signal.SIGINT, signal.SIGTERM, signal.SIGHUP)
+
+_HDR = struct.Struct("!I")
+_INT = struct.Struct("!i")
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < size:
+        data = sock.recv(size - len(buf))
+        if not data:
+            raise ConnectionError("connection closed")
+        buf += data
+    return bytes(buf)
+
+
+#
+# client
+#
+def call(path: str, argv: list[str]) -> int:
+    """Run a command on the server and return its exit code."""
+    # marshal は組み込みなので、import のコストがかからない
+    header = marshal.dumps(
+        {"argv": argv, "env": dict(os.environ), "cwd": os.getcwd()}
+    )
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+
+        # 長さと一緒に、標準入出力のファイルディスクリプターを送る
+        fds = array.array("i", [0, 1, 2])
+        sock.sendmsg(
+            [_HDR.pack(len(header))],
+            [(socket.SOL_SOCKET, socket.SCM_RIGHTS, fds)],
+        )
+        sock.sendall(header)
+
+        (pid,) = _INT.unpack(_recv_exact(sock, _INT.size))
+
+        # Ctrl-C などは、ワーカーに転送する
+        def _forward(signum, _frame):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+        prev = {sig: signal.signal(sig, _forward) for sig in FORWARD_SIGNALS}
+        try:
+            (code,) = _INT.unpack(_recv_exact(sock, _INT.size))
+        except ConnectionError:
+            code = 1
+        finally:
+            for sig, handler in prev.items():
+                signal.signal(sig, handler)
+
+    return code
+
+
+#
+# server
+#
+def _recv_request(conn: socket.socket) -> tuple[dict, list[int]]:
+    fds = array.array("i")
+    msg, ancdata, _flags, _addr = conn.recvmsg(
+        _HDR.size, socket.CMSG_SPACE(3 * fds.itemsize)
+    )
+    for level, kind, data in ancdata:
+        if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+            fds.frombytes(data[: len(data) - (len(data) % fds.itemsize)])
+
+    if len(msg) < _HDR.size:
+        msg += _recv_exact(conn, _HDR.size - len(msg))
+    (size,) = _HDR.unpack(msg)
+    header = marshal.loads(_recv_exact(conn, size))
+    return header, list(fds)
+
+
+def _setup_stdio(fds: list[int]) -> None:
+    """Replace stdin/stdout/stderr with the client's."""
+    for i, fd in enumerate(fds[:3]):
+        os.dup2(fd, i)
+        os.close(fd)
+
+    sys.stdin = open(0, "r", closefd=False)
+    sys.stdout = open(
+        1, "w", buffering=1 if os.isatty(1) else -1, closefd=False
+    )
+    sys.stderr = open(
+        2, "w", buffering=1, errors="backslashreplace", closefd=False
+    )
+
+
+def _run_worker(conn: socket.socket, cli, prog_name: str | None) -> int:
+    """Body of the forked worker."""
+    import atexit
+
+    from .pyclickutils import run_main
+
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    header, fds = _recv_request(conn)
+    _setup_stdio(fds)
+    os.chdir(header["cwd"])
+    os.environ.clear()
+    os.environ.update(header["env"])
+
+    conn.sendall(_INT.pack(os.getpid()))
+    sys.argv = [prog_name or cli.name or ""] + header["argv"]
+    code = run_main(cli, header["argv"], prog_name)
+
+    # 通常の終了と同様に、atexit の処理を行ってから終了コードを返す。
+    # ワーカーは os._exit() で終了するので、atexit に登録された処理
+    # (キューモードのログの出力、抑制したログのまとめ、メトリクスの
+    # 保存、ユーザーの処理) は実行されない。それらを実行する公開の
+    # API はないので、private な `_run_exitfuncs()` を使う
+    # (例外は、それ自身が stderr に出力する)。
+    atexit._run_exitfuncs()
+    for stream in (sys.stdout, sys.stderr):
+        try:
+            stream.flush()
+        except (OSError, ValueError):
+            pass
+
+    conn.sendall(_INT.pack(code))
+    return code
+
+
+def serve(cli, path: str, prog_name: str | None = None) -> None:
+    """Serve `cli` on the UNIX domain socket `path`."""
+    if os.path.exists(path):
+        os.unlink(path)
+
+    server_pid = os.getpid()
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # 作成した時点から、他のユーザーが接続できないようにする
+    old_umask = os.umask(0o177)
+    try:
+        sock.bind(path)
+    finally:
+        os.umask(old_umask)
+    sock.listen(128)
+
+    # 終了したワーカーは、自動的に回収させる
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda *_a: sys.exit(0))
+
+    try:
+        while True:
+            conn, _addr = sock.accept()
+            if os.fork() == 0:
+                # worker
+                code = 1
+                try:
+                    sock.close()
+                    code = _run_worker(conn, cli, prog_name)
+                except BaseException:
+                    # os._exit() の前に、原因を (クライアントの) stderr に出す
+                    traceback.print_exc()
+                    try:
+                        sys.stderr.flush()
+                    except (OSError, ValueError):
+                        pass
+                finally:
+                    os._exit(code & 0xFF)
+            conn.close()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if os.getpid() == server_pid:
+            sock.close()
+            if os.path.exists(path):
+                os.unlink(path)
+
+
+def main(argv: list[str] | None = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+
+    if len(argv) >= 2 and argv[0] == "call":
+        try:
+            return call(argv[1], argv[2:])
+        except OSError as e:
+            print(f"forkserver: {argv[1]}: {e}", file=sys.stderr)
+            return 1
+
+    if len(argv) in (3, 5) and argv[0] == "serve":
+        prog_name = None
+        if len(argv) == 5:
+            if argv[3] != "--prog-name":
+                print(USAGE, end="", file=sys.stderr)
+                return 2
+            prog_name = argv[4]
+
+        from .lazygroup import import_command
+
+        serve(import_command(argv[2]), argv[1], prog_name)
+        return 0
+
+    print(USAGE, end="", file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+#
+# (c) 2025 Yoichi Tanibayashi
+#
+"""
+Cached help rendering.
+
+`click_common_opts` の `--help` と `cached_help(ctx)` は、
+描画したヘルプをキャッシュする。キーは、
+コマンドパス、端末の幅、登録済みのサブコマンド。
+
+- メモリー: コマンドオブジェクトごとに保持する (同じプロセスの中)
+- ディスク: `click_common_opts(help_cache=True)` の場合
+  (`$XDG_CACHE_HOME/pyclickutils/help/`)。プロセスをまたいで使う。
+  キーには、`click_common_opts` に渡したバージョンと、コマンドと
+  ヘルプに表示するサブコマンドを定義したファイル (パスと mtime) も
+  含める。`LazyGroup` の未ロードのサブコマンドは、登録された
+  import パスと short help を含める。
+
+バージョンを変えたり、スクリプトを編集したりすると、キーが変わるので、
+古いキャッシュは使われない。
+メモリーだけの場合は、バージョンやファイルを調べない。
+"""
+
+import hashlib
+import inspect
+import os
+import shutil
+
+import click
+
+from ._fileutil import atomic_write_text, user_cache_dir
+
+# コマンドオブジェクトに保存する、メモリーのキャッシュ
+_ATTR = "_pyclickutils_help"
+
+
+def _key(ctx: click.Context) -> tuple:
+    # 後から登録されたサブコマンド (LazyGroup のロードなど) も反映する
+    commands = getattr(ctx.command, "commands", None)
+    return (
+        ctx.command_path,
+        ctx.terminal_width,
+        ctx.max_content_width,
+        shutil.get_terminal_size().columns,
+        tuple(sorted(commands)) if commands is not None else None,
+    )
+
+
+def _source_file(command: click.Command) -> str | None:
+    """File that defines the callback of the command."""
+    callback = command.callback
+    if callback is None:
+        return None
+    code = getattr(inspect.unwrap(callback), "__code__", None)
+    return code.co_filename if code is not None else None
+
+
+def _sources(commands) -> tuple:
+    """((file, mtime), ...) of the files that define the commands."""
+    files = {f for f in map(_source_file, commands) if f is not None}
+    sources = []
+    for filename in sorted(files):
+        try:
+            mtime = os.stat(filename).st_mtime_ns
+        except OSError:
+            mtime = None
+        sources.append((filename, mtime))
+    return tuple(sources)
+
+
+def _disk_path(ctx: click.Context, key: tuple) -> str:
+    from .pyclickutils import command_version
+
+    # バージョンとファイルは、プロセスの中では変わらないので、
+    # ディスクの場合だけ使う
+    root = ctx.find_root()
+    commands = getattr(ctx.command, "commands", {})
+    lazy = getattr(ctx.command, "lazy_subcommands", {})
+    key += (
+        command_version(ctx.command),
+        command_version(root.command),
+        # ヘルプに表示するサブコマンドの定義も含める
+        _sources([ctx.command, root.command, *commands.values()]),
+        tuple(sorted(lazy.items())),
+    )
+    digest = hashlib.sha1(repr(key).encode()).hexdigest()
+    return os.path.join(user_cache_dir("help"), f"{digest}.txt")
+
+
+def cached_help(ctx: click.Context, disk: bool = False) -> str:
+    """`ctx.get_help()` with cache."""
+    key = _key(ctx)
+    memory = ctx.command.__dict__.setdefault(_ATTR, {})
+    if key in memory:
+        return memory[key]
+
+    text = None
+    path = _disk_path(ctx, key) if disk else None
+    if path:
+        try:
+            with open(path, encoding="utf-8") as f:
+                text = f.read()
+        except OSError:
+            pass
+
+    if text is None:
+        text = ctx.get_help()
+        if path:
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                atomic_write_text(path, text)
+            except OSError:
+                pass  # キャッシュできなくても、ヘルプは表示する
+
+    memory[key] = text
+    return text
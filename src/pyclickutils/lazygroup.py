@@ -0,0 +1,130 @@
+#
+# (c) 2025 Yoichi Tanibayashi
+#
+"""
+Usage:
+
+  @click.group(
+      cls=LazyGroup,
+      lazy_subcommands={
+          # name: "module:attr"  または  ("module:attr", "short help")
+          "sub1": ("mytool.sub1:sub1", "Subcommand #1."),
+          "sub2": "mytool.sub2:sub2",
+      },
+  )
+  @click_common_opts(VERSION)
+  def cli(ctx, debug):
+      ...
+
+サブコマンドは、そのコマンドが実行されるか、そのヘルプが表示される
+時に初めて import される。グループの `--help` では、マッピングに
+登録された short help を表示するので、サブコマンドを import しない。
+
+`plugin_group` を指定すると、その entry point のグループに登録された
+サブコマンドも追加する (`pyclickutils.plugins` 参照)。
+同じ名前のサブコマンドがある場合は、グループ側が優先される。
+"""
+
+import importlib
+from gettext import gettext as _
+
+import click
+
+
+def import_command(import_path: str) -> click.Command:
+    """Import a command from "module:attr"."""
+    module_name, sep, attr = import_path.partition(":")
+    if not sep or not module_name or not attr:
+        raise ValueError(f"invalid import path: {import_path!r}")
+
+    obj = importlib.import_module(module_name)
+    for name in attr.split("."):
+        obj = getattr(obj, name)
+
+    if not isinstance(obj, click.Command):
+        raise TypeError(f"{import_path!r} is not a click command")
+    return obj
+
+
+class LazyGroup(click.Group):
+    """Command group that imports subcommands on demand."""
+
+    def __init__(
+        self, *args, lazy_subcommands=None, plugin_group=None, **kwargs
+    ):
+        super().__init__(*args, **kwargs)
+        self.plugin_group: str | None = plugin_group
+        self._plugins_loaded = False
+
+        # name -> (import path, short help)
+        self.lazy_subcommands: dict[str, tuple[str, str]] = {}
+        for name, spec in (lazy_subcommands or {}).items():
+            if isinstance(spec, str):
+                self.add_lazy_command(name, spec)
+            else:
+                self.add_lazy_command(name, *spec)
+
+    def add_lazy_command(
+        self, name: str, import_path: str, short_help: str = ""
+    ) -> None:
+        """Register a subcommand to be imported on demand."""
+        self.lazy_subcommands[name] = (import_path, short_help)
+
+    def _load_plugins(self) -> None:
+        """Register the plugin commands (once)."""
+        if self.plugin_group is None or self._plugins_loaded:
+            return
+        self._plugins_loaded = True
+
+        from .plugins import discover_plugins
+
+        for name, path in discover_plugins(self.plugin_group).items():
+            if (
+                name not in self.commands
+                and name not in self.lazy_subcommands
+            ):
+                self.add_lazy_command(name, path)
+
+    def list_commands(self, ctx: click.Context) -> list[str]:
+        self._load_plugins()
+        return sorted({*super().list_commands(ctx), *self.lazy_subcommands})
+
+    def get_command(
+        self, ctx: click.Context, cmd_name: str
+    ) -> click.Command | None:
+        if (
+            cmd_name not in self.commands
+            and cmd_name not in self.lazy_subcommands
+        ):
+            # 組み込みのサブコマンドでは、プラグインを調べない
+            self._load_plugins()
+        lazy = self.lazy_subcommands.get(cmd_name)
+        if lazy is not None and cmd_name not in self.commands:
+            self.add_command(import_command(lazy[0]), cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+    def format_commands(
+        self, ctx: click.Context, formatter: click.HelpFormatter
+    ) -> None:
+        # 未ロードのサブコマンドは import せず、登録された short help を使う
+        names = [
+            name
+            for name in self.list_commands(ctx)
+            if name not in self.commands or not self.commands[name].hidden
+        ]
+        if not names:
+            return
+
+        # allow for 3 times the default spacing
+        limit = (formatter.width or 80) - 6 - max(len(n) for n in names)
+
+        rows = []
+        for name in names:
+            cmd = self.commands.get(name)
+            if cmd is None:
+                # 短縮の仕方を click に合わせるため、仮のコマンドを使う
+                cmd = click.Command(name, help=self.lazy_subcommands[name][1])
+            rows.append((name, cmd.get_short_help_str(limit)))
+
+        with formatter.section(_("Commands")):
+            formatter.write_dl(rows)
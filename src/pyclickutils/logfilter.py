@@ -0,0 +1,195 @@
+#
+# (c) 2025 Yoichi Tanibayashi
+#
+"""
+Rate-limited and sampled logging for `get_logger()`.
+
+Usage:
+
+  # 呼び出し元 (ファイル, 行) とフォーマット文字列が同じメッセージを、
+  # 1秒に 5 件まで (トークンバケット) にする
+  log = get_logger(__name__, debug, rate_limit=5)
+
+  # 100 件に 1 件だけ出力する
+  log = get_logger(__name__, debug, sample=100)
+
+  for rec in records:
+      log.debug("rec=%s", rec)
+
+抑制したメッセージの数は、一定間隔 (SUMMARY_INTERVAL 秒) ごとと、
+プログラムの終了時に、以下のようにまとめて出力する。
+
+  12:34:56 DEBUG main.py.__main__.main:12> suppressed 12345 similar
+  messages: 'rec=%s'
+
+(レベルと呼び出し元は、抑制したメッセージと同じ)
+
+フィルターはロガーに付けるので、レベルで捨てられるメッセージ
+(`debug=False` の時の `log.debug()` など) のコストは変わらない。
+"""
+
+import atexit
+import threading
+import time
+import weakref
+from logging import Filter, LogRecord, getLogger
+
+SUMMARY_INTERVAL = 10.0  # [sec]
+SUMMARY_MSG = "suppressed %d similar messages: %r"
+
+# 呼び出し元の数の上限 (フォーマット文字列に f-string を使われた場合など)
+# 超えると、最近使われていない半分を、まとめを出力して捨てる
+MAX_SITES = 1024
+
+# まとめのレコードに付ける属性 (フィルターを素通りさせる)
+_SUMMARY_ATTR = "pyclickutils_flood_summary"
+
+# 終了時に、残りのまとめを出力する
+_filters: "weakref.WeakSet[FloodFilter]" = weakref.WeakSet()
+
+
+class _Site:
+    """State of one call site."""
+
+    __slots__ = ("tokens", "last", "used", "count", "suppressed", "record")
+
+    def __init__(self, tokens: float, now: float, record: LogRecord):
+        self.tokens = tokens
+        self.last = now
+        self.used = now  # 最後に使われた時刻
+        self.count = 0
+        self.suppressed = 0
+        # まとめを出力するための情報
+        self.record = (
+            record.name,
+            record.levelno,
+            record.pathname,
+            record.lineno,
+            record.funcName,
+            record.msg,
+        )
+
+
+class FloodFilter(Filter):
+    """Drop repeated messages by token bucket and/or 1-in-N sampling.
+
+    Args:
+        rate: 呼び出し元ごとに、1秒あたりに出力するメッセージ数
+        burst: バケットの大きさ (デフォルト: max(1, rate))
+        sample: N 件に 1 件だけ出力する
+        interval: 抑制した数を出力する間隔 [sec]
+    """
+
+    def __init__(
+        self,
+        rate: float | None = None,
+        burst: float | None = None,
+        sample: int | None = None,
+        interval: float = SUMMARY_INTERVAL,
+    ):
+        if rate is None and sample is None:
+            raise ValueError("`rate` or `sample` is required")
+        if rate is not None and rate <= 0:
+            raise ValueError("invalid `rate` value: %s" % (rate))
+        if sample is not None and sample < 1:
+            raise ValueError("invalid `sample` value: %s" % (sample))
+        super().__init__()
+
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate or 1.0)
+        self.sample = sample
+        self.interval = interval
+
+        self._lock = threading.Lock()
+        self._sites: dict[tuple, _Site] = {}
+        self._pending = 0  # まだ出力していない、抑制した数
+        self._last_summary = time.monotonic()
+        _filters.add(self)
+
+    def _allow(self, site: _Site, now: float) -> bool:
+        if self.sample is not None:
+            site.count += 1
+            if (site.count - 1) % self.sample:
+                return False
+
+        if self.rate is not None:
+            site.tokens = min(
+                self.burst, site.tokens + (now - site.last) * self.rate
+            )
+            site.last = now
+            if site.tokens < 1:
+                return False
+            site.tokens -= 1
+        return True
+
+    def filter(self, record: LogRecord) -> bool:
+        if getattr(record, _SUMMARY_ATTR, False):
+            return True
+
+        msg = record.msg if isinstance(record.msg, str) else repr(record.msg)
+        key = (record.pathname, record.lineno, msg)
+        now = time.monotonic()
+        evicted: list = []
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None:
+                if len(self._sites) >= MAX_SITES:
+                    evicted = self._evict()
+                site = _Site(self.burst, now, record)
+                self._sites[key] = site
+            site.used = now
+
+            allowed = self._allow(site, now)
+            if not allowed:
+                site.suppressed += 1
+                self._pending += 1
+            due = self._pending and now - self._last_summary >= self.interval
+
+        if evicted:
+            self._emit(evicted)
+        if due:
+            self.flush()
+        return allowed
+
+    def _evict(self) -> list:
+        """Drop the least recently used half of the sites (with lock).
+
+        捨てる呼び出し元のまとめ (抑制した数) を返す。
+        """
+        sites = sorted(self._sites.items(), key=lambda item: item[1].used)
+        n = max(1, len(sites) // 2)
+        summaries = []
+        for key, site in sites[:n]:
+            del self._sites[key]
+            if site.suppressed:
+                summaries.append((site.record, site.suppressed))
+                self._pending -= site.suppressed
+        return summaries
+
+    def flush(self) -> None:
+        """Log the summary of the suppressed messages."""
+        with self._lock:
+            summaries = []
+            for site in self._sites.values():
+                if site.suppressed:
+                    summaries.append((site.record, site.suppressed))
+                    site.suppressed = 0
+            self._pending = 0
+            self._last_summary = time.monotonic()
+        self._emit(summaries)
+
+    @staticmethod
+    def _emit(summaries: list) -> None:
+        for (name, level, path, lineno, func, msg), n in summaries:
+            logger = getLogger(name)
+            record = logger.makeRecord(
+                name, level, path, lineno, SUMMARY_MSG, (n, msg), None, func
+            )
+            setattr(record, _SUMMARY_ATTR, True)
+            logger.handle(record)
+
+
+@atexit.register
+def _flush_all() -> None:
+    for f in list(_filters):
+        f.flush()
@@ -0,0 +1,108 @@
+#
+# (c) 2025 Yoichi Tanibayashi
+#
+"""
+JSON lines formatter for `get_logger()`.
+
+Usage:
+
+  log = get_logger(__name__, debug, fmt="json", extra_fields=("user",))
+  log.info("login", extra={"user": "alice"})
+
+  => {"time":"2025-09-30T12:34:56.789+0900","level":"INFO",
+      "name":"main.py.__main__","func":"main","line":12,
+      "msg":"login","user":"alice"}
+
+出力するフィールドは、フォーマッター作成時に一度だけ決める。
+レコードごとに dict を作って `json.dumps()` することはしない。
+"""
+
+import json
+import math
+import time
+from logging import Formatter, LogRecord
+
+DEFAULT_FIELDS = ("time", "level", "name", "func", "line", "msg")
+
+# C 実装があれば、それを使う (非 ASCII 文字はエスケープしない)
+_encode_str = json.encoder.encode_basestring  # type: ignore[attr-defined]
+
+
+def _encode_value(value) -> str:
+    """Encode a value of an extra field."""
+    if type(value) is str:
+        return _encode_str(value)
+    if type(value) is int:
+        return repr(value)
+    if type(value) is float:
+        # nan, inf は JSON の数値ではないので、文字列にする
+        return repr(value) if math.isfinite(value) else f'"{value!r}"'
+    try:
+        return json.dumps(
+            value, ensure_ascii=False, default=str, allow_nan=False
+        )
+    except ValueError:
+        return _encode_str(str(value))  # nan, inf を含むリストなど
+
+
+class JsonFormatter(Formatter):
+    """Format records as JSON lines."""
+
+    def __init__(
+        self,
+        fields: tuple[str, ...] = DEFAULT_FIELDS,
+        extra_fields: tuple[str, ...] = (),
+    ):
+        super().__init__()
+
+        # (出力する `"key":`, 値を JSON 文字列にする関数) のリスト
+        getters = {
+            "time": self._time,
+            "level": lambda r: _encode_str(r.levelname),
+            "name": lambda r: _encode_str(r.name),
+            "func": lambda r: _encode_str(r.funcName),
+            "file": lambda r: _encode_str(r.filename),
+            "line": lambda r: str(r.lineno),
+            "process": lambda r: str(r.process),
+            "thread": lambda r: _encode_str(r.threadName),
+            "msg": lambda r: _encode_str(r.getMessage()),
+        }
+        for name in fields:
+            if name not in getters:
+                raise ValueError(f"unknown field: {name!r}")
+        self._fields = [(_encode_str(n) + ":", getters[n]) for n in fields]
+        self._extra_fields = [(n, _encode_str(n) + ":") for n in extra_fields]
+
+        # 時刻文字列のキャッシュ (秒単位)
+        self._last_sec = -1
+        self._last_time = ("", "")
+
+    def _time(self, record: LogRecord) -> str:
+        sec = int(record.created)
+        if sec != self._last_sec:
+            t = time.localtime(sec)
+            self._last_time = (
+                time.strftime("%Y-%m-%dT%H:%M:%S", t),
+                time.strftime("%z", t),
+            )
+            self._last_sec = sec
+        base, tz = self._last_time
+        return f'"{base}.{int(record.msecs):03d}{tz}"'
+
+    def format(self, record: LogRecord) -> str:
+        parts = [key + get(record) for key, get in self._fields]
+
+        values = record.__dict__
+        for name, key in self._extra_fields:
+            if name in values:
+                parts.append(key + _encode_value(values[name]))
+
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            parts.append('"exc":' + _encode_str(record.exc_text))
+        if record.stack_info:
+            parts.append('"stack":' + _encode_str(record.stack_info))
+
+        return "{" + ",".join(parts) + "}"
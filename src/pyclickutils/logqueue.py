@@ -0,0 +1,294 @@
+#
+# (c) 2025 Yoichi Tanibayashi
+#
+"""
+Non-blocking, queue-based logging for `get_logger()`.
+
+Usage:
+
+  enable_queue_logging()
+
+  log = get_logger(__name__, debug)
+  log.debug("....")   # キューに積むだけで、すぐに戻る
+
+  # ワーカープロセスのログも親プロセスでまとめて出力する。
+  # fork の場合は自動。spawn の場合は initializer で設定する。
+  q = worker_log_queue(mp_context)
+  with ProcessPoolExecutor(
+      mp_context=mp_context,
+      initializer=init_worker_logging, initargs=(q,)
+  ) as pool:
+      ...
+
+終了時 (atexit) には、キューに残ったレコードをすべて出力する。
+"""
+
+import atexit
+import os
+import queue
+import threading
+from logging import Handler, LogRecord
+from logging.handlers import QueueHandler
+
+from . import mylogger
+
+BATCH_SIZE = 256
+
+_listener: "_QueueListener | None" = None
+_atexit_registered = False
+
+
+class _EnqueueHandler(Handler):
+    """Put records on the listener queue without formatting them."""
+
+    def __init__(self, q: queue.SimpleQueue, target: Handler):
+        super().__init__(target.level)
+        self.queue = q
+        self.target = target
+
+    def handle(self, record: LogRecord):
+        # ロックを取らずに、キューに積むだけ
+        rv = self.filter(record)
+        if rv:
+            self.queue.put((self.target, record))
+        return rv
+
+    def emit(self, record: LogRecord):
+        self.queue.put((self.target, record))
+
+
+class _WorkerHandler(QueueHandler):
+    """Send records of a worker process to the parent's listener."""
+
+    def __init__(self, q, target: Handler):
+        super().__init__(q)
+        self.setLevel(target.level)
+        self.target = target
+        # 親プロセスで、同じフォーマットのハンドラーを選ぶためのキー
+        self.key = mylogger._pool_key(target)
+
+    def enqueue(self, record: LogRecord):
+        self.queue.put_nowait((self.key, record))
+
+
+def _unwrap(handler: Handler) -> Handler:
+    if isinstance(handler, (_EnqueueHandler, _WorkerHandler)):
+        return handler.target
+    return handler
+
+
+def _swap_handlers(wrap) -> None:
+    """Re-wrap handlers of all loggers made by `get_logger()`."""
+    for logger in set(mylogger._loggers.values()):
+        recorder = mylogger._recorders.get(logger.name)
+        for i, handler in enumerate(logger.handlers):
+            if recorder is not None and handler is recorder:
+                # フライトレコーダーは、出力先だけを差し替える
+                target = _unwrap(recorder.target)
+                recorder.target = wrap(target) if wrap else target
+                continue
+            handler = _unwrap(handler)
+            logger.handlers[i] = wrap(handler) if wrap else handler
+
+
+class _QueueListener:
+    """Drain the queue in a background thread and write in batches."""
+
+    def __init__(self, batch_size: int = BATCH_SIZE):
+        self.batch_size = batch_size
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._mp_queue = None
+        self._wrapped: dict[Handler, Handler] = {}
+        self._relay: threading.Thread | None = None
+
+        self._thread = threading.Thread(
+            target=self._run, name="pyclickutils-log", daemon=True
+        )
+        self._thread.start()
+
+    def wrap(self, handler: Handler) -> Handler:
+        # プールのハンドラーごとに、ラッパーも共有する
+        wrapped = self._wrapped.get(handler)
+        if wrapped is None:
+            wrapped = _EnqueueHandler(self.queue, handler)
+            self._wrapped[handler] = wrapped
+        return wrapped
+
+    def worker_queue(self, mp_context=None):
+        """Queue for worker processes (created on first use)."""
+        if self._mp_queue is None:
+            if mp_context is None:
+                import multiprocessing
+
+                mp_context = multiprocessing.get_context()
+
+            self._mp_queue = mp_context.Queue()
+            self._relay = threading.Thread(
+                target=self._run_relay,
+                args=(self._mp_queue,),
+                name="pyclickutils-log-relay",
+                daemon=True,
+            )
+            self._relay.start()
+        return self._mp_queue
+
+    def _run_relay(self, mp_queue):
+        while True:
+            item = mp_queue.get()
+            if item is None:
+                break
+            key, record = item
+            self.queue.put((mylogger._pooled_handler(key), record))
+
+    def _run(self):
+        q = self.queue
+        while True:
+            batch = [q.get()]
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(q.get_nowait())
+            except queue.Empty:
+                pass
+
+            if not self._write(batch):
+                break
+
+    def _write(self, batch: list) -> bool:
+        """Format and write a batch. Return False on the stop sentinel."""
+        running = True
+        stream = None
+        lines: list[str] = []
+
+        for item in batch:
+            if item is None:
+                running = False
+                continue
+
+            target, record = item
+            try:
+                msg = target.format(record) + target.terminator
+            except Exception:
+                target.handleError(record)
+                continue
+
+            # 出力先が変わったら、それまでの分を書き出す
+            if target.stream is not stream:
+                self._flush(stream, lines)
+                stream = target.stream
+                lines = []
+            lines.append(msg)
+
+        self._flush(stream, lines)
+        return running
+
+    @staticmethod
+    def _flush(stream, lines: list[str]) -> None:
+        if stream is None or not lines:
+            return
+        try:
+            stream.write("".join(lines))
+            stream.flush()
+        except (OSError, ValueError):
+            pass
+
+    def stop(self) -> None:
+        """Stop threads after draining all queued records."""
+        if self._mp_queue is not None:
+            self._mp_queue.put(None)
+            if self._relay is not None:
+                self._relay.join()
+            self._mp_queue.close()
+            self._mp_queue.join_thread()
+
+        self.queue.put(None)
+        self._thread.join()
+
+
+def enable_queue_logging(batch_size: int = BATCH_SIZE) -> None:
+    """Make loggers of `get_logger()` write through the queue."""
+    global _listener, _atexit_registered
+
+    if _listener is not None:
+        return
+
+    _listener = _QueueListener(batch_size)
+    mylogger._queue_listener = _listener
+    _swap_handlers(_listener.wrap)
+
+    if not _atexit_registered:
+        atexit.register(disable_queue_logging)
+        _atexit_registered = True
+
+
+def disable_queue_logging() -> None:
+    """Flush the queue and go back to direct output."""
+    global _listener
+
+    if _listener is None:
+        return
+
+    listener = _listener
+    _listener = None
+    mylogger._queue_listener = None
+    _swap_handlers(None)
+    listener.stop()
+
+
+def worker_log_queue(mp_context=None):
+    """Queue to pass to `init_worker_logging()` of worker processes.
+
+    ワーカーの start method が既定と異なる場合は、
+    `mp_context` に同じコンテキストを指定すること。
+    """
+    enable_queue_logging()
+    assert _listener is not None
+    return _listener.worker_queue(mp_context)
+
+
+class _WorkerSender:
+    """`mylogger._queue_listener` in a worker process."""
+
+    def __init__(self, q):
+        self.queue = q
+        self._wrapped: dict[Handler, Handler] = {}
+
+    def wrap(self, handler: Handler) -> Handler:
+        wrapped = self._wrapped.get(handler)
+        if wrapped is None:
+            wrapped = _WorkerHandler(self.queue, handler)
+            self._wrapped[handler] = wrapped
+        return wrapped
+
+
+def init_worker_logging(q) -> None:
+    """Send records of this (worker) process to the parent's listener.
+
+    `ProcessPoolExecutor` や `multiprocessing.Pool` の
+    `initializer` として使う。
+    """
+    global _listener
+
+    _listener = None
+    sender = _WorkerSender(q)
+    mylogger._queue_listener = sender
+    _swap_handlers(sender.wrap)
+
+
+def _after_fork_in_child() -> None:
+    global _listener
+
+    # 親のリスナースレッドは、子プロセスには存在しない
+    if _listener is None:
+        return
+
+    mp_queue = _listener._mp_queue
+    if mp_queue is not None:
+        init_worker_logging(mp_queue)
+        return
+
+    _listener = None
+    mylogger._queue_listener = None
+    _swap_handlers(None)
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
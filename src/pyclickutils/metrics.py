@@ -0,0 +1,214 @@
+#
+# (c) 2025 Yoichi Tanibayashi
+#
+"""
+Per-command metrics in Prometheus text format.
+
+`click_common_opts(metrics_file=PATH)` または環境変数
+`PYCLICKUTILS_METRICS_FILE` で、ファイルを指定すると、
+コマンドパス (例: "cli sub2 sub2sub") ごとに、以下を記録する。
+
+  cli_command_invocations_total{command,status}  実行回数
+  cli_command_wall_seconds{command}              経過時間のヒストグラム
+  cli_command_cpu_seconds{command}               CPU 時間のヒストグラム
+  cli_<name>_total{command}                      ユーザー定義のカウンター
+
+ファイルは node_exporter の textfile collector で読み込める。
+値は、実行をまたいで累積する。累積値は、隣の PATH.json に保存する。
+複数のプロセスから同時に更新できるように、PATH.lock でロックして、
+一時ファイルからの rename で置き換える。
+
+Usage:
+
+  @click.group()
+  @click_common_opts("1.0.0", metrics_file="/var/lib/textfile/mytool.prom")
+  def cli(ctx, debug):
+      command_metrics(ctx).inc("rows", 100)
+"""
+
+import json
+import os
+import re
+import sys
+import time
+
+import click
+
+from ._fileutil import atomic_write_text, locked
+from .pyclickutils import METRICS_ENV
+
+# ルートのコンテキストの `meta` に保存する、実行中の記録
+METRICS_KEY = "pyclickutils.metrics"
+
+PREFIX = "cli"
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_NAME_RE = re.compile(r"[a-zA-Z_][a-zA-Z0-9_]*\Z")
+
+
+class CommandMetrics:
+    """Metrics of one invocation."""
+
+    def __init__(self):
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.process_time()
+        self.command = ""
+        self.counters: dict[str, float] = {}
+        self.path: str | None = None
+
+    def inc(self, name: str, value: float = 1) -> None:
+        """Increment the user-defined counter `name`."""
+        if not _NAME_RE.match(name):
+            raise ValueError(f"invalid metric name: {name!r}")
+        if value < 0:
+            raise ValueError("counters can only increase")
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def _finish(self) -> None:
+        wall = time.perf_counter() - self.start_wall
+        cpu = time.process_time() - self.start_cpu
+        status = _exit_status(sys.exc_info()[1])
+        if not self.path:
+            return
+        try:
+            record(self.path, self.command, status, wall, cpu, self.counters)
+        except OSError as e:
+            # メトリクスの失敗で、コマンドを失敗させない
+            print(f"metrics: {self.path}: {e}", file=sys.stderr)
+
+
+def _exit_status(exc: BaseException | None) -> int:
+    """Exit status for the exception propagating out of the command."""
+    if exc is None:
+        return 0
+    if isinstance(exc, click.exceptions.Exit):
+        return exc.exit_code
+    if isinstance(exc, click.ClickException):
+        return exc.exit_code
+    if isinstance(exc, SystemExit):
+        return exc.code if isinstance(exc.code, int) else 1
+    return 1
+
+
+def command_metrics(ctx: click.Context) -> CommandMetrics:
+    """Get the metrics of the current invocation (for user counters)."""
+    root = ctx.find_root()
+    m = root.meta.get(METRICS_KEY)
+    if m is None:
+        m = CommandMetrics()
+        root.meta[METRICS_KEY] = m
+        root.call_on_close(m._finish)
+    return m
+
+
+def start(ctx: click.Context, path: str | None) -> None:
+    """Called before each wrapped callback. The deepest command wins."""
+    m = command_metrics(ctx)
+    m.command = ctx.command_path
+    m.path = os.environ.get(METRICS_ENV) or path or m.path
+
+
+#
+# 累積と出力
+#
+def _observe(hist: dict, value: float) -> None:
+    if not hist:
+        hist.update(buckets=[0] * len(BUCKETS), sum=0.0, count=0)
+    for i, le in enumerate(BUCKETS):
+        if value <= le:
+            hist["buckets"][i] += 1
+    hist["sum"] += value
+    hist["count"] += 1
+
+
+def record(
+    path: str,
+    command: str,
+    status: int,
+    wall: float,
+    cpu: float,
+    counters: dict[str, float] | None = None,
+) -> None:
+    """Add one invocation to the metrics file `path`."""
+    state_path = path + ".json"
+    with locked(path):
+        try:
+            with open(state_path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (FileNotFoundError, ValueError):
+            state = {}
+
+        inv = state.setdefault("invocations", {}).setdefault(command, {})
+        inv[str(status)] = inv.get(str(status), 0) + 1
+        _observe(state.setdefault("wall", {}).setdefault(command, {}), wall)
+        _observe(state.setdefault("cpu", {}).setdefault(command, {}), cpu)
+        for name, value in (counters or {}).items():
+            c = state.setdefault("counters", {}).setdefault(name, {})
+            c[command] = c.get(command, 0) + value
+
+        atomic_write_text(state_path, json.dumps(state))
+        atomic_write_text(path, render(state))
+
+
+def _label(value: str) -> str:
+    value = value.replace("\\", r"\\").replace('"', r"\"")
+    return value.replace("\n", r"\n")
+
+
+def _num(value: float) -> str:
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _render_hist(
+    lines: list[str], name: str, hists: dict, help_: str
+) -> None:
+    lines.append(f"# HELP {name} {help_}")
+    lines.append(f"# TYPE {name} histogram")
+    for command, h in sorted(hists.items()):
+        cmd = _label(command)
+        for le, n in zip(BUCKETS, h["buckets"]):
+            lines.append(f'{name}_bucket{{command="{cmd}",le="{le}"}} {n}')
+        lines.append(
+            f'{name}_bucket{{command="{cmd}",le="+Inf"}} {h["count"]}'
+        )
+        lines.append(f'{name}_sum{{command="{cmd}"}} {_num(h["sum"])}')
+        lines.append(f'{name}_count{{command="{cmd}"}} {h["count"]}')
+
+
+def render(state: dict) -> str:
+    """Render the accumulated state in Prometheus text format."""
+    lines: list[str] = []
+
+    name = f"{PREFIX}_command_invocations_total"
+    lines.append(f"# HELP {name} Number of invocations by exit status.")
+    lines.append(f"# TYPE {name} counter")
+    for command, by_status in sorted(state.get("invocations", {}).items()):
+        for status, n in sorted(by_status.items(), key=lambda x: int(x[0])):
+            lines.append(
+                f'{name}{{command="{_label(command)}",status="{status}"}} {n}'
+            )
+
+    _render_hist(
+        lines,
+        f"{PREFIX}_command_wall_seconds",
+        state.get("wall", {}),
+        "Wall clock time of the command.",
+    )
+    _render_hist(
+        lines,
+        f"{PREFIX}_command_cpu_seconds",
+        state.get("cpu", {}),
+        "CPU time of the command.",
+    )
+
+    for counter, by_command in sorted(state.get("counters", {}).items()):
+        name = f"{PREFIX}_{counter}_total"
+        lines.append(f"# TYPE {name} counter")
+        for command, value in sorted(by_command.items()):
+            lines.append(
+                f'{name}{{command="{_label(command)}"}} {_num(value)}'
+            )
+
+    return "\n".join(lines) + "\n"
@@ -16,56 +16,237 @@ Usage:
       log = get_logger(__name__, debug=debug_flag)
       log.debug("....")
 
+  # ループの中のログを抑制する (logfilter.py を参照)
+  log = get_logger(__name__, debug_flag, rate_limit=5)  # 1秒に5件まで
+  log = get_logger(__name__, debug_flag, sample=100)  # 100件に1件
+
+  # debug=False でも、直近の DEBUG レコードを保持し、
+  # 捕捉されない例外やシグナルの時に出力する (flightrec.py を参照)
+  log = get_logger(__name__, debug_flag, flight_recorder=1000)
+
 """
 
-import inspect
-from logging import DEBUG, INFO, Formatter, StreamHandler, getLogger
+import sys
+from logging import (
+    DEBUG,
+    INFO,
+    Filter,
+    Formatter,
+    Handler,
+    Logger,
+    StreamHandler,
+    getLogger,
+)
+from typing import Any
 
+FMT_HDR = "%(asctime)s %(levelname)s "
+FMT_LOC = "%(name)s.%(funcName)s:%(lineno)d> "
+FMT_MSG = "%(message)s"
+DATEFMT = "%H:%M:%S"
 
-def get_logger(name, debug=False):
-    """Get logger."""
-    filename = inspect.stack()[1].filename.split("/")[-1]
-    name = filename + "." + name
-    logger = getLogger(name)
+# 設定済みロガーのレジストリ
+#   key: (呼び出し元ファイル名, name, level,
+#         ハンドラーのキー, フィルターのキー, flight_recorder)
+_loggers: dict[tuple, Logger] = {}
 
-    # Prevent messages from being passed to the root logger
-    logger.propagate = False
+# ロガー名 -> 最後に設定した
+#   (ハンドラーのキー, フィルターのキー, flight_recorder)
+_applied: dict[str, tuple] = {}
 
-    # Clear existing handlers to prevent duplicates
-    # if get_logger is called multiple times for the same name
-    if logger.handlers:
-        logger.handlers.clear()
+# ロガー名 -> 付けたフィルター (logfilter.py)
+_flood_filters: dict[str, Filter] = {}
+
+# ロガー名 -> フライトレコーダー (flightrec.py)
+_recorders: dict[str, Any] = {}
+
+# 共有ハンドラーのプール (出力先はすべて stderr)
+#   key: ("text", format, datefmt) または ("json", extra_fields)
+#   同じフォーマットのロガーは、一つのハンドラー (ロック) を共有する
+_handler_pool: dict[tuple, Handler] = {}
+
+_TEXT_KEY = ("text", FMT_HDR + FMT_LOC + FMT_MSG, DATEFMT)
 
-    # Create a new handler and formatter for each logger
-    fmt_hdr = "%(asctime)s %(levelname)s "
-    fmt_loc = "%(name)s.%(funcName)s:%(lineno)d> "
-    handler_fmt = Formatter(
-        fmt_hdr + fmt_loc + "%(message)s", datefmt="%H:%M:%S"
-    )
+# キューモード (logqueue.py) が有効な場合、ハンドラーをラップする
+_queue_listener: Any = None
 
-    console_handler = StreamHandler()
-    console_handler.setFormatter(handler_fmt)
-    console_handler.setLevel(DEBUG)
 
-    logger.addHandler(console_handler)
-    logger.setLevel(INFO)  # Default logger level
+class _StderrHandler(StreamHandler):
+    """Stream handler that always writes to the current `sys.stderr`.
 
+    `sys.stderr` が差し替えられても (pytest, CliRunner など)、
+    キャッシュしたハンドラーがそのまま使えるようにする。
+    """
+
+    def __init__(self, level=DEBUG):
+        super().__init__()
+        self.setLevel(level)
+
+    @property  # type: ignore[override]
+    def stream(self):
+        return sys.stderr
+
+    @stream.setter
+    def stream(self, _value):
+        pass
+
+
+def _debug_level(debug) -> int:
+    """Convert `debug` argument to logging level."""
     # [Important !! ]
     # isinstance()では、boolもintと判定されるので、
     # 先に bool かどうかを判定する
 
     if isinstance(debug, bool):
-        if debug:
-            logger.setLevel(DEBUG)
-        return logger
+        return DEBUG if debug else INFO
 
     if isinstance(debug, int):
-        logger.setLevel(debug)
-        return logger
+        return debug
 
     raise ValueError("invalid `debug` value: %s" % (debug))
 
 
+def _filter_key(rate_limit, sample) -> tuple | None:
+    """Make the key of the flood filter (None: no filter)."""
+    if rate_limit is None and sample is None:
+        return None
+    return (rate_limit, sample)
+
+
+def _handler_key(fmt: str, extra_fields) -> tuple:
+    """Make the key of the handler pool."""
+    if fmt == "text":
+        return _TEXT_KEY
+    if fmt == "json":
+        return ("json", tuple(extra_fields))
+    raise ValueError("invalid `fmt` value: %s" % (fmt))
+
+
+def _new_formatter(key: tuple) -> Formatter:
+    if key[0] == "json":
+        from .logjson import JsonFormatter
+
+        return JsonFormatter(extra_fields=key[1])
+    return Formatter(key[1], datefmt=key[2])
+
+
+def _pooled_handler(key: tuple = _TEXT_KEY) -> Handler:
+    """Get the shared stderr handler for the key."""
+    handler = _handler_pool.get(key)
+    if handler is None:
+        handler = _StderrHandler()
+        handler.setFormatter(_new_formatter(key))
+        _handler_pool[key] = handler
+    return handler
+
+
+def _pool_key(handler: Handler) -> tuple:
+    """Key of a pooled handler (text for other handlers)."""
+    for key, pooled in _handler_pool.items():
+        if pooled is handler:
+            return key
+    return _TEXT_KEY
+
+
+def _set_level(logger: Logger, level: int) -> None:
+    recorder = _recorders.get(logger.name)
+    if recorder is not None:
+        # すべての DEBUG レコードをレコーダーに渡し、出力はレコーダーが選ぶ
+        recorder.output_level = level
+        level = DEBUG
+    if logger.level != level:
+        logger.setLevel(level)
+
+
+def _configure(
+    logger: Logger,
+    level: int,
+    handler_key: tuple,
+    filter_key: tuple | None,
+    flight_recorder: int | None = None,
+) -> None:
+    """Configure handler, formatter, filter and recorder of the logger."""
+    # Prevent messages from being passed to the root logger
+    logger.propagate = False
+
+    # Clear existing handlers to prevent duplicates
+    # if get_logger is called multiple times for the same name
+    # (プールのハンドラーは、ロガーから外すだけで破棄しない)
+    if logger.handlers:
+        logger.handlers.clear()
+
+    handler = _pooled_handler(handler_key)
+    if _queue_listener is not None:
+        handler = _queue_listener.wrap(handler)
+    _recorders.pop(logger.name, None)
+    if flight_recorder is not None:
+        from .flightrec import FlightRecorder
+
+        # レコーダーは同期のまま、出力先だけをキューに積む
+        handler = FlightRecorder(
+            flight_recorder, handler, level, _new_formatter(handler_key)
+        )
+        _recorders[logger.name] = handler
+    logger.addHandler(handler)
+    _set_level(logger, level)
+
+    old_filter = _flood_filters.pop(logger.name, None)
+    if old_filter is not None:
+        logger.removeFilter(old_filter)
+    if filter_key is not None:
+        from .logfilter import FloodFilter
+
+        flood = FloodFilter(rate=filter_key[0], sample=filter_key[1])
+        logger.addFilter(flood)
+        _flood_filters[logger.name] = flood
+
+    _applied[logger.name] = (handler_key, filter_key, flight_recorder)
+
+
+def get_logger(
+    name,
+    debug=False,
+    fmt="text",
+    extra_fields=(),
+    rate_limit=None,
+    sample=None,
+    flight_recorder=None,
+):
+    """Get logger.
+
+    Args:
+        fmt: "text" または "json" (JSON lines, logjson.py を参照)
+        extra_fields: `extra` で渡す値のうち、JSON に出力するフィールド
+        rate_limit: 同じメッセージ (呼び出し元とフォーマット文字列) を
+                    1秒あたりに出力する数 (logfilter.py を参照)
+        sample: 同じメッセージを N 件に 1 件だけ出力する
+        flight_recorder: 出力しない DEBUG レコードも、直近の N 件を保持し、
+                         異常時に出力する (flightrec.py を参照)
+    """
+    # inspect.stack() はソースの読み込みまで行うので遅い。
+    # 呼び出し元のフレームだけを直接参照する。
+    filename = sys._getframe(1).f_code.co_filename.split("/")[-1]
+    level = _debug_level(debug)
+    handler_key = _handler_key(fmt, extra_fields)
+    filter_key = _filter_key(rate_limit, sample)
+
+    applied = (handler_key, filter_key, flight_recorder)
+
+    key = (filename, name, level, *applied)
+    logger = _loggers.get(key)
+    if logger is not None:
+        # 同じロガーが、別の設定で取得されている場合がある
+        if _applied[logger.name] != applied:
+            _configure(logger, level, *applied)
+        else:
+            _set_level(logger, level)
+        return logger
+
+    logger = getLogger(filename + "." + name)
+    _configure(logger, level, *applied)
+    _loggers[key] = logger
+    return logger
+
+
 def errmsg(e) -> str:
     """Make stantdard error message."""
     e_name = type(e).__name__
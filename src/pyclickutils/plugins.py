@@ -0,0 +1,103 @@
+#
+# (c) 2025 Yoichi Tanibayashi
+#
+"""
+Cached entry-point plugin discovery.
+
+他のパッケージが、entry points でサブコマンドを追加できる。
+
+  # プラグイン側の pyproject.toml
+  [project.entry-points."mytool.commands"]
+  hello = "mytool_hello.cli:hello"
+
+  # 本体
+  @click.group(cls=LazyGroup, plugin_group="mytool.commands")
+  @click_common_opts(VERSION)
+  def cli(ctx, debug):
+      ...
+
+entry points を調べるには、すべてのディストリビューションの
+メタデータを読む必要があるので、結果 (name -> "module:attr") を
+`$XDG_CACHE_HOME/pyclickutils/plugins/` にキャッシュする。
+キャッシュのキーは、`sys.path` の site-packages (`*.dist-info` または
+`*.egg-info` を含むディレクトリ) と、その中のメタデータの mtime。
+ディストリビューションがインストール、削除、更新されると、作り直す。
+"""
+
+import hashlib
+import json
+import os
+import sys
+
+from ._fileutil import atomic_write_text, user_cache_dir
+
+_METADATA_SUFFIXES = (".dist-info", ".egg-info")
+
+# プロセスの中のキャッシュ: group -> {name: "module:attr"}
+_discovered: dict[str, dict[str, str]] = {}
+
+
+def environment_key() -> str:
+    """Fingerprint of the installed distributions (mtimes)."""
+    h = hashlib.sha1()
+    for path in sys.path:
+        try:
+            with os.scandir(path or ".") as it:
+                entries = sorted(
+                    (e.name, e.stat().st_mtime_ns)
+                    for e in it
+                    if e.name.endswith(_METADATA_SUFFIXES)
+                )
+            mtime = os.stat(path or ".").st_mtime_ns
+        except OSError:
+            continue  # 存在しない、またはディレクトリでない (zip など)
+        if not entries:
+            continue  # site-packages ではない (スクリプトのディレクトリなど)
+        h.update(f"{path}\0{mtime}\0".encode())
+        for name, mtime in entries:
+            h.update(f"{name}\0{mtime}\0".encode())
+    return h.hexdigest()
+
+
+def cache_path(group: str) -> str:
+    # 環境 (venv) ごとに、別のファイルにする
+    prefix = hashlib.sha1(sys.prefix.encode()).hexdigest()[:12]
+    return os.path.join(user_cache_dir("plugins"), f"{group}-{prefix}.json")
+
+
+def _scan(group: str) -> dict[str, str]:
+    from importlib.metadata import entry_points
+
+    return {ep.name: ep.value for ep in entry_points(group=group)}
+
+
+def discover_plugins(group: str) -> dict[str, str]:
+    """Plugin commands of the entry point `group`: {name: "module:attr"}.
+
+    プラグインのモジュールは import しない。
+    """
+    if group in _discovered:
+        return _discovered[group]
+
+    key = environment_key()
+    path = cache_path(group)
+    try:
+        with open(path, encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        cached = {}
+
+    if cached.get("key") == key:
+        commands = cached["commands"]
+    else:
+        commands = _scan(group)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            atomic_write_text(
+                path, json.dumps({"key": key, "commands": commands})
+            )
+        except OSError:
+            pass  # キャッシュできなくても、プラグインは使える
+
+    _discovered[group] = commands
+    return commands
@@ -0,0 +1,90 @@
+#
+# (c) 2025 Yoichi Tanibayashi
+#
+"""
+`--profile[=PATH]` option: run the command under cProfile.
+
+オプションを解析した時点でプロファイラーを開始し、
+オプションを指定したコマンドのコンテキストが閉じる時に停止する。
+グループに指定すれば、グループとサブコマンドのコールバックの両方が
+対象になる。
+
+  $ mytool --profile -d sub1           # 上位 TOP_N 件を stderr に表示
+  $ mytool --profile=out.prof sub1     # pstats ファイルに保存
+  $ python -m pstats out.prof
+
+グループの場合、`--profile` の直後にサブコマンド名を書くと、
+PATH として解釈されてしまう。`--profile=-` と書くこと。
+"""
+
+import sys
+
+import click
+
+# ルートのコンテキストの `meta` に保存する、実行中のプロファイラー
+PROFILE_KEY = "pyclickutils.profile"
+
+# stderr に表示する時の並び順と件数
+SORT_KEY = "cumulative"
+TOP_N = 30
+
+# PATH を省略した場合の値 (stderr に表示)
+TO_STDERR = "-"
+
+
+def _dump(prof, dest: str) -> None:
+    prof.disable()
+    if dest == TO_STDERR:
+        import pstats
+
+        stats = pstats.Stats(prof, stream=sys.stderr)
+        stats.sort_stats(SORT_KEY).print_stats(TOP_N)
+    else:
+        prof.dump_stats(dest)
+
+
+def profile_callback(ctx: click.Context, param, value) -> None:
+    """Callback of the `--profile` option."""
+    if value is None or ctx.resilient_parsing:
+        return
+
+    # 上位のコマンドで開始済み
+    if PROFILE_KEY in ctx.meta:
+        return
+
+    if isinstance(ctx.command, click.Group) and value in (
+        ctx.command.list_commands(ctx)
+    ):
+        raise click.BadParameter(
+            f"{value!r} is a subcommand. Use '--profile={TO_STDERR}'.",
+            ctx,
+            param,
+        )
+
+    import cProfile
+
+    prof = cProfile.Profile()
+    try:
+        prof.enable()
+    except ValueError as e:
+        # 他のプロファイラーが動いている
+        click.echo(f"--profile: {e}", err=True)
+        return
+
+    ctx.meta[PROFILE_KEY] = prof
+    ctx.call_on_close(lambda: _dump(prof, value))
+
+
+def profile_option(*param_decls: str):
+    """The `--profile[=PATH]` option."""
+    return click.option(
+        *(param_decls or ("--profile",)),
+        type=click.Path(dir_okay=False, allow_dash=True),
+        is_flag=False,
+        flag_value=TO_STDERR,
+        callback=profile_callback,
+        is_eager=True,
+        expose_value=False,
+        metavar="[PATH]",
+        help="profile the command (write stats to PATH or stderr)",
+    )
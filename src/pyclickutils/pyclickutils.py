@@ -1,32 +1,217 @@
 #
 # (c) 2025 Yoichi Tanibayashi
 #
+import functools
+import inspect
+import os
+import sys
+from collections.abc import Callable
+
 import click
 
+# ルートのコンテキストの `meta` に保存する、共有のイベントループ
+RUNNER_KEY = "pyclickutils.runner"
+
+# メトリクスのファイルを指定する環境変数 (`pyclickutils.metrics` 参照)
+METRICS_ENV = "PYCLICKUTILS_METRICS_FILE"
+
+# バージョンを求める関数を保存する、コールバックの属性
+VERSION_ATTR = "pyclickutils_version"
+
+# バージョンが指定されなかった場合
+UNKNOWN_VERSION = "_._._"
+
+
+def get_runner(ctx: click.Context, async_workers: int | None = None):
+    """Get the `asyncio.Runner` shared by the whole invocation.
+
+    最初に呼ばれた時に作成し、ルートのコンテキストの終了時に閉じる。
+    """
+    root = ctx.find_root()
+    runner = root.meta.get(RUNNER_KEY)
+    if runner is None:
+        import asyncio
+
+        runner = asyncio.Runner()
+        if async_workers is not None:
+            from concurrent.futures import ThreadPoolExecutor
+
+            runner.get_loop().set_default_executor(
+                ThreadPoolExecutor(max_workers=async_workers)
+            )
+        root.meta[RUNNER_KEY] = runner
+        root.call_on_close(runner.close)
+    return runner
+
+
+def _wrap_coroutine(func, async_workers: int | None):
+    """Run `async def` callback on the shared event loop."""
+
+    @functools.wraps(func)
+    def _wrapper(ctx, *args, **kwargs):
+        runner = get_runner(ctx, async_workers)
+        return runner.run(func(ctx, *args, **kwargs))
+
+    return _wrapper
+
+
+def _wrap_metrics(func, metrics_file: str | None):
+    """Record metrics of the invocation, if enabled."""
+
+    @functools.wraps(func)
+    def _wrapper(ctx, *args, **kwargs):
+        if metrics_file or os.environ.get(METRICS_ENV):
+            from .metrics import start
+
+            start(ctx, metrics_file)
+        return func(ctx, *args, **kwargs)
+
+    return _wrapper
+
+
+@functools.cache
+def _dist_version(dist: str) -> str:
+    from importlib.metadata import version
+
+    return version(dist)
+
+
+def version_resolver(
+    ver_str: str | Callable[[], str] = "", dist: str | None = None
+) -> Callable[[], str]:
+    """Return a function that resolves the version once (memoized).
+
+    `ver_str` は、文字列またはバージョンを返す関数。
+    `dist` は、バージョンを調べるディストリビューション名。
+    メタデータは、この関数が呼ばれた時に初めて読む。
+    """
+
+    @functools.cache
+    def _resolve() -> str:
+        if callable(ver_str):
+            return ver_str()
+        if ver_str:
+            return ver_str
+        if dist:
+            return _dist_version(dist)
+        return UNKNOWN_VERSION
+
+    return _resolve
+
+
+def command_version(command: click.Command) -> str | None:
+    """Version given to `click_common_opts` of the command."""
+    resolve = getattr(command.callback, VERSION_ATTR, None)
+    return resolve() if resolve is not None else None
+
+
+def _version_callback(resolve: Callable[[], str]):
+    """Show the version (resolved here) and exit."""
+
+    def _show_version(ctx: click.Context, _param, value) -> None:
+        if not value or ctx.resilient_parsing:
+            return
+
+        prog = ctx.find_root().info_name
+        click.echo(f"{prog} {resolve()}", color=ctx.color)
+        ctx.exit()
+
+    return _show_version
+
+
+def _help_callback(disk: bool):
+    """Show the cached help (`pyclickutils.helpcache`)."""
+
+    def _show_help(ctx: click.Context, _param, value) -> None:
+        if not value or ctx.resilient_parsing:
+            return
+
+        from .helpcache import cached_help
+
+        click.echo(cached_help(ctx, disk), color=ctx.color)
+        ctx.exit()
+
+    return _show_help
+
+
+def run_main(cli, argv: list[str], prog_name: str | None = None) -> int:
+    """Run the command like a process and return the exit code."""
+    try:
+        cli.main(args=argv, prog_name=prog_name, standalone_mode=True)
+    except SystemExit as e:
+        if e.code is None:
+            return 0
+        if isinstance(e.code, int):
+            return e.code
+        print(e.code, file=sys.stderr)
+        return 1
+    except Exception:
+        import traceback
+
+        traceback.print_exc()
+        return 1
+    return 0
+
 
 def click_common_opts(
-    ver_str: str = "",
+    ver_str: str | Callable[[], str] = "",
     use_h: bool = True,
     use_d: bool = True,
     use_v: bool = False,
+    async_workers: int | None = None,
+    use_batch: bool = False,
+    use_profile: bool = False,
+    use_trace_mem: bool = False,
+    metrics_file: str | None = None,
+    help_cache: bool = False,
+    dist: str | None = None,
 ):
-    """共通オプションをまとめたメタデコレータ"""
+    """共通オプションをまとめたメタデコレータ
+
+    バージョンは、文字列、バージョンを返す関数 (`ver_str`)、
+    またはディストリビューション名 (`dist`) で指定する。
+    関数とメタデータは、`--version` が指定された時に初めて使い、
+    結果を保存する。
+
+    `async def` のコールバックは、グループとサブコマンドで共有する
+    イベントループ (`asyncio.Runner`) で実行する。
+    `async_workers` を指定すると、デフォルトの executor の
+    スレッド数を制限する。
+    `use_batch` を指定すると、`--batch FILE` オプションを追加する
+    (`pyclickutils.batch` 参照)。
+    `use_profile` を指定すると、`--profile[=PATH]` オプションを追加する
+    (`pyclickutils.profiling` 参照)。
+    `use_trace_mem` を指定すると、`--trace-mem[=KEY]` と
+    `--trace-mem-interval SEC` オプションを追加する
+    (`pyclickutils.tracemem` 参照)。
+    `metrics_file` を指定すると、実行回数や実行時間などを
+    Prometheus 形式で記録する (`pyclickutils.metrics` 参照)。
+    `--help` の出力は、プロセスの中でキャッシュする。
+    `help_cache` を指定すると、ディスクにもキャッシュして、
+    次回以降の実行で使う (`pyclickutils.helpcache` 参照)。
+    """
 
     def _decorator(func):
         decorators = []
 
-        if len(ver_str) > 0:
-            v_str = ver_str
-        else:
-            v_str = "_._._"
+        if inspect.iscoroutinefunction(func):
+            func = _wrap_coroutine(func, async_workers)
+        func = _wrap_metrics(func, metrics_file)
+
+        resolve = version_resolver(ver_str, dist)
 
         # version option
         ver_opts = ["--version", "-V"]
         if use_v:
             ver_opts.append("-v")
         decorators.append(
-            click.version_option(
-                v_str, *ver_opts, message="%(prog)s %(version)s"
+            click.option(
+                *ver_opts,
+                is_flag=True,
+                expose_value=False,
+                is_eager=True,
+                callback=_version_callback(resolve),
+                help="Show the version and exit.",
             )
         )
 
@@ -38,17 +223,49 @@ def click_common_opts(
             click.option(*debug_opts, is_flag=True, help="debug flag")
         )
 
+        # batch option
+        if use_batch:
+            from .batch import batch_callback
+
+            decorators.append(
+                click.option(
+                    "--batch",
+                    type=click.File("r"),
+                    callback=batch_callback,
+                    is_eager=True,
+                    expose_value=False,
+                    metavar="FILE",
+                    help="run command lines in FILE ('-' for stdin)",
+                )
+            )
+
+        # profile option
+        if use_profile:
+            from .profiling import profile_option
+
+            decorators.append(profile_option())
+
+        # trace-mem options
+        if use_trace_mem:
+            from .tracemem import trace_mem_options
+
+            decorators.append(trace_mem_options())
+
         # help option
         help_opts = ["--help"]
         if use_h:
             help_opts.append("-h")
-        decorators.append(click.help_option(*help_opts))
+        decorators.append(
+            click.help_option(*help_opts, callback=_help_callback(help_cache))
+        )
 
         # decorators をまとめて適用
         for dec in reversed(decorators):
             func = dec(func)
 
         # context を最後に wrap
-        return click.pass_context(func)
+        func = click.pass_context(func)
+        setattr(func, VERSION_ATTR, resolve)
+        return func
 
     return _decorator
@@ -0,0 +1,194 @@
+#
+# (c) 2025 Yoichi Tanibayashi
+#
+"""
+`--trace-mem[=KEY]` option: report memory usage with tracemalloc.
+
+オプションを解析した時点で tracemalloc を開始し、オプションを指定した
+コマンドのコンテキストが閉じる時に、現在と最大のメモリ使用量と、
+メモリを確保した場所の上位 TOP_N 件を stderr に表示する。
+KEY は、場所をまとめる単位 ("lineno" または "filename")。
+
+  $ mytool --trace-mem -d sub1
+  $ mytool --trace-mem=filename sub1
+
+  # 長時間の実行では、一定間隔でスナップショットを保存する
+  $ mytool --trace-mem --trace-mem-interval 60 sub1
+  $ ls trace-mem-*.snapshot
+
+保存したスナップショットは `tracemalloc.Snapshot.load()` で読み込める。
+オプションを指定しない場合、tracemalloc は import もされない。
+"""
+
+import os
+import sys
+import threading
+
+import click
+
+# ルートのコンテキストの `meta` に保存する、実行中の状態
+TRACE_MEM_KEY = "pyclickutils.trace_mem"
+
+KEY_TYPES = ("lineno", "filename")
+TOP_N = 10
+
+# スナップショットのファイル名 (カレントディレクトリに保存)
+SNAPSHOT_FILE = "trace-mem-{pid}-{n:04d}.snapshot"
+
+
+def _format_size(size: float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+class _TraceMem:
+    """State of a `--trace-mem` run."""
+
+    def __init__(self, ctx: click.Context):
+        import tracemalloc
+
+        self.ctx = ctx
+        self.key_type = KEY_TYPES[0]
+        self.thread: threading.Thread | None = None
+        self.stop_event = threading.Event()
+
+        # 既に開始されている場合 (PYTHONTRACEMALLOC など) は、止めない
+        self.started = not tracemalloc.is_tracing()
+        if self.started:
+            tracemalloc.start()
+        else:
+            tracemalloc.reset_peak()
+
+    def start_snapshots(self, interval: float) -> None:
+        if self.thread is not None:
+            return
+        self.thread = threading.Thread(
+            target=self._snapshot_loop,
+            args=(interval,),
+            name="trace-mem",
+            daemon=True,
+        )
+        self.thread.start()
+
+    def _snapshot_loop(self, interval: float) -> None:
+        import tracemalloc
+
+        n = 0
+        while not self.stop_event.wait(interval):
+            n += 1
+            path = SNAPSHOT_FILE.format(pid=os.getpid(), n=n)
+            tracemalloc.take_snapshot().dump(path)
+
+    def report(self) -> None:
+        import tracemalloc
+
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "<unknown>"),
+            )
+        )
+        if self.started:
+            tracemalloc.stop()
+
+        out = sys.stderr
+        print(
+            f"trace-mem: current {_format_size(current)}, "
+            f"peak {_format_size(peak)}",
+            file=out,
+        )
+        print(f"trace-mem: top {TOP_N} by {self.key_type}", file=out)
+        stats = snapshot.statistics(self.key_type)
+        for i, stat in enumerate(stats[:TOP_N], 1):
+            frame = stat.traceback[0]
+            where = frame.filename
+            if self.key_type == "lineno":
+                where += f":{frame.lineno}"
+            print(
+                f"  #{i}: {where}: {_format_size(stat.size)}"
+                f" ({stat.count} blocks)",
+                file=out,
+            )
+
+
+def _get_state(ctx: click.Context) -> _TraceMem | None:
+    """Start tracing once. Return None if started by another command."""
+    if TRACE_MEM_KEY in ctx.meta:
+        state = ctx.meta[TRACE_MEM_KEY]
+        return state if state.ctx is ctx else None
+
+    state = _TraceMem(ctx)
+    ctx.meta[TRACE_MEM_KEY] = state
+    ctx.call_on_close(state.report)
+    return state
+
+
+def trace_mem_callback(ctx: click.Context, param, value) -> None:
+    """Callback of the `--trace-mem` option."""
+    if value is None or ctx.resilient_parsing:
+        return
+
+    if value not in KEY_TYPES:
+        hint = ""
+        if isinstance(ctx.command, click.Group):
+            hint = f" Use '--trace-mem={KEY_TYPES[0]}'."
+        raise click.BadParameter(
+            f"{value!r} is not one of {', '.join(KEY_TYPES)}.{hint}",
+            ctx,
+            param,
+        )
+
+    state = _get_state(ctx)
+    if state is not None:
+        state.key_type = value
+
+
+def trace_mem_interval_callback(ctx: click.Context, param, value) -> None:
+    """Callback of the `--trace-mem-interval` option."""
+    if value is None or ctx.resilient_parsing:
+        return
+
+    state = _get_state(ctx)
+    if state is not None:
+        state.start_snapshots(value)
+
+
+def trace_mem_options():
+    """The `--trace-mem[=KEY]` and `--trace-mem-interval SEC` options."""
+    opt_key = click.option(
+        "--trace-mem",
+        is_flag=False,
+        flag_value=KEY_TYPES[0],
+        callback=trace_mem_callback,
+        is_eager=True,
+        expose_value=False,
+        metavar="[lineno|filename]",
+        help="report memory usage and top allocation sites",
+    )
+    opt_interval = click.option(
+        "--trace-mem-interval",
+        # (types-click 7 のスタブは、min_open を知らない)
+        type=click.FloatRange(
+            min=0,
+            min_open=True,  # type: ignore[call-arg]
+        ),
+        callback=trace_mem_interval_callback,
+        is_eager=True,
+        expose_value=False,
+        metavar="SEC",
+        help="save tracemalloc snapshots every SEC seconds",
+    )
+
+    def _decorator(func):
+        return opt_key(opt_interval(func))
+
+    return _decorator
@@ -1,25 +1,284 @@
+import codecs
+import importlib.util
 import os
 import pty
-import select
+import re
+import selectors
 import subprocess
+import sys
 import time
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Optional
 
+import click
 import pytest
+from click.testing import CliRunner
 
 TIMEOUT_EXPECT = 5.0
 TIMEOUT_CLOSE = 3.0
 
+# "subprocess" を指定すると、すべてのテストで subprocess を使う
+ENV_BACKEND = "CLI_TEST_BACKEND"
+
+# 先行実行のワーカー数 ("0" で先行実行しない)
+# sleep などで待つコマンドもあるので、CPU 数より多くする
+ENV_PREFETCH_WORKERS = "CLI_TEST_PREFETCH_WORKERS"
+PREFETCH_WORKERS = min(16, (os.cpu_count() or 1) + 4)
+
+DEFAULT_TIMEOUT = 10
+DEFAULT_ENCODING = "utf-8"
+
+# コマンドラインの先頭で、読み飛ばすもの
+LAUNCHERS = (("uv", "run"), ("python",), ("python3",))
+
+
+class InProcessBackend:
+    """Run a click script in this process with `CliRunner`.
+
+    スクリプトは一度だけ読み込み、結果は `subprocess.run()` と
+    同じ形の `CompletedProcess` で返す。
+    """
+
+    def __init__(self):
+        self._commands: dict[str, click.Command | None] = {}
+
+    @staticmethod
+    def _strip_launcher(cmdline_list: list[str]) -> list[str]:
+        for launcher in LAUNCHERS:
+            n = len(launcher)
+            if tuple(cmdline_list[:n]) == launcher:
+                return cmdline_list[n:]
+        return cmdline_list
+
+    @staticmethod
+    def _top_command(module) -> click.Command | None:
+        """The command which is not a subcommand of another group."""
+        commands = [
+            v for v in vars(module).values() if isinstance(v, click.Command)
+        ]
+        subs = {
+            id(sub)
+            for c in commands
+            if isinstance(c, click.Group)
+            for sub in c.commands.values()
+        }
+        tops = [c for c in commands if id(c) not in subs]
+        return tops[0] if len(tops) == 1 else None
+
+    def _load(self, path: str) -> click.Command | None:
+        path = os.path.abspath(path)
+        if path not in self._commands:
+            name = "_cli_test_" + "".join(
+                c if c.isalnum() else "_"
+                for c in os.path.basename(path)[:-3]
+            )
+            spec = importlib.util.spec_from_file_location(name, path)
+            assert spec is not None and spec.loader is not None
+            module = importlib.util.module_from_spec(spec)
+            sys.path.insert(0, os.path.dirname(path))
+            try:
+                spec.loader.exec_module(module)
+            finally:
+                sys.path.pop(0)
+            self._commands[path] = self._top_command(module)
+        return self._commands[path]
+
+    def resolve(
+        self, cmdline_list: list[str]
+    ) -> tuple[click.Command, str, list[str]] | None:
+        """Return (command, script path, args), or None if not possible."""
+        argv = self._strip_launcher(cmdline_list)
+        if not argv or not argv[0].endswith(".py"):
+            return None
+        if not os.path.isfile(argv[0]):
+            return None
+        command = self._load(argv[0])
+        if command is None:
+            return None
+        return command, argv[0], argv[1:]
+
+    def run(
+        self,
+        command: click.Command,
+        path: str,
+        args: list[str],
+        input_data: Optional[str] = None,
+    ) -> subprocess.CompletedProcess:
+        # サブコマンドの遅延 import のため、スクリプトのディレクトリを
+        # `sys.path` に加える (subprocess と同じ)
+        sys.path.insert(0, os.path.dirname(os.path.abspath(path)))
+        try:
+            result = CliRunner().invoke(
+                command,
+                args,
+                input=input_data,
+                prog_name=os.path.basename(path),
+            )
+        finally:
+            sys.path.pop(0)
+
+        stderr = result.stderr
+        if result.exc_info and not isinstance(result.exc_info[1], SystemExit):
+            stderr += "".join(traceback.format_exception(*result.exc_info))
+        return subprocess.CompletedProcess(
+            [path, *args], result.exit_code, result.stdout, stderr
+        )
+
+
+_in_process_backend = InProcessBackend()
+
+
+def _run_subprocess(
+    cmdline_list: list[str],
+    input_data: Optional[str] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    cwd: Optional[str] = None,
+    env: Optional[dict[str, str]] = None,
+) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        cmdline_list,
+        capture_output=True,
+        text=True,
+        encoding=DEFAULT_ENCODING,
+        input=input_data,
+        timeout=timeout,
+        cwd=cwd,
+        env=env,
+    )
+
+
+def _in_process_enabled(
+    cwd: Optional[str] = None, env: Optional[dict[str, str]] = None
+) -> bool:
+    if cwd is not None or env is not None:
+        return False
+    return os.environ.get(ENV_BACKEND, "") != "subprocess"
+
+
+class CommandPrefetcher:
+    """Run the commands of the tests in advance, concurrently.
+
+    収集時に `cli_prefetch` マーカーの付いたテストのコマンドを、
+    上限付きのプールで実行しておく。同じ呼び出しは一度だけ実行する。
+    テストの `run_command()` は、結果を受け取るだけになる。
+
+    click のスクリプトは、in-process の場合と同様に、`uv run` などを
+    省いて、このインタープリターで直接実行する。
+    """
+
+    def __init__(self):
+        # key -> (future, `uv run` などを省いて実行したか)
+        self._futures: dict[tuple, tuple[Future, bool]] = {}
+        self._pool: ThreadPoolExecutor | None = None
+
+    @staticmethod
+    def key(
+        cmdline_list: list[str],
+        input_data: Optional[str] = None,
+        cwd: Optional[str] = None,
+        env: Optional[dict[str, str]] = None,
+    ) -> tuple:
+        env_key = None if env is None else tuple(sorted(env.items()))
+        return (tuple(cmdline_list), input_data, cwd, env_key)
+
+    @staticmethod
+    def _workers() -> int:
+        return int(os.environ.get(ENV_PREFETCH_WORKERS, PREFETCH_WORKERS))
+
+    def submit(
+        self,
+        cmdline_list: list[str],
+        input_data: Optional[str] = None,
+        cwd: Optional[str] = None,
+        env: Optional[dict[str, str]] = None,
+        timeout: float = DEFAULT_TIMEOUT,
+    ) -> None:
+        key = self.key(cmdline_list, input_data, cwd, env)
+        if key in self._futures or self._workers() <= 0:
+            return
+
+        cmdline_list = list(cmdline_list)
+        in_process = _in_process_enabled(cwd, env) and bool(
+            _in_process_backend.resolve(cmdline_list)
+        )
+        if in_process:
+            cmdline_list = [
+                sys.executable,
+                *InProcessBackend._strip_launcher(cmdline_list),
+            ]
+
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                self._workers(), thread_name_prefix="cli-prefetch"
+            )
+        future = self._pool.submit(
+            _run_subprocess, cmdline_list, input_data, timeout, cwd, env
+        )
+        self._futures[key] = (future, in_process)
+
+    def get(
+        self, key: tuple, in_process: bool | None = None
+    ) -> Future | None:
+        """The future of the result, or None if not prefetched."""
+        future, prefetched_in_process = self._futures.get(key, (None, False))
+        if in_process is False and prefetched_in_process:
+            return None
+        return future
+
+    def __len__(self) -> int:
+        return len(self._futures)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+        self._futures.clear()
+
+    def submit_items(self, items) -> None:
+        """Submit the commands of the collected test items.
+
+        マーカーの引数 `build` は、テストのパラメーターから
+        `run_command()` の引数 (`command`, `args`, `input_data`,
+        `cwd`, `env`) の dict を作る関数。
+        """
+        for item in items:
+            marker = item.get_closest_marker("cli_prefetch")
+            callspec = getattr(item, "callspec", None)
+            if marker is None or callspec is None:
+                continue
+
+            inv = dict(marker.kwargs["build"](**callspec.params))
+            _str, cmdline_list = CLITestBase._cmdline(
+                inv.pop("command"), inv.pop("args", None)
+            )
+            self.submit(cmdline_list, **inv)
+
+
+prefetcher = CommandPrefetcher()
+
 
 class InteractiveSession:
     """Interactive session."""
 
+    READ_SIZE = 65536
+
     def __init__(self, master_fd, process):
         """Constractor."""
         self.master_fd = master_fd
         self.process = process
         self.output = ""
 
+        # 前回の `expect()` で照合済みの位置より後のデータ (持ち越す)
+        self._rest = ""
+        self._eof = False
+        # 読み込みの境界で分かれたマルチバイト文字も、正しくデコードする
+        self._decoder = codecs.getincrementaldecoder("utf-8")(
+            errors="replace"
+        )
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(master_fd, selectors.EVENT_READ)
+
     def send_key(self, key: str):
         """Sends a key press to the process."""
         if not key:
@@ -28,10 +287,31 @@ class InteractiveSession:
         print(f"## key-input: {key!r}")
         os.write(self.master_fd, key.encode())
 
+    def _read(self, timeout: float) -> str:
+        """Block until data arrives (or timeout) and decode it."""
+        if not self._selector.select(timeout):
+            return ""
+        try:
+            data = os.read(self.master_fd, self.READ_SIZE)
+        except OSError as _e:
+            # 子プロセスが終了すると、Linux では EIO になる
+            print(f"{type(_e).__name__}, {_e}")
+            data = b""
+        if not data:
+            self._eof = True
+            return self._decoder.decode(b"", final=True)
+        return self._decoder.decode(data)
+
     def expect(
         self, pattern: str | list[str], timeout: float = TIMEOUT_EXPECT
     ) -> bool:
-        """Waits for a pattern to appear in the output."""
+        """Waits for a pattern to appear in the output.
+
+        未検出のパターンを一つの正規表現 (選択) にまとめ、まだ調べて
+        いない部分を一度だけ走査する。
+        すべてのパターンが見つかると、最後に見つかった位置より後の
+        データは、次の `expect()` に持ち越す。
+        """
         if not pattern:
             return True
 
@@ -39,40 +319,58 @@ class InteractiveSession:
             pattern = [pattern]
         print(f"### excpect: {pattern!r}")
 
-        start_time = time.time()
-        self.output = ""
-        while time.time() - start_time < timeout:
-            r, _, _ = select.select([self.master_fd], [], [], 0.1)
-            if r:
-                try:
-                    data = os.read(self.master_fd, 1024).decode()
-                    self.output += data
-                    # print(f"### Current output: \n{self.output}")
-                    matched_pattern = []
-                    for p in pattern:
-                        if p in self.output:
-                            matched_pattern.append(p)
-                    print(
-                        "#### data\n"
-                        f"{data!r}\n"
-                        "##### matched:"
-                        f"{len(matched_pattern)}/{len(pattern)}:"
-                        f" {matched_pattern}"
-                    )
-                    if len(matched_pattern) == len(pattern):
-                        # print(f"#### matched all: {pattern!r}")
-                        return True
-
-                except UnicodeDecodeError as _e:
-                    print(f"{type(_e).__name__}, {_e}")
-                    continue
-
-                except OSError as _e:
-                    print(f"{type(_e).__name__}, {_e}")
+        deadline = time.monotonic() + timeout
+        self.output = self._rest
+        pending = set(pattern)
+        regex = self._compile(pending)
+        start = 0  # 次に検索を始める位置
+        matched_end = 0
+        data = self.output
+        while True:
+            while pending:
+                m = regex.search(self.output, start)
+                if m is None:
+                    # パターンの途中までが末尾にある場合に備えて、重ねる
+                    longest = max(len(p) for p in pending)
+                    start = max(start, len(self.output) - longest + 1)
                     break
-            time.sleep(0.05)
+                matched_end = max(matched_end, m.end())
+                pending.discard(m.group())
+                if not pending:
+                    break
+                regex = self._compile(pending)
+                # 見つかった位置より前から始まるパターンは、末尾に
+                # 途中までしかない。それと、同じ位置から重なるものを探す
+                longest = max(len(p) for p in pending)
+                tail = max(start, len(self.output) - longest + 1)
+                start = min(m.start(), tail)
+
+            if data:
+                print(
+                    "#### data\n"
+                    f"{data!r}\n"
+                    "##### matched:"
+                    f"{len(pattern) - len(pending)}/{len(pattern)}"
+                )
+            if not pending:
+                self._rest = self.output[matched_end:]
+                return True
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._eof:
+                break
+            data = self._read(remaining)
+            self.output += data
+
+        self._rest = self.output
         return False
 
+    @staticmethod
+    def _compile(patterns) -> re.Pattern:
+        # 長いものを先にして、同じ位置では長いパターンを選ぶ
+        alts = sorted(patterns, key=len, reverse=True)
+        return re.compile("|".join(re.escape(p) for p in alts))
+
     def assert_out(
         self,
         e_stdout: str | list[str] | None = None,
@@ -135,6 +433,7 @@ class InteractiveSession:
             ret = self.process.wait(timeout=None)
             print(f"ret={ret}")
 
+        self._selector.close()
         os.close(self.master_fd)
         return ret
 
@@ -142,17 +441,18 @@ class InteractiveSession:
 class CLITestBase:
     """CLIテスト用のヘルパークラス。"""
 
-    DEFAULT_TIMEOUT = 10
-    DEFAULT_ENCODING = "utf-8"
+    DEFAULT_TIMEOUT = DEFAULT_TIMEOUT
+    DEFAULT_ENCODING = DEFAULT_ENCODING
 
+    @staticmethod
     def _cmdline(
-        self, command: str | list[str], args: str | list[str] | None = None
+        command: str | list[str], args: str | list[str] | None = None
     ) -> tuple[str, list]:
         """make command line list and string."""
         if isinstance(command, str):
             cmdline_list = command.split()
         else:
-            cmdline_list = command
+            cmdline_list = list(command)
 
         if args:
             if isinstance(args, str):
@@ -164,6 +464,16 @@ class CLITestBase:
 
         return (cmdline_str, cmdline_list)
 
+    def _use_in_process(
+        self,
+        in_process: bool | None,
+        cwd: Optional[str],
+        env: Optional[dict[str, str]],
+    ) -> bool:
+        if in_process is False:
+            return False
+        return _in_process_enabled(cwd, env)
+
     def run_command(
         self,
         command: str | list[str],
@@ -172,15 +482,24 @@ class CLITestBase:
         timeout: int = DEFAULT_TIMEOUT,
         cwd: Optional[str] = None,
         env: Optional[dict[str, str]] = None,
+        in_process: bool | None = None,
     ) -> subprocess.CompletedProcess:
         """コマンドを実行し、結果を返す。
 
+        `cli_prefetch` で先行実行済みの場合は、その結果を返す。
+        click のスクリプト (`*.py`) は、このプロセスの中で実行する。
+        `cwd`, `env` を指定した場合、`in_process=False` の場合、
+        環境変数 `CLI_TEST_BACKEND=subprocess` の場合は、
+        subprocess で実行する。
+        このプロセスの中で実行する場合、`timeout` は無視される。
+
         Args:
             command: 実行するコマンドのリスト。
             input_data: 標準入力に渡すデータ。
             timeout: コマンドのタイムアウト（秒）。
             cwd: コマンドを実行するディレクトリ。
             env: コマンドの環境変数。
+            in_process: False の場合、必ず subprocess で実行する。
 
         Returns:
             result: コマンドの実行結果。
@@ -192,26 +511,31 @@ class CLITestBase:
         cmdline_str, cmdline_list = self._cmdline(command, args)
         print(f"\n# cmdline = {cmdline_str!r}")
         print(f"# cmdline_list = {cmdline_list}")
+        if input_data:
+            print(f"## input: {input_data!r}")
+
+        future = prefetcher.get(
+            prefetcher.key(cmdline_list, input_data, cwd, env), in_process
+        )
 
         try:
-            if input_data:
-                print(f"## input: {input_data!r}")
-            result = subprocess.run(
-                cmdline_list,
-                capture_output=True,
-                text=True,
-                encoding=self.DEFAULT_ENCODING,
-                input=input_data,
-                timeout=timeout,
-                cwd=cwd,
-                env=env,
+            if future is not None:
+                print("# backend = prefetched")
+                return future.result()
+
+            if self._use_in_process(in_process, cwd, env):
+                resolved = _in_process_backend.resolve(cmdline_list)
+                if resolved:
+                    print("# backend = in-process")
+                    return _in_process_backend.run(*resolved, input_data)
+
+            return _run_subprocess(
+                cmdline_list, input_data, timeout, cwd, env
             )
-            return result
         except subprocess.TimeoutExpired as _e:
-            cmdline_str = " ".join(command)
             pytest.fail(f"{type(_e).__name__}: {timeout}s: {cmdline_str!r}")
         except FileNotFoundError:
-            pytest.skip(f"Command not found: {command[0]}")
+            pytest.skip(f"Command not found: {cmdline_list[0]}")
 
     def assert_out_str(
         self, label: str, out_str: str, e_out: str | list[str]
@@ -257,6 +581,7 @@ class CLITestBase:
         e_stdout: str | list[str] = "",
         e_stderr: str | list[str] = "",
         e_ret: int | None = None,
+        in_process: bool | None = None,
     ) -> None:
         """Test command."""
         result = self.run_command(
@@ -266,6 +591,7 @@ class CLITestBase:
             timeout=timeout,
             cwd=cwd,
             env=env,
+            in_process=in_process,
         )
         self.assert_result(result, e_stdout, e_stderr, e_ret)
 
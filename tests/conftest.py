@@ -10,6 +10,7 @@ from ._testbase_cli import (
     CLITestBase,
     InteractiveSession,
     cli_runner,
+    prefetcher,
 )
 
 print(
@@ -23,3 +24,21 @@ print(
     KEY_LEFT,
     KEY_RIGHT,
 )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "cli_prefetch(build=func): run the command of each parameter set in"
+        " advance. `build(**params)` returns the arguments of"
+        " `run_command()` as a dict.",
+    )
+
+
+def pytest_collection_finish(session):
+    # 選択されたテストのコマンドを、並行に実行し始める
+    prefetcher.submit_items(session.items)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    prefetcher.shutdown()
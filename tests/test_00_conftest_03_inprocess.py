@@ -0,0 +1,66 @@
+# tests/test_00_conftest_03_inprocess.py
+#
+# `CLITestBase` の in-process バックエンドの確認用テストプログラム
+#
+import pytest
+
+from ._testbase_cli import ENV_BACKEND, InProcessBackend
+
+SAMPLES_DIR = "samples"
+
+CASES = [
+    ("sample1-simple.py", "-d"),
+    ("sample3-subs.py", "sub subsub"),
+    ("sample3-subs.py", "-d"),
+    ("sample5-lazy.py", "hello -V"),
+    ("sample5-lazy.py", "nosuchcmd"),
+]
+
+
+class TestInProcessBackend:
+    """in-process と subprocess の結果が同じであることのテスト。"""
+
+    @pytest.mark.parametrize("script, args", CASES)
+    def test_same_result(self, cli_runner, script, args):
+        cmdline = f"uv run {SAMPLES_DIR}/{script}"
+        r_in = cli_runner.run_command(cmdline, args)
+        r_sub = cli_runner.run_command(cmdline, args, in_process=False)
+
+        assert r_in.returncode == r_sub.returncode
+        assert r_in.stdout == r_sub.stdout
+        assert r_in.stderr == r_sub.stderr
+
+    def test_resolve(self):
+        backend = InProcessBackend()
+        path = f"{SAMPLES_DIR}/sample3-subs.py"
+
+        resolved = backend.resolve(["uv", "run", path, "sub"])
+        assert resolved is not None
+        command, script, args = resolved
+        assert command.name == "main"
+        assert script == path
+        assert args == ["sub"]
+
+        assert backend.resolve(["python3", path]) is not None
+        assert backend.resolve(["echo", "Hello"]) is None
+        assert backend.resolve(["python3", "-c", "print(1)"]) is None
+        assert backend.resolve(["uv", "run", "nosuchfile.py"]) is None
+
+    def test_exception(self, cli_runner, tmp_path):
+        """例外は、subprocess と同様に traceback を stderr に出す。"""
+        script = tmp_path / "fail.py"
+        script.write_text(
+            "import click\n"
+            "@click.command()\n"
+            "def main():\n"
+            "    raise RuntimeError('boom')\n"
+        )
+        result = cli_runner.run_command(["python3", str(script)])
+        assert result.returncode == 1
+        assert "RuntimeError: boom" in result.stderr
+        assert "Traceback" in result.stderr
+
+    def test_env_forces_subprocess(self, cli_runner, monkeypatch, capsys):
+        monkeypatch.setenv(ENV_BACKEND, "subprocess")
+        cli_runner.run_command(f"uv run {SAMPLES_DIR}/sample1-simple.py")
+        assert "backend = in-process" not in capsys.readouterr().out
@@ -0,0 +1,66 @@
+# tests/test_00_conftest_04_expect.py
+#
+# `InteractiveSession.expect()` の確認用テストプログラム
+#
+import sys
+import time
+
+import pytest
+
+# 子プロセスで、バイト列を少しずつ書き出す
+WRITER = r"""
+import os, sys, time
+for chunk in sys.argv[1:]:
+    os.write(1, bytes.fromhex(chunk))
+    time.sleep(0.2)
+"""
+
+
+def writer_cmd(*chunks: bytes) -> list[str]:
+    return [sys.executable, "-c", WRITER, *(c.hex() for c in chunks)]
+
+
+@pytest.fixture
+def session(cli_runner, request):
+    s = cli_runner.run_interactive_command(writer_cmd(*request.param))
+    yield s
+    s.close(terminate_flag=False)
+
+
+class TestExpect:
+    """`expect()` のテスト。"""
+
+    @pytest.mark.parametrize(
+        "session", [("あい".encode()[:2], "あい".encode()[2:])], indirect=True
+    )
+    def test_split_multibyte(self, session):
+        """読み込みの境界で分かれた UTF-8 の文字。"""
+        assert session.expect("あい")
+        assert "�" not in session.output
+
+    @pytest.mark.parametrize(
+        "session", [(b"Hel", b"lo Wor", b"ld")], indirect=True
+    )
+    def test_split_pattern(self, session):
+        """読み込みの境界をまたぐパターン。"""
+        assert session.expect(["Hello World", "World", "lo"])
+
+    @pytest.mark.parametrize("session", [(b"xxab", b"cdyy")], indirect=True)
+    def test_overlap(self, session):
+        """重なるパターンや、同じ位置から始まるパターン。"""
+        assert session.expect(["abc", "bcd", "ab", "cdyy"])
+        assert not session.expect("yy", timeout=0.5)
+
+    @pytest.mark.parametrize(
+        "session", [(b"first\nsecond\n",)], indirect=True
+    )
+    def test_carry_over(self, session):
+        """一度に読んだデータは、次の `expect()` に持ち越す。"""
+        assert session.expect("first")
+        assert session.expect("second")
+
+    @pytest.mark.parametrize("session", [(b"abc\n",)], indirect=True)
+    def test_timeout(self, session):
+        start = time.monotonic()
+        assert not session.expect("xyz", timeout=1.0)
+        assert time.monotonic() - start < 1.5
@@ -0,0 +1,60 @@
+# tests/test_00_conftest_05_prefetch.py
+#
+# `CommandPrefetcher` の確認用テストプログラム
+#
+import pytest
+
+from . import _testbase_cli
+from ._testbase_cli import ENV_PREFETCH_WORKERS, CommandPrefetcher
+
+SAMPLE1 = ["uv", "run", "samples/sample1-simple.py"]
+
+
+@pytest.fixture
+def prefetcher(monkeypatch):
+    p = CommandPrefetcher()
+    monkeypatch.setattr(_testbase_cli, "prefetcher", p)
+    yield p
+    p.shutdown()
+
+
+class TestPrefetcher:
+    """`CommandPrefetcher` のテスト。"""
+
+    def test_dedup(self, prefetcher):
+        prefetcher.submit(["echo", "a"])
+        prefetcher.submit(["echo", "a"])
+        prefetcher.submit(["echo", "a"], input_data="x")
+        prefetcher.submit(SAMPLE1)
+        prefetcher.submit(SAMPLE1)
+        assert len(prefetcher) == 3
+
+    def test_subprocess(self, prefetcher, cli_runner, capsys):
+        prefetcher.submit(["echo", "Hello"])
+        result = cli_runner.run_command(["echo", "Hello"])
+        assert "backend = prefetched" in capsys.readouterr().out
+        assert result.stdout == "Hello\n"
+        assert result.returncode == 0
+
+    def test_in_process(self, prefetcher, cli_runner, capsys):
+        prefetcher.submit(SAMPLE1 + ["-d"])
+        result = cli_runner.run_command(SAMPLE1, "-d")
+        assert "backend = prefetched" in capsys.readouterr().out
+        assert "Hello, world!" in result.stdout
+        assert "[DEBUG] " in result.stdout
+
+    def test_in_process_false(self, prefetcher, cli_runner, capsys):
+        """`uv run` を省いた結果は、`in_process=False` では使わない。"""
+        prefetcher.submit(SAMPLE1)
+        cli_runner.run_command(SAMPLE1, in_process=False)
+        assert "backend = prefetched" not in capsys.readouterr().out
+
+    def test_not_prefetched(self, prefetcher, cli_runner, capsys):
+        prefetcher.submit(["echo", "a"])
+        cli_runner.run_command(["echo", "b"])
+        assert "backend = prefetched" not in capsys.readouterr().out
+
+    def test_disabled(self, prefetcher, monkeypatch):
+        monkeypatch.setenv(ENV_PREFETCH_WORKERS, "0")
+        prefetcher.submit(["echo", "a"])
+        assert len(prefetcher) == 0
@@ -10,6 +10,7 @@ SAMPLE = [
     "sample2-arg-opt.py",
     "sample3-subs.py",
     "sample4-async.py",
+    "sample5-lazy.py",
 ]
 SAMPLE_CMD = [
     "__dummy__",
@@ -21,9 +22,19 @@ SAMPLE_CMD = [
         f"{SAMPLE[3]} sub subsub",
     ],
     f"{SAMPLE[4]}",
+    [
+        f"{SAMPLE[5]}",
+        f"{SAMPLE[5]} hello",
+        f"{SAMPLE[5]} bye",
+    ],
 ]
 
 
+def sample_invocation(cmd, opt, **_params) -> dict:
+    """Arguments of `run_command()` for the parameters (prefetch)."""
+    return {"command": f"uv run {SAMPLES_DIR}/{cmd}", "args": opt}
+
+
 @pytest.fixture(autouse=True)
 def setup_and_teardown():
     yield
@@ -31,6 +42,7 @@ def setup_and_teardown():
 
 class TestSamples:
     """test sample programs"""
+    @pytest.mark.cli_prefetch(build=sample_invocation)
     @pytest.mark.parametrize(
         "cmd, opt, expected_stdout, expected_stderr, returncode",
         [
@@ -175,15 +187,43 @@ class TestSamples:
                 [],
                 0
             ),
+            (
+                SAMPLE_CMD[5][0], "-h",
+                [
+                    f"Usage: {SAMPLE[5]}",
+                    "Commands:",
+                    "hello  Say hello.",
+                    "bye    Say good-bye.",
+                ],
+                [],
+                0
+            ),
+            (
+                SAMPLE_CMD[5][1], "",
+                ["Hello, lazy world"],
+                [],
+                0
+            ),
+            (
+                SAMPLE_CMD[5][1], "-V",
+                [f"{SAMPLE[5]} 5.1.0"],
+                [],
+                0
+            ),
+            (
+                SAMPLE_CMD[5][2], "-d",
+                ["[DEBUG] ", "Good-bye, lazy world"],
+                [],
+                0
+            ),
         ],
     )
     def test_common_options(
             self, cli_runner, cmd, opt, expected_stdout, expected_stderr, returncode
     ):
         """test common options"""
-        cmdline = f"uv run {SAMPLES_DIR}/{cmd}"
         cli_runner.test_command(
-            cmdline, opt,
+            **sample_invocation(cmd, opt),
             e_stdout=expected_stdout,
             e_stderr=expected_stderr,
             e_ret=returncode
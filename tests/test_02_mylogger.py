@@ -0,0 +1,317 @@
+# tests/test_02_mylogger.py
+#
+# `get_logger()` のテスト
+#
+import json
+import tracemalloc
+import weakref
+from logging import DEBUG, INFO, Formatter, StreamHandler, getLogger
+
+import pytest
+
+from pyclickutils import get_logger, logfilter
+from pyclickutils.logfilter import FloodFilter
+from pyclickutils.logjson import JsonFormatter
+from pyclickutils.mylogger import _StderrHandler
+
+
+def own_handlers(log):
+    """pytest が追加するハンドラーを除く。"""
+    return [h for h in log.handlers if isinstance(h, _StderrHandler)]
+
+
+class TestGetLogger:
+    """`get_logger()` の基本動作。"""
+
+    def test_name(self):
+        """ロガー名は `呼び出し元ファイル名.name`。"""
+        log = get_logger("name1")
+        assert log.name == "test_02_mylogger.py.name1"
+
+    def test_cached(self):
+        """同じ引数なら、設定済みのロガーを返す。"""
+        log1 = get_logger("cached")
+        handlers = own_handlers(log1)
+        log2 = get_logger("cached")
+        assert log1 is log2
+        assert own_handlers(log2) == handlers
+
+    @pytest.mark.parametrize(
+        "debug, level",
+        [
+            (False, INFO),
+            (True, DEBUG),
+            (DEBUG, DEBUG),
+            (30, 30),
+        ],
+    )
+    def test_level(self, debug, level):
+        """`debug` 引数によるレベル設定。"""
+        log = get_logger("level", debug)
+        assert log.level == level
+        assert len(own_handlers(log)) == 1
+
+    def test_level_switch(self):
+        """キャッシュされていても、レベルは切り替わる。"""
+        log = get_logger("switch", True)
+        assert log.level == DEBUG
+        get_logger("switch", False)
+        assert log.level == INFO
+        get_logger("switch", True)
+        assert log.level == DEBUG
+
+    def test_invalid_debug(self):
+        """不正な `debug` 値。"""
+        with pytest.raises(ValueError):
+            get_logger("invalid", "yes")  # type: ignore[arg-type]
+
+    def test_stderr(self, capsys):
+        """差し替えられた `sys.stderr` に出力される。"""
+        log = get_logger("stderr", True)
+        log.debug("hello %s", "world")
+        err = capsys.readouterr().err
+        assert "DEBUG test_02_mylogger.py.stderr.test_stderr:" in err
+        assert "hello world" in err
+
+
+N_LOGGERS = 200
+
+
+def measure_alloc(func) -> tuple[int, int]:
+    """`func()` によるメモリ割り当て (size, count) を計測する。"""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        func()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    stats = after.compare_to(before, "filename")
+    return (
+        sum(_s.size_diff for _s in stats),
+        sum(_s.count_diff for _s in stats),
+    )
+
+
+class TestHandlerPool:
+    """共有ハンドラーのプールのテスト。"""
+
+    def test_shared(self):
+        """同じフォーマットのロガーは、ハンドラーを共有する。"""
+        handlers = {
+            id(h)
+            for i in range(10)
+            for h in own_handlers(get_logger(f"shared{i}"))
+        }
+        assert len(handlers) == 1
+
+    def test_reconfigure_keeps_pool(self):
+        """再設定しても、プールのハンドラーは破棄されない。"""
+        handler = own_handlers(get_logger("reconf", True))[0]
+        log = get_logger("reconf", False)  # 別のキー → 再設定
+        assert own_handlers(log) == [handler]
+
+    def test_alloc(self):
+        """ロガーごとにハンドラーを作る場合より、割り当てが少ない。"""
+
+        def per_logger_handlers():
+            fmt = "%(asctime)s %(levelname)s %(name)s> %(message)s"
+            for i in range(N_LOGGERS):
+                logger = getLogger(f"per_logger{i}")
+                logger.propagate = False
+                handler = StreamHandler()
+                handler.setFormatter(Formatter(fmt))
+                logger.addHandler(handler)
+
+        def pooled_handlers():
+            for i in range(N_LOGGERS):
+                get_logger(f"pooled{i}")
+
+        legacy = measure_alloc(per_logger_handlers)
+        pooled = measure_alloc(pooled_handlers)
+        print(f"per-logger handlers: {legacy[0]} bytes, {legacy[1]} blocks")
+        print(f"pooled handlers    : {pooled[0]} bytes, {pooled[1]} blocks")
+        assert pooled[0] < legacy[0]
+        assert pooled[1] < legacy[1]
+
+
+class TestJsonFormat:
+    """JSON lines 形式 (`fmt="json"`) のテスト。"""
+
+    def test_fields(self, capsys):
+        """標準のフィールドと、追加のフィールド。"""
+        log = get_logger("json", True, fmt="json", extra_fields=("user",))
+        log.info("hello %s", "world", extra={"user": "アリス", "x": 1})
+
+        data = json.loads(capsys.readouterr().err)
+        assert list(data) == [
+            "time", "level", "name", "func", "line", "msg", "user"
+        ]
+        assert data["level"] == "INFO"
+        assert data["name"] == "test_02_mylogger.py.json"
+        assert data["func"] == "test_fields"
+        assert isinstance(data["line"], int)
+        assert data["msg"] == "hello world"
+        assert data["user"] == "アリス"
+
+    def test_exception(self, capsys):
+        """例外の情報は "exc" に出力する。"""
+        log = get_logger("json_exc", fmt="json")
+        try:
+            raise ValueError("bad value")
+        except ValueError:
+            log.exception("failed")
+
+        data = json.loads(capsys.readouterr().err)
+        assert data["msg"] == "failed"
+        assert "ValueError: bad value" in data["exc"]
+
+    @pytest.mark.parametrize(
+        "value, expected",
+        [
+            (1, 1),
+            (1.5, 1.5),
+            (None, None),
+            ([1, "a"], [1, "a"]),
+            (float("nan"), "nan"),
+            (float("-inf"), "-inf"),
+            ([float("inf")], "[inf]"),
+        ],
+    )
+    def test_extra_types(self, value, expected):
+        """追加のフィールドの型。"""
+        fmt = JsonFormatter(fields=("msg",), extra_fields=("v",))
+        log = getLogger("json_types")
+        record = log.makeRecord(
+            log.name, INFO, "f.py", 1, "m", (), None, extra={"v": value}
+        )
+        assert json.loads(fmt.format(record)) == {"msg": "m", "v": expected}
+
+    def test_switch_format(self):
+        """同じ名前で、フォーマットを切り替える。"""
+        text = own_handlers(get_logger("switch_fmt"))
+        json_ = own_handlers(get_logger("switch_fmt", fmt="json"))
+        assert text != json_
+        assert own_handlers(get_logger("switch_fmt")) == text
+
+    def test_invalid(self):
+        """不正な `fmt` とフィールド。"""
+        with pytest.raises(ValueError):
+            get_logger("invalid_fmt", fmt="xml")
+        with pytest.raises(ValueError):
+            JsonFormatter(fields=("no_such_field",))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(logfilter.time, "monotonic", clock)
+    # 終了時のまとめの出力の対象にしない
+    monkeypatch.setattr(logfilter, "_filters", weakref.WeakSet())
+    return clock
+
+
+def flood_filter(log):
+    return [f for f in log.filters if isinstance(f, FloodFilter)]
+
+
+class TestFloodFilter:
+    """`rate_limit` と `sample` のテスト。"""
+
+    def test_sample(self, capsys, clock):
+        """N 件に 1 件だけ出力し、抑制した数をまとめて出力する。"""
+        log = get_logger("sample", True, sample=10)
+        for i in range(100):
+            log.debug("item %d", i)
+
+        lines = capsys.readouterr().err.splitlines()
+        assert len(lines) == 10
+        assert lines[1].endswith("item 10")
+
+        flood_filter(log)[0].flush()
+        err = capsys.readouterr().err
+        assert "DEBUG test_02_mylogger.py.sample.test_sample:" in err
+        assert "suppressed 90 similar messages: 'item %d'" in err
+
+    def test_rate_limit(self, capsys, clock):
+        """トークンバケット: 1秒あたり `rate_limit` 件。"""
+        log = get_logger("rate", True, rate_limit=2)
+        for _ in range(10):
+            log.warning("hot %s", "loop")
+        assert len(capsys.readouterr().err.splitlines()) == 2
+
+        clock.now += 1.0
+        for _ in range(10):
+            log.warning("hot %s", "loop")
+        assert len(capsys.readouterr().err.splitlines()) == 2
+
+    def test_call_sites(self, capsys, clock):
+        """呼び出し元とフォーマット文字列ごとに数える。"""
+        log = get_logger("sites", True, rate_limit=1)
+        for _ in range(5):
+            log.info("a")
+            log.info("b")
+        for msg in ("c", "d"):
+            log.info(msg)
+        assert len(capsys.readouterr().err.splitlines()) == 4
+
+    def test_periodic_summary(self, capsys, clock):
+        """一定間隔ごとに、まとめを出力する。"""
+        log = get_logger("periodic", True, rate_limit=1)
+        for i in range(10):
+            if i == 5:
+                clock.now += logfilter.SUMMARY_INTERVAL
+            log.info("flood")
+            if i == 4:
+                assert "suppressed" not in capsys.readouterr().err
+
+        # 間隔を過ぎた後の最初のメッセージで、まとめを出力する
+        err = capsys.readouterr().err
+        assert "suppressed 4 similar messages: 'flood'" in err
+        assert err.count("> flood") == 1
+
+    def test_max_sites(self, capsys, clock, monkeypatch):
+        """呼び出し元の数は上限まで。捨てる前に、まとめを出力する。"""
+        monkeypatch.setattr(logfilter, "MAX_SITES", 4)
+        log = get_logger("max_sites", True, rate_limit=1)
+        for i in range(20):
+            for _ in range(3):
+                log.info(f"item {i}")  # すべて別のメッセージ
+            clock.now += 0.01
+        assert len(flood_filter(log)[0]._sites) <= 4
+
+        flood_filter(log)[0].flush()
+        err = capsys.readouterr().err
+        assert err.count("suppressed 2 similar messages") == 20
+
+    def test_level(self, capsys, clock):
+        """レベルで捨てられるメッセージは数えない。"""
+        log = get_logger("flood_level", False, sample=2)
+        for _ in range(10):
+            log.debug("debug")
+        log.info("info")
+        assert capsys.readouterr().err.count("info") == 1
+        flood_filter(log)[0].flush()
+        assert capsys.readouterr().err == ""
+
+    def test_reconfigure(self):
+        """オプションなしで取得し直すと、フィルターを外す。"""
+        assert len(flood_filter(get_logger("flood_re", sample=3))) == 1
+        assert len(flood_filter(get_logger("flood_re", rate_limit=3))) == 1
+        assert flood_filter(get_logger("flood_re")) == []
+
+    @pytest.mark.parametrize(
+        "kwargs", [{}, {"rate": 0}, {"sample": 0}, {"rate": -1.0}]
+    )
+    def test_invalid(self, kwargs):
+        with pytest.raises(ValueError):
+            FloodFilter(**kwargs)
@@ -0,0 +1,132 @@
+# tests/test_03_logqueue.py
+#
+# キューを使ったロギング (`enable_queue_logging()`) のテスト
+#
+import json
+import multiprocessing
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from pyclickutils import (
+    disable_queue_logging,
+    enable_queue_logging,
+    get_logger,
+    init_worker_logging,
+    worker_log_queue,
+)
+from pyclickutils.logqueue import _EnqueueHandler
+
+
+def worker(n):
+    """ワーカープロセスでログを出力する。"""
+    log = get_logger("worker", True)
+    log.debug("worker %d", n)
+    return n
+
+
+def json_worker(n):
+    """ワーカープロセスで JSON のログを出力する。"""
+    log = get_logger("json_worker", True, fmt="json")
+    log.debug("json worker %d", n)
+    return n
+
+
+@pytest.fixture
+def queue_logging():
+    enable_queue_logging()
+    yield
+    disable_queue_logging()
+
+
+class TestQueueLogging:
+    """キューモードのテスト。"""
+
+    def test_enqueue(self, capsys, queue_logging):
+        """キューを経由して、順番どおりに出力される。"""
+        log = get_logger("enqueue", True)
+        assert any(isinstance(h, _EnqueueHandler) for h in log.handlers)
+
+        for i in range(1000):
+            log.debug("line %04d", i)
+        disable_queue_logging()
+
+        err = capsys.readouterr().err
+        lines = [_l for _l in err.splitlines() if "line " in _l]
+        assert len(lines) == 1000
+        assert lines[0].endswith("line 0000")
+        assert lines[-1].endswith("line 0999")
+
+    def test_swap_existing(self, capsys):
+        """有効化の前に作られたロガーもキューを使う。"""
+        log = get_logger("existing", True)
+        enable_queue_logging()
+        assert any(isinstance(h, _EnqueueHandler) for h in log.handlers)
+
+        disable_queue_logging()
+        assert not any(isinstance(h, _EnqueueHandler) for h in log.handlers)
+
+        log.debug("direct")
+        assert "direct" in capsys.readouterr().err
+
+    @pytest.mark.parametrize("method", ["fork", "spawn"])
+    def test_worker(self, capsys, queue_logging, method):
+        """ワーカープロセスのログが親プロセスで出力される。"""
+        if method not in multiprocessing.get_all_start_methods():
+            pytest.skip(f"{method} is not available")
+
+        mp_context = multiprocessing.get_context(method)
+        q = worker_log_queue(mp_context)
+        with ProcessPoolExecutor(
+            max_workers=2,
+            mp_context=mp_context,
+            initializer=init_worker_logging,
+            initargs=(q,),
+        ) as pool:
+            assert list(pool.map(worker, range(4))) == [0, 1, 2, 3]
+        disable_queue_logging()
+
+        err = capsys.readouterr().err
+        for n in range(4):
+            assert f"worker {n}" in err
+
+    @pytest.mark.parametrize("method", ["fork", "spawn"])
+    def test_worker_json(self, capsys, queue_logging, method):
+        """ワーカープロセスのフォーマット (JSON) のまま出力される。"""
+        if method not in multiprocessing.get_all_start_methods():
+            pytest.skip(f"{method} is not available")
+
+        mp_context = multiprocessing.get_context(method)
+        q = worker_log_queue(mp_context)
+        with ProcessPoolExecutor(
+            max_workers=2,
+            mp_context=mp_context,
+            initializer=init_worker_logging,
+            initargs=(q,),
+        ) as pool:
+            assert list(pool.map(json_worker, range(4))) == [0, 1, 2, 3]
+        disable_queue_logging()
+
+        err = capsys.readouterr().err
+        lines = [_l for _l in err.splitlines() if "json worker" in _l]
+        assert len(lines) == 4
+        msgs = sorted(json.loads(_l)["msg"] for _l in lines)
+        assert msgs == [f"json worker {n}" for n in range(4)]
+
+    def test_flush_at_exit(self):
+        """終了時に、キューに残ったレコードが出力される。"""
+        code = (
+            "from pyclickutils import enable_queue_logging, get_logger\n"
+            "enable_queue_logging()\n"
+            "log = get_logger('atexit', True)\n"
+            "for i in range(500):\n"
+            "    log.debug('exit %d', i)\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True
+        )
+        assert result.returncode == 0
+        assert result.stderr.count("exit ") == 500
+        assert "exit 499" in result.stderr
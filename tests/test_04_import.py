@@ -0,0 +1,84 @@
+# tests/test_04_import.py
+#
+# `import pyclickutils` の起動コストのテスト
+#
+#   予算は環境変数 `PYCLICKUTILS_IMPORT_BUDGET_US` (マイクロ秒) で変更可能。
+#
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+import pyclickutils
+
+IMPORT_BUDGET_US = int(os.environ.get("PYCLICKUTILS_IMPORT_BUDGET_US", 20000))
+
+# `import pyclickutils` だけでは読み込まれないはずのモジュール
+HEAVY_MODULES = ["click", "importlib.metadata", "logging", "inspect"]
+
+
+def run_python(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args], capture_output=True, text=True, check=True
+    )
+
+
+class TestLazyImport:
+    """遅延 import のテスト。"""
+
+    def test_no_heavy_modules(self):
+        """重いモジュールを import しない。"""
+        code = (
+            "import sys, pyclickutils\n"
+            f"print([m for m in {HEAVY_MODULES!r} if m in sys.modules])\n"
+        )
+        result = run_python("-c", code)
+        assert result.stdout.strip() == "[]"
+
+    def test_importtime_budget(self):
+        """`python -X importtime` の累積時間が予算内。"""
+        # バイトコードのキャッシュを作るため、一度 import しておく
+        env = dict(os.environ, PYTHONDONTWRITEBYTECODE="")
+        subprocess.run(
+            [sys.executable, "-c", "import pyclickutils"], env=env, check=True
+        )
+
+        cmdline = [sys.executable, "-X", "importtime", "-c"]
+        times = []
+        for _ in range(3):
+            result = subprocess.run(
+                cmdline + ["import pyclickutils"],
+                capture_output=True,
+                text=True,
+                env=env,
+                check=True,
+            )
+            m = re.search(
+                r"^import time:\s+\d+ \|\s+(\d+) \| pyclickutils$",
+                result.stderr,
+                re.MULTILINE,
+            )
+            assert m, result.stderr
+            times.append(int(m.group(1)))
+
+        print(f"import time: {times} us (budget: {IMPORT_BUDGET_US} us)")
+        assert min(times) < IMPORT_BUDGET_US
+
+    @pytest.mark.parametrize("name", pyclickutils.__all__)
+    def test_attrs(self, name):
+        """`__all__` の名前は、すべて参照できる。"""
+        assert getattr(pyclickutils, name) is not None
+        assert name in dir(pyclickutils)
+
+    def test_version(self):
+        """`__version__` は一度だけ求めて、キャッシュする。"""
+        version = pyclickutils.__version__
+        assert isinstance(version, str)
+        assert vars(pyclickutils)["__version__"] == version
+
+    def test_unknown_attr(self):
+        """存在しない属性。"""
+        with pytest.raises(AttributeError):
+            pyclickutils.no_such_attr  # noqa: B018
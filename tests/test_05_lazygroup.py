@@ -0,0 +1,97 @@
+# tests/test_05_lazygroup.py
+#
+# `LazyGroup` のテスト
+#
+import sys
+
+import click
+import pytest
+from click.testing import CliRunner
+
+from pyclickutils import LazyGroup, click_common_opts
+
+SUBCMDS_CODE = '''
+import click
+
+from pyclickutils import click_common_opts
+
+
+@click.command()
+@click_common_opts("1.0.0")
+def sub1(ctx, debug):
+    """Subcommand #1 (loaded)."""
+    print("sub1 called")
+'''
+
+
+@pytest.fixture
+def subcmds_module(tmp_path, monkeypatch):
+    """一時的なサブコマンド用モジュール。"""
+    name = f"lazy_subcmds_{tmp_path.name}"
+    (tmp_path / f"{name}.py").write_text(SUBCMDS_CODE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield name
+    sys.modules.pop(name, None)
+
+
+def make_cli(module_name):
+    @click.group(
+        cls=LazyGroup,
+        lazy_subcommands={
+            "sub1": (f"{module_name}:sub1", "Subcommand #1 (mapping)."),
+            "sub2": f"{module_name}:no_such_command",
+        },
+    )
+    @click_common_opts("0.0.0")
+    def cli(ctx, debug):
+        pass
+
+    @cli.command()
+    def eager():
+        """Eager subcommand."""
+
+    return cli
+
+
+class TestLazyGroup:
+    """`LazyGroup` のテスト。"""
+
+    def test_help_does_not_import(self, subcmds_module):
+        """グループの `--help` ではサブコマンドを import しない。"""
+        result = CliRunner().invoke(make_cli(subcmds_module), ["--help"])
+        assert result.exit_code == 0
+        assert "eager" in result.output
+        assert "sub1" in result.output
+        assert "Subcommand #1 (mapping)." in result.output
+        assert "sub2" in result.output
+        assert subcmds_module not in sys.modules
+
+    def test_invoke_imports(self, subcmds_module):
+        """実行時に import される。"""
+        result = CliRunner().invoke(make_cli(subcmds_module), ["sub1"])
+        assert result.exit_code == 0
+        assert "sub1 called" in result.output
+        assert subcmds_module in sys.modules
+
+    def test_subcommand_help(self, subcmds_module):
+        """サブコマンドの `--help` では import される。"""
+        cli = make_cli(subcmds_module)
+        result = CliRunner().invoke(cli, ["sub1", "-h"])
+        assert result.exit_code == 0
+        assert "Subcommand #1 (loaded)." in result.output
+
+        # ロード済みなら、実際のコマンドの short help を使う
+        result = CliRunner().invoke(cli, ["-h"])
+        assert "Subcommand #1 (loaded)." in result.output
+
+    def test_bad_attr(self, subcmds_module):
+        """存在しない属性。"""
+        result = CliRunner().invoke(make_cli(subcmds_module), ["sub2"])
+        assert isinstance(result.exception, AttributeError)
+
+    @pytest.mark.parametrize("path", ["no_colon", ":attr", "module:"])
+    def test_bad_import_path(self, path):
+        """不正な import path。"""
+        cli = LazyGroup(lazy_subcommands={"bad": path})
+        with pytest.raises(ValueError):
+            cli.get_command(click.Context(cli), "bad")
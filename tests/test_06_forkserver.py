@@ -0,0 +1,156 @@
+# tests/test_06_forkserver.py
+#
+# フォークサーバー (`pyclickutils.forkserver`) のテスト
+#
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+pytestmark = pytest.mark.skipif(
+    not hasattr(socket, "AF_UNIX") or not hasattr(os, "fork"),
+    reason="requires UNIX domain sockets and fork",
+)
+
+CLI_CODE = '''
+import os
+import sys
+
+import click
+
+from pyclickutils import click_common_opts
+
+
+@click.group()
+@click_common_opts("1.2.3")
+def cli(ctx, debug):
+    pass
+
+
+@cli.command()
+@click.argument("code", type=int, default=0)
+@click_common_opts("1.2.3")
+def env(ctx, code, debug):
+    print(f"cwd={os.getcwd()}")
+    print(f"FOO={os.environ.get('FOO')}")
+    print(f"stdin={sys.stdin.read()!r}")
+    print("to stderr", file=sys.stderr)
+    ctx.exit(code)
+
+
+@cli.command()
+@click_common_opts("1.2.3")
+def fail(ctx, debug):
+    raise RuntimeError("boom")
+'''
+
+
+@pytest.fixture
+def server(tmp_path):
+    """サーバーを起動して、ソケットのパスを返す。"""
+    (tmp_path / "fs_cli.py").write_text(CLI_CODE)
+    sock_path = str(tmp_path / "fs.sock")
+    env = dict(os.environ, PYTHONPATH=str(tmp_path))
+    proc = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "pyclickutils.forkserver",
+            "serve",
+            sock_path,
+            "fs_cli:cli",
+            "--prog-name",
+            "mytool",
+        ],
+        env=env,
+    )
+
+    limit = time.monotonic() + 10
+    while not os.path.exists(sock_path):
+        assert proc.poll() is None
+        assert time.monotonic() < limit
+        time.sleep(0.01)
+
+    yield sock_path
+
+    proc.terminate()
+    proc.wait(timeout=5)
+    assert not os.path.exists(sock_path)
+
+
+def call(sock_path, args, **kwargs) -> subprocess.CompletedProcess:
+    cmdline = [sys.executable, "-m", "pyclickutils.forkserver", "call"]
+    return subprocess.run(
+        cmdline + [sock_path, *args],
+        capture_output=True,
+        text=True,
+        timeout=10,
+        **kwargs,
+    )
+
+
+class TestForkServer:
+    """フォークサーバーのテスト。"""
+
+    def test_env_cwd_stdio(self, server, tmp_path):
+        """環境変数, cwd, 標準入出力がクライアントのものになる。"""
+        workdir = tmp_path / "work"
+        workdir.mkdir()
+        result = call(
+            server,
+            ["env", "3"],
+            cwd=workdir,
+            env=dict(os.environ, FOO="bar"),
+            input="hello",
+        )
+        assert result.returncode == 3
+        assert f"cwd={workdir}" in result.stdout
+        assert "FOO=bar" in result.stdout
+        assert "stdin='hello'" in result.stdout
+        assert "to stderr" in result.stderr
+
+    @pytest.mark.parametrize(
+        "args, e_stdout, e_stderr, e_ret",
+        [
+            (["-V"], "mytool 1.2.3", "", 0),
+            (["--help"], "Usage: mytool [OPTIONS]", "", 0),
+            (["--no-such-opt"], "", "No such option", 2),
+            (["fail"], "", "RuntimeError: boom", 1),
+        ],
+    )
+    def test_exit_code(self, server, args, e_stdout, e_stderr, e_ret):
+        """ワーカーの出力と終了コード。"""
+        result = call(server, args)
+        assert result.returncode == e_ret
+        assert e_stdout in result.stdout
+        assert e_stderr in result.stderr
+
+    def test_socket_mode(self, server):
+        """ソケットは、サーバーのユーザーだけが使える。"""
+        assert os.stat(server).st_mode & 0o777 == 0o600
+
+    def test_worker_error(self, server):
+        """ワーカーの準備で失敗すると、traceback を出力する。"""
+        code = (
+            "import os, sys\n"
+            "from pyclickutils import forkserver\n"
+            "os.getcwd = lambda: '/no/such/dir'\n"
+            f"sys.exit(forkserver.main(['call', {server!r}, '-V']))\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            timeout=10,
+        )
+        assert result.returncode == 1
+        assert "Traceback" in result.stderr
+        assert "FileNotFoundError" in result.stderr
+
+    def test_no_server(self, tmp_path):
+        """サーバーがない場合は、エラーになる。"""
+        result = call(str(tmp_path / "none.sock"), ["-V"])
+        assert result.returncode != 0
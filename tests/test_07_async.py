@@ -0,0 +1,106 @@
+# tests/test_07_async.py
+#
+# `async def` のコールバックのテスト
+#
+import asyncio
+import threading
+import time
+
+import click
+import pytest
+from click.testing import CliRunner
+
+from pyclickutils import click_common_opts
+from pyclickutils.pyclickutils import RUNNER_KEY
+
+
+def make_cli(record: dict, async_workers=None):
+    @click.group()
+    @click_common_opts("1.0.0", async_workers=async_workers)
+    async def cli(ctx, debug):
+        record["cli"] = asyncio.get_running_loop()
+        record["runner"] = ctx.meta[RUNNER_KEY]
+        await asyncio.sleep(0)
+
+    @cli.command()
+    @click.argument("n", type=int)
+    @click_common_opts("1.0.0")
+    async def sub(ctx, n, debug):
+        loop = asyncio.get_running_loop()
+        record["sub"] = loop
+        print(sum(await asyncio.gather(*(double(i) for i in range(n)))))
+
+    @cli.command()
+    @click_common_opts("1.0.0")
+    async def threads(ctx, debug):
+        loop = asyncio.get_running_loop()
+        names = await asyncio.gather(
+            *(loop.run_in_executor(None, blocking) for _ in range(8))
+        )
+        record["threads"] = set(names)
+
+    @cli.command()
+    @click_common_opts("1.0.0")
+    def sync(ctx, debug):
+        print("sync")
+
+    @cli.command()
+    @click_common_opts("1.0.0")
+    async def fail(ctx, debug):
+        raise RuntimeError("boom")
+
+    return cli
+
+
+def blocking():
+    time.sleep(0.01)
+    return threading.current_thread().name
+
+
+async def double(i):
+    await asyncio.sleep(0)
+    return i * 2
+
+
+class TestAsync:
+    """`async def` のコールバック。"""
+
+    def test_shared_loop(self):
+        """グループとサブコマンドで、イベントループを共有する。"""
+        record: dict = {}
+        result = CliRunner().invoke(make_cli(record), ["sub", "4"])
+        assert result.exit_code == 0, result.output
+        assert result.output == "12\n"
+        assert record["cli"] is record["sub"]
+
+        # 実行後は、閉じられている
+        assert record["sub"].is_closed()
+
+    def test_async_workers(self):
+        """デフォルトの executor のスレッド数。"""
+        record: dict = {}
+        result = CliRunner().invoke(
+            make_cli(record, async_workers=2), ["threads"]
+        )
+        assert result.exit_code == 0, result.output
+        assert len(record["threads"]) == 2
+
+    def test_sync_subcommand(self):
+        """同期のサブコマンドと混在できる。"""
+        record: dict = {}
+        result = CliRunner().invoke(make_cli(record), ["sync"])
+        assert result.exit_code == 0
+        assert result.output == "sync\n"
+
+    def test_exception(self):
+        """例外は、そのまま伝わる。"""
+        result = CliRunner().invoke(make_cli({}), ["fail"])
+        assert isinstance(result.exception, RuntimeError)
+
+    @pytest.mark.parametrize("opt", ["-h", "-V"])
+    def test_common_opts(self, opt):
+        """共通オプションは、コールバックを呼ばない。"""
+        record: dict = {}
+        result = CliRunner().invoke(make_cli(record), [opt])
+        assert result.exit_code == 0
+        assert "cli" not in record
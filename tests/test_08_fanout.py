@@ -0,0 +1,97 @@
+# tests/test_08_fanout.py
+#
+# `fan_out()` のテスト
+#
+import multiprocessing
+import sys
+import time
+
+import click
+import pytest
+
+from pyclickutils import click_common_opts, fan_out
+
+SLEEP_SEC = 0.3
+
+
+@click.group()
+@click_common_opts("1.0.0")
+def cli(ctx, debug):
+    pass
+
+
+@cli.command()
+@click.argument("name")
+@click.option("--code", type=int, default=0)
+@click_common_opts("1.0.0")
+def hello(ctx, name, code, debug):
+    time.sleep(SLEEP_SEC)
+    click.echo(f"hello {name}")
+    print(f"err {name}", file=sys.stderr)
+    ctx.exit(code)
+
+
+@cli.command()
+@click_common_opts("1.0.0")
+def fail(ctx, debug):
+    raise RuntimeError("boom")
+
+
+ARGV_LIST = [
+    ["hello", "a"],
+    ["hello", "b", "--code", "3"],
+    ["hello", "c"],
+    ["hello", "d"],
+]
+
+
+class TestFanOut:
+    """`fan_out()` のテスト。"""
+
+    @pytest.mark.parametrize(
+        "mode, cli_",
+        [
+            ("thread", cli),
+            ("thread", f"{__name__}:cli"),
+            ("process", cli),
+            ("process", f"{__name__}:cli"),
+        ],
+    )
+    def test_fan_out(self, mode, cli_):
+        """並行に実行し、出力と終了コードを別々に集める。"""
+        if mode == "process" and not isinstance(cli_, str):
+            if "fork" not in multiprocessing.get_all_start_methods():
+                pytest.skip("fork is not available")
+
+        start = time.monotonic()
+        results = fan_out(cli_, ARGV_LIST, mode=mode, max_workers=4)
+        elapsed = time.monotonic() - start
+
+        assert [r.args for r in results] == ARGV_LIST
+        assert [r.returncode for r in results] == [0, 3, 0, 0]
+        for r, name in zip(results, "abcd"):
+            assert r.stdout == f"hello {name}\n"
+            assert r.stderr == f"err {name}\n"
+
+        # 順番に実行した場合より速い
+        assert elapsed < SLEEP_SEC * len(ARGV_LIST)
+
+    def test_errors(self):
+        """エラーの終了コードと stderr。"""
+        results = fan_out(cli, [["--no-such-opt"], ["fail"]])
+        assert results[0].returncode == 2
+        assert "No such option" in results[0].stderr
+        assert results[1].returncode == 1
+        assert "RuntimeError: boom" in results[1].stderr
+
+    def test_streams_restored(self):
+        """実行後は、sys.stdout, sys.stderr が元に戻る。"""
+        stdout, stderr = sys.stdout, sys.stderr
+        fan_out(cli, [["hello", "x"]])
+        assert sys.stdout is stdout
+        assert sys.stderr is stderr
+
+    def test_invalid_mode(self):
+        """不正な mode。"""
+        with pytest.raises(ValueError):
+            fan_out(cli, [["hello", "x"]], mode="async")
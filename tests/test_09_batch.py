@@ -0,0 +1,126 @@
+# tests/test_09_batch.py
+#
+# バッチモードのテスト
+#
+import io
+import json
+
+import click
+from click.testing import CliRunner
+
+from pyclickutils import click_common_opts, run_batch
+from pyclickutils.batch import main as batch_main
+
+
+@click.group()
+@click_common_opts("1.0.0", use_batch=True)
+def cli(ctx, debug):
+    # 行ごとに新しいコンテキストになっていることを確認する
+    assert ctx.obj is None
+    ctx.obj = {"debug": debug}
+
+
+@cli.command()
+@click.argument("name")
+@click.option("--code", type=int, default=0)
+@click_common_opts("1.0.0")
+def hello(ctx, name, code, debug):
+    click.echo(f"hello {name}")
+    ctx.exit(code)
+
+
+@cli.command()
+@click_common_opts("1.0.0")
+def fail(ctx, debug):
+    raise RuntimeError("boom")
+
+
+LINES = """\
+# comment
+hello a
+
+hello 'b c' --code 3
+fail
+hello "unterminated
+"""
+
+
+def parse(output: str) -> list[dict]:
+    return [json.loads(line) for line in output.splitlines()]
+
+
+class TestRunBatch:
+    """`run_batch()` のテスト。"""
+
+    def test_results(self):
+        out = io.StringIO()
+        code = run_batch(cli, io.StringIO(LINES), out, prog_name="cli")
+        assert code == 1
+
+        results = parse(out.getvalue())
+        assert [r["line"] for r in results] == [2, 4, 5, 6]
+        assert [r["returncode"] for r in results] == [0, 3, 1, 2]
+
+        assert results[0]["args"] == ["hello", "a"]
+        assert results[0]["stdout"] == "hello a\n"
+        assert results[1]["args"] == ["hello", "b c", "--code", "3"]
+        assert results[1]["stdout"] == "hello b c\n"
+        assert "RuntimeError: boom" in results[2]["stderr"]
+        assert results[3]["args"] is None
+        assert all(r["elapsed"] >= 0 for r in results)
+
+    def test_all_success(self):
+        out = io.StringIO()
+        lines = ["hello x\n", "hello y\n", "--version\n"]
+        assert run_batch(cli, lines, out, prog_name="cli") == 0
+        results = parse(out.getvalue())
+        assert results[2]["stdout"] == "cli 1.0.0\n"
+
+    def test_usage_error(self):
+        out = io.StringIO()
+        assert run_batch(cli, ["nosuchcmd\n"], out) == 1
+        (result,) = parse(out.getvalue())
+        assert result["returncode"] == 2
+        assert "No such command" in result["stderr"]
+
+
+class TestBatchOption:
+    """`--batch` オプションのテスト。"""
+
+    def test_stdin(self):
+        result = CliRunner().invoke(
+            cli, ["--batch", "-"], input="hello a\nhello b\n"
+        )
+        assert result.exit_code == 0
+        results = parse(result.output)
+        assert [r["stdout"] for r in results] == ["hello a\n", "hello b\n"]
+
+    def test_file(self, tmp_path):
+        path = tmp_path / "cmds.txt"
+        path.write_text("hello a\nhello b --code 1\n")
+        result = CliRunner().invoke(cli, ["--batch", str(path)])
+        assert result.exit_code == 1
+        assert [r["returncode"] for r in parse(result.output)] == [0, 1]
+
+    def test_help(self):
+        result = CliRunner().invoke(cli, ["--help"])
+        assert "--batch FILE" in result.output
+
+    def test_not_added_by_default(self):
+        result = CliRunner().invoke(cli, ["hello", "--batch", "-"])
+        assert result.exit_code == 2
+
+
+class TestMain:
+    """`python -m pyclickutils.batch` のテスト。"""
+
+    def test_main(self, tmp_path, capsys):
+        path = tmp_path / "cmds.txt"
+        path.write_text("hello a\n")
+        assert batch_main([f"{__name__}:cli", str(path)]) == 0
+        (result,) = parse(capsys.readouterr().out)
+        assert result["stdout"] == "hello a\n"
+
+    def test_usage(self, capsys):
+        assert batch_main([]) == 2
+        assert "Usage" in capsys.readouterr().err
@@ -0,0 +1,107 @@
+# tests/test_10_profile.py
+#
+# `--profile` オプションのテスト
+#
+import pstats
+import time
+
+import click
+from click.testing import CliRunner
+
+from pyclickutils import click_common_opts
+
+
+# 上位 TOP_N 件に入るように、時間をかける
+def group_work():
+    time.sleep(0.05)
+
+
+def sub_work():
+    time.sleep(0.05)
+
+
+@click.group()
+@click_common_opts("1.0.0", use_profile=True)
+def cli(ctx, debug):
+    group_work()
+
+
+@cli.command()
+@click_common_opts("1.0.0", use_profile=True)
+def sub(ctx, debug):
+    sub_work()
+    click.echo("sub done")
+
+
+@cli.command()
+@click_common_opts("1.0.0")
+def fail(ctx, debug):
+    raise ValueError("boom")
+
+
+def func_names(path) -> set[str]:
+    stats = pstats.Stats(str(path))
+    return {func for (_file, _line, func) in stats.stats}  # type: ignore
+
+
+class TestProfile:
+    """`--profile` オプションのテスト。"""
+
+    def test_stderr(self):
+        result = CliRunner().invoke(cli, ["--profile", "-d", "sub"])
+        assert result.exit_code == 0
+        assert result.stdout == "sub done\n"
+        assert "function calls" in result.stderr
+        assert "group_work" in result.stderr
+        assert "sub_work" in result.stderr
+
+    def test_file(self, tmp_path):
+        path = tmp_path / "out.prof"
+        result = CliRunner().invoke(cli, [f"--profile={path}", "sub"])
+        assert result.exit_code == 0
+        assert result.stderr == ""
+
+        names = func_names(path)
+        assert "group_work" in names
+        assert "sub_work" in names
+
+    def test_subcommand_only(self, tmp_path):
+        path = tmp_path / "out.prof"
+        result = CliRunner().invoke(cli, ["sub", "--profile", str(path)])
+        assert result.exit_code == 0
+
+        names = func_names(path)
+        assert "group_work" not in names
+        assert "sub_work" in names
+
+    def test_both_levels(self, tmp_path):
+        """上位のコマンドで開始済みなら、サブコマンドでは何もしない。"""
+        path1 = tmp_path / "1.prof"
+        path2 = tmp_path / "2.prof"
+        result = CliRunner().invoke(
+            cli, [f"--profile={path1}", "sub", f"--profile={path2}"]
+        )
+        assert result.exit_code == 0
+        assert path1.exists()
+        assert not path2.exists()
+
+    def test_exception(self, tmp_path):
+        """例外で終了した場合も、結果を保存する。"""
+        path = tmp_path / "out.prof"
+        result = CliRunner().invoke(cli, [f"--profile={path}", "fail"])
+        assert isinstance(result.exception, ValueError)
+        assert path.exists()
+
+    def test_subcommand_as_path(self):
+        result = CliRunner().invoke(cli, ["--profile", "sub"])
+        assert result.exit_code == 2
+        assert "--profile=-" in result.stderr
+
+    def test_not_given(self):
+        result = CliRunner().invoke(cli, ["sub"])
+        assert result.exit_code == 0
+        assert result.stderr == ""
+
+    def test_help(self):
+        result = CliRunner().invoke(cli, ["--help"])
+        assert "--profile [PATH]" in result.output
@@ -0,0 +1,114 @@
+# tests/test_11_tracemem.py
+#
+# `--trace-mem` オプションのテスト
+#
+import re
+import time
+import tracemalloc
+
+import click
+from click.testing import CliRunner
+
+from pyclickutils import click_common_opts
+
+BIG_SIZE = 4 * 1024 * 1024
+
+_keep = []
+
+
+def allocate_big():
+    data = bytearray(BIG_SIZE)
+    _keep.append(data)
+    return data
+
+
+@click.group()
+@click_common_opts("1.0.0", use_trace_mem=True)
+def cli(ctx, debug):
+    pass
+
+
+@cli.command()
+@click.option("--sleep", type=float, default=0)
+@click_common_opts("1.0.0", use_trace_mem=True)
+def sub(ctx, sleep, debug):
+    data = allocate_big()
+    del data
+    _keep.clear()
+    time.sleep(sleep)
+    click.echo("sub done")
+
+
+def peak_mib(stderr: str) -> float:
+    m = re.search(r"peak ([\d.]+) (\w+)", stderr)
+    assert m is not None
+    assert m.group(2) == "MiB"
+    return float(m.group(1))
+
+
+class TestTraceMem:
+    """`--trace-mem` オプションのテスト。"""
+
+    def test_lineno(self):
+        result = CliRunner().invoke(cli, ["--trace-mem", "-d", "sub"])
+        assert result.exit_code == 0
+        assert result.stdout == "sub done\n"
+
+        # 解放済みでも、最大使用量には残る
+        assert peak_mib(result.stderr) >= BIG_SIZE / 1024 / 1024
+        assert "top 10 by lineno" in result.stderr
+        assert re.search(r"#\d+: .*\.py:\d+: ", result.stderr)
+        assert not tracemalloc.is_tracing()
+
+    def test_filename(self):
+        result = CliRunner().invoke(cli, ["--trace-mem=filename", "sub"])
+        assert result.exit_code == 0
+        assert "top 10 by filename" in result.stderr
+        assert not re.search(r"#\d+: .*\.py:\d+: ", result.stderr)
+
+    def test_subcommand_only(self):
+        result = CliRunner().invoke(cli, ["sub", "--trace-mem"])
+        assert result.exit_code == 0
+        assert result.stderr.count("trace-mem: current") == 1
+
+    def test_both_levels(self):
+        result = CliRunner().invoke(
+            cli, ["--trace-mem", "-d", "sub", "--trace-mem"]
+        )
+        assert result.exit_code == 0
+        assert result.stderr.count("trace-mem: current") == 1
+
+    def test_already_tracing(self):
+        """既に開始されている場合は、止めない。"""
+        tracemalloc.start()
+        try:
+            result = CliRunner().invoke(cli, ["sub", "--trace-mem"])
+            assert result.exit_code == 0
+            assert tracemalloc.is_tracing()
+        finally:
+            tracemalloc.stop()
+
+    def test_bad_key(self):
+        result = CliRunner().invoke(cli, ["--trace-mem", "sub"])
+        assert result.exit_code == 2
+        assert "--trace-mem=lineno" in result.stderr
+
+    def test_interval(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        result = CliRunner().invoke(
+            cli,
+            ["sub", "--trace-mem-interval", "0.05", "--sleep", "0.3"],
+        )
+        assert result.exit_code == 0
+        assert "trace-mem: current" in result.stderr
+
+        files = sorted(tmp_path.glob("trace-mem-*.snapshot"))
+        assert len(files) >= 2
+        snapshot = tracemalloc.Snapshot.load(str(files[0]))
+        assert snapshot.traces
+
+    def test_not_given(self):
+        result = CliRunner().invoke(cli, ["sub"])
+        assert result.exit_code == 0
+        assert result.stderr == ""
+        assert not tracemalloc.is_tracing()
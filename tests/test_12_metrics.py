@@ -0,0 +1,151 @@
+# tests/test_12_metrics.py
+#
+# メトリクスのテスト
+#
+import json
+import multiprocessing
+
+import click
+import pytest
+from click.testing import CliRunner
+
+from pyclickutils import click_common_opts, command_metrics
+from pyclickutils.metrics import record
+from pyclickutils.pyclickutils import METRICS_ENV
+
+
+@click.group()
+@click_common_opts("1.0.0")
+def cli(ctx, debug):
+    command_metrics(ctx).inc("group_calls")
+
+
+@cli.command()
+@click.option("--code", type=int, default=0)
+@click.option("--rows", type=int, default=0)
+@click_common_opts("1.0.0")
+def sub(ctx, code, rows, debug):
+    command_metrics(ctx).inc("rows", rows)
+    ctx.exit(code)
+
+
+@cli.command()
+@click_common_opts("1.0.0")
+def fail(ctx, debug):
+    raise RuntimeError("boom")
+
+
+def samples(path) -> dict[str, float]:
+    """Parse the text format into {"name{labels}": value}."""
+    result = {}
+    for line in path.read_text().splitlines():
+        if line.startswith("#"):
+            continue
+        key, value = line.rsplit(" ", 1)
+        result[key] = float(value)
+    return result
+
+
+@pytest.fixture
+def prom(tmp_path, monkeypatch):
+    path = tmp_path / "cli.prom"
+    monkeypatch.setenv(METRICS_ENV, str(path))
+    return path
+
+
+class TestMetrics:
+    """コマンドのメトリクスのテスト。"""
+
+    def test_invocations(self, prom):
+        runner = CliRunner()
+        assert runner.invoke(cli, ["sub"]).exit_code == 0
+        assert runner.invoke(cli, ["sub"]).exit_code == 0
+        assert runner.invoke(cli, ["sub", "--code", "3"]).exit_code == 3
+        assert runner.invoke(cli, ["fail"]).exit_code == 1
+
+        s = samples(prom)
+        inv = "cli_command_invocations_total"
+        assert s[f'{inv}{{command="cli sub",status="0"}}'] == 2
+        assert s[f'{inv}{{command="cli sub",status="3"}}'] == 1
+        assert s[f'{inv}{{command="cli fail",status="1"}}'] == 1
+
+        wall = "cli_command_wall_seconds"
+        assert s[f'{wall}_count{{command="cli sub"}}'] == 3
+        assert s[f'{wall}_bucket{{command="cli sub",le="+Inf"}}'] == 3
+        assert s[f'{wall}_bucket{{command="cli sub",le="60"}}'] == 3
+        cpu = "cli_command_cpu_seconds"
+        assert s[f'{cpu}_count{{command="cli sub"}}'] == 3
+
+    def test_user_counters(self, prom):
+        runner = CliRunner()
+        runner.invoke(cli, ["sub", "--rows", "10"])
+        runner.invoke(cli, ["sub", "--rows", "5"])
+
+        s = samples(prom)
+        assert s['cli_rows_total{command="cli sub"}'] == 15
+        assert s['cli_group_calls_total{command="cli sub"}'] == 2
+
+    def test_metrics_file_param(self, tmp_path):
+        path = tmp_path / "param.prom"
+
+        @click.command()
+        @click_common_opts("1.0.0", metrics_file=str(path))
+        def single(ctx, debug):
+            pass
+
+        assert CliRunner().invoke(single, []).exit_code == 0
+        s = samples(path)
+        key = 'cli_command_invocations_total{command="single",status="0"}'
+        assert s[key] == 1
+
+    def test_disabled(self, tmp_path, monkeypatch):
+        monkeypatch.delenv(METRICS_ENV, raising=False)
+        monkeypatch.chdir(tmp_path)
+        assert CliRunner().invoke(cli, ["sub", "--rows", "1"]).exit_code == 0
+        assert list(tmp_path.iterdir()) == []
+
+    def test_write_error(self, tmp_path, monkeypatch):
+        """書き込めなくても、コマンドは失敗しない。"""
+        monkeypatch.setenv(METRICS_ENV, str(tmp_path / "no" / "cli.prom"))
+        result = CliRunner().invoke(cli, ["sub"])
+        assert result.exit_code == 0
+        assert "metrics:" in result.stderr
+
+    def test_bad_counter_name(self):
+        with pytest.raises(ValueError):
+            command_metrics(click.Context(cli)).inc("bad-name")
+        with pytest.raises(ValueError):
+            command_metrics(click.Context(cli)).inc("ok", -1)
+
+
+def _record_many(path: str, n: int) -> None:
+    for _ in range(n):
+        record(path, 'cli "quoted"', 0, 0.01, 0.001, {"rows": 1})
+
+
+class TestRecord:
+    """`record()` のテスト。"""
+
+    def test_concurrent(self, tmp_path):
+        path = str(tmp_path / "cli.prom")
+        ctx = multiprocessing.get_context("fork")
+        procs = [
+            ctx.Process(target=_record_many, args=(path, 25))
+            for _ in range(4)
+        ]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+            assert p.exitcode == 0
+
+        s = samples(tmp_path / "cli.prom")
+        cmd = r'command="cli \"quoted\""'
+        assert s[f'cli_command_invocations_total{{{cmd},status="0"}}'] == 100
+        assert s[f"cli_rows_total{{{cmd}}}"] == 100
+
+        # 一時ファイルは残らない
+        names = sorted(p.name for p in tmp_path.iterdir())
+        assert names == ["cli.prom", "cli.prom.json", "cli.prom.lock"]
+        state = json.loads((tmp_path / "cli.prom.json").read_text())
+        assert state["wall"]['cli "quoted"']["count"] == 100
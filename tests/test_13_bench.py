@@ -0,0 +1,107 @@
+# tests/test_13_bench.py
+#
+# ベンチマークスイート (benchmarks/run.py) の比較処理のテスト
+#
+import importlib.util
+import json
+import os
+
+import pytest
+from click.testing import CliRunner
+
+RUN_PY = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "benchmarks", "run.py"
+)
+
+
+@pytest.fixture(scope="module")
+def bench():
+    spec = importlib.util.spec_from_file_location("bench_run", RUN_PY)
+    assert spec is not None and spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+BASELINE = {"a": 1.0, "b": 0.002, "c": 1e-6}
+
+
+class TestCompare:
+    """`compare()` のテスト。"""
+
+    def test_no_regression(self, bench):
+        current = {"a": 1.2, "b": 0.001, "c": 1e-6}
+        assert bench.compare(BASELINE, current, threshold=25) == []
+
+    def test_regression(self, bench):
+        current = {"a": 1.3, "b": 0.003, "c": 1.1e-6}
+        assert bench.compare(BASELINE, current, threshold=25) == ["a", "b"]
+        assert bench.compare(BASELINE, current, threshold=5) == [
+            "a",
+            "b",
+            "c",
+        ]
+
+    def test_new_metric(self, bench, capsys):
+        assert bench.compare(BASELINE, {"new": 10.0}) == []
+        assert "(new)" in capsys.readouterr().out
+
+    def test_missing_metric(self, bench, capsys):
+        """ベースラインにあって、今回の結果にない項目も表示する。"""
+        assert bench.compare(BASELINE, {"a": 1.0}) == []
+        out = capsys.readouterr().out
+        assert [line.split()[0] for line in out.splitlines()] == [
+            "a",
+            "b",
+            "c",
+        ]
+        assert out.count("(missing)") == 2
+
+    def test_baseline_file(self, bench, tmp_path):
+        path = str(tmp_path / "baseline.json")
+        bench.save_baseline(path, BASELINE)
+        assert bench.load_baseline(path) == BASELINE
+        with open(path) as f:
+            assert "python" in json.load(f)
+
+    def test_repo_baseline(self, bench):
+        """リポジトリのベースラインには、すべての項目がある。"""
+        names = set(bench.load_baseline(bench.BASELINE))
+        assert "import pyclickutils" in names
+        assert "get_logger" in names
+        assert "errmsg" in names
+        assert any(n.startswith("samples/") for n in names)
+
+
+class TestMain:
+    """`--compare` の終了コードのテスト。"""
+
+    @pytest.mark.parametrize(
+        "current, threshold, code",
+        [
+            ({"a": 1.1}, 25, 0),
+            ({"a": 1.5}, 25, 1),
+            ({"a": 1.5}, 60, 0),
+        ],
+    )
+    def test_compare(
+        self, bench, tmp_path, monkeypatch, current, threshold, code
+    ):
+        path = str(tmp_path / "baseline.json")
+        bench.save_baseline(path, BASELINE)
+        monkeypatch.setattr(bench, "run_all", lambda quick: current)
+
+        result = CliRunner().invoke(
+            bench.main,
+            ["--compare", "--baseline", path, "--threshold", str(threshold)],
+        )
+        assert result.exit_code == code
+
+    def test_save(self, bench, tmp_path, monkeypatch):
+        path = str(tmp_path / "baseline.json")
+        monkeypatch.setattr(bench, "run_all", lambda quick: {"x": 0.5})
+        result = CliRunner().invoke(
+            bench.main, ["--save", "--baseline", path]
+        )
+        assert result.exit_code == 0
+        assert bench.load_baseline(path) == {"x": 0.5}
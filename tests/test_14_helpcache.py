@@ -0,0 +1,219 @@
+# tests/test_14_helpcache.py
+#
+# ヘルプのキャッシュのテスト
+#
+import os
+import subprocess
+import sys
+
+import click
+import pytest
+from click.testing import CliRunner
+
+from pyclickutils import click_common_opts
+from pyclickutils.__main__ import cli as main_cli
+
+
+class CountingGroup(click.Group):
+    """ヘルプを描画した回数を数えるグループ。"""
+
+    renders = 0
+
+    def format_help(self, ctx, formatter):
+        type(self).renders += 1
+        super().format_help(ctx, formatter)
+
+
+def make_cli(version="1.0.0", help_cache=False):
+    CountingGroup.renders = 0
+
+    @click.group(cls=CountingGroup)
+    @click_common_opts(version, help_cache=help_cache)
+    def cli(ctx, debug):
+        """Counting group."""
+
+    @cli.command()
+    @click_common_opts(version)
+    def sub(ctx, debug):
+        """Subcommand."""
+
+    return cli
+
+
+@pytest.fixture(autouse=True)
+def cache_home(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    return tmp_path
+
+
+class TestHelpCache:
+    def test_memory(self):
+        """2回目は描画しない。"""
+        cli = make_cli()
+        runner = CliRunner()
+        first = runner.invoke(cli, ["--help"])
+        second = runner.invoke(cli, ["-h"])
+        assert first.exit_code == second.exit_code == 0
+        assert "Counting group." in first.output
+        assert second.output == first.output
+        assert CountingGroup.renders == 1
+
+    def test_width(self):
+        """端末の幅が変わると、描画し直す。"""
+        cli = make_cli()
+        runner = CliRunner()
+        runner.invoke(cli, ["--help"], terminal_width=80)
+        runner.invoke(cli, ["--help"], terminal_width=40)
+        assert CountingGroup.renders == 2
+
+    def test_subcommand(self):
+        """サブコマンドのヘルプは、別にキャッシュする。"""
+        cli = make_cli()
+        result = CliRunner().invoke(cli, ["sub", "--help"])
+        assert result.exit_code == 0
+        assert "Subcommand." in result.output
+        assert "Counting group." not in result.output
+
+    def test_added_command(self):
+        """サブコマンドを追加すると、描画し直す。"""
+        cli = make_cli()
+        runner = CliRunner()
+        runner.invoke(cli, ["--help"])
+        cli.add_command(click.Command("added", help="Added."))
+        result = runner.invoke(cli, ["--help"])
+        assert "Added." in result.output
+        assert CountingGroup.renders == 2
+
+    def test_no_disk_by_default(self, cache_home):
+        CliRunner().invoke(make_cli(), ["--help"])
+        assert not (cache_home / "pyclickutils").exists()
+
+    def test_disk(self, cache_home):
+        """ディスクのキャッシュは、別のプロセス (新しいコマンド) でも使う。"""
+        runner = CliRunner()
+        first = runner.invoke(make_cli(help_cache=True), ["--help"])
+        assert CountingGroup.renders == 1
+        files = os.listdir(cache_home / "pyclickutils" / "help")
+        assert len(files) == 1
+
+        second = runner.invoke(make_cli(help_cache=True), ["--help"])
+        assert second.output == first.output
+        assert CountingGroup.renders == 0
+
+    def test_disk_version(self, cache_home):
+        """バージョンが変わると、キャッシュを使わない。"""
+        runner = CliRunner()
+        runner.invoke(make_cli("1.0.0", help_cache=True), ["--help"])
+        runner.invoke(make_cli("1.0.1", help_cache=True), ["--help"])
+        assert CountingGroup.renders == 1
+        files = os.listdir(cache_home / "pyclickutils" / "help")
+        assert len(files) == 2
+
+
+TOOL_CODE = '''
+import click
+
+from pyclickutils import click_common_opts
+
+
+@click.command()
+@click_common_opts("1.0.0", help_cache=True)
+def cli(ctx, debug):
+    """{doc}"""
+
+
+cli()
+'''
+
+
+GROUP_CODE = '''
+import click
+
+from pyclickutils import click_common_opts
+from subs import sub
+
+
+@click.group()
+@click_common_opts("1.0.0", help_cache=True)
+def cli(ctx, debug):
+    """Group."""
+
+
+cli.add_command(sub)
+cli()
+'''
+
+SUB_CODE = '''
+import click
+
+
+@click.command()
+def sub():
+    """{doc}"""
+'''
+
+
+class TestDiskKey:
+    """同じ名前、同じバージョンの別のスクリプト。"""
+
+    def run_help(self, path, cache_home):
+        env = dict(os.environ, XDG_CACHE_HOME=str(cache_home))
+        result = subprocess.run(
+            [sys.executable, str(path), "--help"],
+            capture_output=True,
+            text=True,
+            env=env,
+        )
+        assert result.returncode == 0, result.stderr
+        return result.stdout
+
+    def write_tool(self, path, doc):
+        path.parent.mkdir(exist_ok=True)
+        path.write_text(TOOL_CODE.format(doc=doc))
+
+    def test_other_directory(self, tmp_path, cache_home):
+        tool_a = tmp_path / "a" / "tool.py"
+        tool_b = tmp_path / "b" / "tool.py"
+        self.write_tool(tool_a, "Tool a.")
+        self.write_tool(tool_b, "Tool b.")
+
+        assert "Tool a." in self.run_help(tool_a, cache_home)
+        assert "Tool b." in self.run_help(tool_b, cache_home)
+        files = os.listdir(cache_home / "pyclickutils" / "help")
+        assert len(files) == 2
+
+    def test_edited(self, tmp_path, cache_home):
+        """スクリプトを編集すると、描画し直す。"""
+        tool = tmp_path / "a" / "tool.py"
+        self.write_tool(tool, "Old help.")
+        assert "Old help." in self.run_help(tool, cache_home)
+
+        self.write_tool(tool, "New help.")
+        st = os.stat(tool)
+        os.utime(tool, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        assert "New help." in self.run_help(tool, cache_home)
+
+    def test_edited_subcommand(self, tmp_path, cache_home):
+        """別のモジュールのサブコマンドを編集すると、描画し直す。"""
+        tool = tmp_path / "tool.py"
+        subs = tmp_path / "subs.py"
+        tool.write_text(GROUP_CODE)
+        subs.write_text(SUB_CODE.format(doc="Old sub."))
+        assert "Old sub." in self.run_help(tool, cache_home)
+
+        subs.write_text(SUB_CODE.format(doc="New sub."))
+        st = os.stat(subs)
+        os.utime(subs, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        assert "New sub." in self.run_help(tool, cache_home)
+
+
+class TestMain:
+    @pytest.mark.parametrize("args", [[], ["sub2"]])
+    def test_no_subcommand(self, args):
+        """サブコマンドなしでは、ヘルプを表示する。"""
+        runner = CliRunner()
+        first = runner.invoke(main_cli, args)
+        second = runner.invoke(main_cli, args)
+        assert first.exit_code == 0
+        assert "Commands:" in first.output
+        assert second.output == first.output
@@ -0,0 +1,158 @@
+# tests/test_15_completion.py
+#
+# シェル補完のインデックスのテスト
+#
+import sys
+
+import pytest
+
+from pyclickutils import completion
+from pyclickutils.completion import (
+    build_index,
+    complete,
+    completion_main,
+    load_index,
+)
+
+TOOL_CODE = '''
+import click
+
+from pyclickutils import click_common_opts
+
+
+@click.group()
+@click_common_opts("1.0.0")
+def cli(ctx, debug):
+    """Tool."""
+
+
+@cli.command()
+@click.option("--fmt", type=click.Choice(["json", "text"]))
+@click.option("--tag", multiple=True)
+@click.argument("src", type=click.Path())
+@click_common_opts("1.0.0")
+def export(ctx, fmt, tag, src, debug):
+    """Export data."""
+    print("export called")
+
+
+@cli.group()
+@click_common_opts("1.0.0")
+def admin(ctx, debug):
+    """Admin commands."""
+
+
+@admin.command()
+@click.argument("mode", type=click.Choice(["on", "off"]))
+def maint(mode):
+    """Maintenance mode."""
+'''
+
+
+@pytest.fixture
+def tool(tmp_path, monkeypatch):
+    """一時的な CLI のモジュール。"""
+    name = f"comp_tool_{tmp_path.name}"
+    (tmp_path / f"{name}.py").write_text(TOOL_CODE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    yield name
+    sys.modules.pop(name, None)
+
+
+@pytest.fixture
+def index(tool):
+    from pyclickutils.lazygroup import import_command
+
+    return build_index(import_command(f"{tool}:cli"), "tool", "1.0.0")
+
+
+def values(index, args, incomplete):
+    return [item.value for item in complete(index, args, incomplete)]
+
+
+class TestComplete:
+    @pytest.mark.parametrize(
+        "args, incomplete, expected",
+        [
+            ([], "", ["admin", "export"]),
+            ([], "e", ["export"]),
+            ([], "-", ["--version", "-V", "--debug", "-d", "--help", "-h"]),
+            (["-d"], "a", ["admin"]),
+            (["admin"], "", ["maint"]),
+            (["admin", "maint"], "o", ["on", "off"]),
+            (["admin", "maint"], "of", ["off"]),
+            (["export"], "--f", ["--fmt"]),
+            (["export", "--fmt"], "", ["json", "text"]),
+            (["export"], "--fmt=j", ["json"]),
+            (["export", "--fmt", "json"], "--f", []),
+            (["export", "--tag", "a"], "--t", ["--tag"]),
+            (["export"], "sr", ["sr"]),
+            (["export", "a.txt"], "", []),
+        ],
+    )
+    def test_complete(self, index, args, incomplete, expected):
+        assert values(index, args, incomplete) == expected
+
+    def test_types(self, index):
+        items = complete(index, ["export"], "")
+        assert [(i.type, i.value) for i in items] == [("file", "")]
+
+        items = complete(index, [], "ex")
+        assert items[0].help == "Export data."
+
+
+class TestCompletionMain:
+    @pytest.fixture
+    def version(self, monkeypatch):
+        versions = {"value": "1.0.0"}
+        monkeypatch.setattr(
+            completion, "_dist_version", lambda dist: versions["value"]
+        )
+        return versions
+
+    def complete(self, tool, monkeypatch, capsys, shell, words, cword):
+        monkeypatch.setenv("_TOOL_COMPLETE", f"{shell}_complete")
+        monkeypatch.setenv("COMP_WORDS", words)
+        monkeypatch.setenv("COMP_CWORD", cword)
+        main = completion_main(f"{tool}:cli", prog_name="tool")
+        with pytest.raises(SystemExit) as e:
+            main()
+        assert e.value.code == 0
+        return capsys.readouterr().out
+
+    def test_without_import(self, tool, version, monkeypatch, capsys):
+        """2回目からは、コマンドを import しない。"""
+        args = (monkeypatch, capsys, "bash", "tool ex", "1")
+        assert self.complete(tool, *args) == "plain,export\n"
+        assert tool in sys.modules
+        saved = load_index("tool")
+        assert saved is not None
+        assert saved["version"] == "1.0.0"
+
+        sys.modules.pop(tool)
+        assert self.complete(tool, *args) == "plain,export\n"
+        assert tool not in sys.modules
+
+        # バージョンが変わると、作り直す
+        version["value"] = "1.1.0"
+        assert self.complete(tool, *args) == "plain,export\n"
+        assert tool in sys.modules
+        saved = load_index("tool")
+        assert saved is not None
+        assert saved["version"] == "1.1.0"
+
+    def test_zsh(self, tool, version, monkeypatch, capsys):
+        out = self.complete(
+            tool, monkeypatch, capsys, "zsh", "tool admin m", "2"
+        )
+        assert out == "plain\nmaint\nMaintenance mode.\n"
+
+    def test_run(self, tool, monkeypatch, capsys):
+        """補完以外では、コマンドを実行する。"""
+        monkeypatch.delenv("_TOOL_COMPLETE", raising=False)
+        monkeypatch.setattr(sys, "argv", ["tool", "export", "a.txt"])
+        with pytest.raises(SystemExit) as e:
+            completion_main(f"{tool}:cli", prog_name="tool")()
+        assert e.value.code == 0
+        assert "export called" in capsys.readouterr().out
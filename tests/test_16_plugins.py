@@ -0,0 +1,133 @@
+# tests/test_16_plugins.py
+#
+# entry points によるプラグインのテスト
+#
+import os
+import sys
+
+import click
+import pytest
+from click.testing import CliRunner
+
+from pyclickutils import LazyGroup, click_common_opts, plugins
+from pyclickutils.plugins import cache_path, discover_plugins
+
+PLUGIN_CODE = '''
+import click
+
+from pyclickutils import click_common_opts
+
+
+@click.command()
+@click_common_opts("0.1.0")
+def hello(ctx, debug):
+    """Hello from plugin."""
+    print("hello called")
+'''
+
+GROUP = "pyclickutils_test.commands"
+
+
+@pytest.fixture
+def site(tmp_path, monkeypatch):
+    """プラグインのディストリビューションをインストールしたディレクトリ。"""
+    site = tmp_path / "site"
+    module = f"plugin_{tmp_path.name}"
+    dist_info = site / "pyclickutils_test_plugin-0.1.0.dist-info"
+    dist_info.mkdir(parents=True)
+    (site / f"{module}.py").write_text(PLUGIN_CODE)
+    (dist_info / "METADATA").write_text(
+        "Metadata-Version: 2.1\nName: pyclickutils-test-plugin\n"
+        "Version: 0.1.0\n"
+    )
+    (dist_info / "entry_points.txt").write_text(
+        f"[{GROUP}]\nhello = {module}:hello\nbuiltin = {module}:hello\n"
+    )
+    monkeypatch.syspath_prepend(str(site))
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.setattr(plugins, "_discovered", {})
+    yield site, module
+    sys.modules.pop(module, None)
+
+
+def make_cli():
+    @click.group(cls=LazyGroup, plugin_group=GROUP)
+    @click_common_opts("1.0.0")
+    def cli(ctx, debug):
+        pass
+
+    @cli.command()
+    def builtin():
+        """Builtin subcommand."""
+        print("builtin called")
+
+    return cli
+
+
+class TestDiscover:
+    def test_discover(self, site):
+        _path, module = site
+        assert discover_plugins(GROUP) == {
+            "hello": f"{module}:hello",
+            "builtin": f"{module}:hello",
+        }
+        assert module not in sys.modules
+        assert os.path.exists(cache_path(GROUP))
+
+    def test_cached(self, site, monkeypatch):
+        """インストールされたものが変わらなければ、調べ直さない。"""
+        expected = discover_plugins(GROUP)
+
+        def _fail(group):
+            raise AssertionError("scanned")
+
+        monkeypatch.setattr(plugins, "_discovered", {})
+        monkeypatch.setattr(plugins, "_scan", _fail)
+        assert discover_plugins(GROUP) == expected
+
+    def test_rebuild(self, site, monkeypatch):
+        """ディストリビューションが変わると、作り直す。"""
+        path, module = site
+        discover_plugins(GROUP)
+
+        dist_info = path / "pyclickutils_test_plugin-0.1.0.dist-info"
+        (dist_info / "entry_points.txt").write_text(
+            f"[{GROUP}]\nbye = {module}:hello\n"
+        )
+        st = os.stat(dist_info)
+        os.utime(dist_info, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+        monkeypatch.setattr(plugins, "_discovered", {})
+        assert discover_plugins(GROUP) == {"bye": f"{module}:hello"}
+
+
+class TestLazyGroupPlugins:
+    def test_help(self, site):
+        """`--help` には表示されるが、import しない。"""
+        _path, module = site
+        result = CliRunner().invoke(make_cli(), ["--help"])
+        assert result.exit_code == 0
+        assert "hello" in result.output
+        assert module not in sys.modules
+
+    def test_invoke(self, site):
+        _path, module = site
+        result = CliRunner().invoke(make_cli(), ["hello"])
+        assert result.exit_code == 0
+        assert "hello called" in result.output
+        assert module in sys.modules
+
+    def test_builtin_wins(self, site):
+        """同じ名前では、グループ側のサブコマンドが優先される。"""
+        result = CliRunner().invoke(make_cli(), ["builtin"])
+        assert "builtin called" in result.output
+
+    def test_builtin_without_discovery(self, site, monkeypatch):
+        """組み込みのサブコマンドの実行では、プラグインを調べない。"""
+
+        def _fail(group):
+            raise AssertionError("discovered")
+
+        monkeypatch.setattr(plugins, "discover_plugins", _fail)
+        result = CliRunner().invoke(make_cli(), ["builtin"])
+        assert result.exit_code == 0
@@ -0,0 +1,119 @@
+# tests/test_17_version.py
+#
+# バージョンの遅延評価のテスト
+#
+import click
+import pytest
+from click.testing import CliRunner
+
+from pyclickutils import click_common_opts
+from pyclickutils import pyclickutils as core
+from pyclickutils.pyclickutils import command_version
+
+
+def make_cli(**versions):
+    """グループとサブコマンドに、別のバージョンを指定する。"""
+
+    @click.group()
+    @click_common_opts(versions.get("cli", ""), dist=versions.get("dist"))
+    def cli(ctx, debug):
+        pass
+
+    @cli.command()
+    @click_common_opts(versions.get("sub", ""))
+    def sub(ctx, debug):
+        pass
+
+    return cli
+
+
+class Counter:
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+class TestVersion:
+    def test_string(self):
+        result = CliRunner().invoke(make_cli(cli="1.2.3"), ["-V"])
+        assert result.exit_code == 0
+        assert result.output == "cli 1.2.3\n"
+
+    def test_unknown(self):
+        result = CliRunner().invoke(make_cli(), ["--version"])
+        assert result.output == "cli _._._\n"
+
+    def test_callable(self):
+        """関数は `--version` の時に一度だけ呼ぶ。"""
+        counter = Counter("2.0.0")
+        cli = make_cli(cli=counter)
+        runner = CliRunner()
+
+        result = runner.invoke(cli, ["sub"])
+        assert result.exit_code == 0
+        assert counter.calls == 0
+
+        for _ in range(2):
+            result = runner.invoke(cli, ["--version"])
+            assert result.output == "cli 2.0.0\n"
+        assert counter.calls == 1
+
+    def test_subcommand(self):
+        """サブコマンドごとのバージョン (sample3-subs.py)。"""
+        sub_version = Counter("3.3.3")
+        cli = make_cli(cli="1.1.1", sub=sub_version)
+        result = CliRunner().invoke(cli, ["sub", "-V"])
+        assert result.output == "cli 3.3.3\n"
+        assert command_version(cli) == "1.1.1"
+        assert command_version(cli.commands["sub"]) == "3.3.3"
+        assert sub_version.calls == 1
+
+    def test_dist(self, monkeypatch):
+        """メタデータは `--version` の時だけ読む。"""
+        calls = []
+
+        def _version(dist):
+            calls.append(dist)
+            return "9.9.9"
+
+        monkeypatch.setattr(core, "_dist_version", _version)
+        cli = make_cli(dist="mytool")
+        runner = CliRunner()
+
+        runner.invoke(cli, ["sub"])
+        assert calls == []
+
+        result = runner.invoke(cli, ["--version"])
+        assert result.output == "cli 9.9.9\n"
+        assert calls == ["mytool"]
+
+    def test_dist_not_found(self):
+        from importlib.metadata import PackageNotFoundError
+
+        cli = make_cli(dist="no-such-distribution-xyz")
+        result = CliRunner().invoke(cli, ["--version"])
+        assert isinstance(result.exception, PackageNotFoundError)
+
+    @pytest.mark.parametrize("args", [["sub"], ["--help"]])
+    def test_main_no_metadata(self, args):
+        """`__main__` の通常の実行では、メタデータを読まない。"""
+        import subprocess
+        import sys
+
+        code = (
+            "import sys\n"
+            "from pyclickutils.__main__ import cli\n"
+            "try:\n"
+            f"    cli({args!r})\n"
+            "except SystemExit:\n"
+            "    pass\n"
+            "print('importlib.metadata' in sys.modules)\n"
+        )
+        proc = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True
+        )
+        assert proc.stdout.splitlines()[-1] == "False"
@@ -0,0 +1,203 @@
+# tests/test_18_flightrec.py
+#
+# フライトレコーダーのテスト
+#
+import io
+import signal
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from pyclickutils import (
+    disable_queue_logging,
+    enable_queue_logging,
+    get_logger,
+)
+from pyclickutils.flightrec import FOOTER, FlightRecorder
+
+
+def recorder_of(log):
+    return [h for h in log.handlers if isinstance(h, FlightRecorder)][0]
+
+
+class Lazy:
+    """`str()` された回数を数える。"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __str__(self):
+        self.calls += 1
+        return "lazy"
+
+
+class TestFlightRecorder:
+    def test_record_without_output(self, capsys):
+        """DEBUG は出力せず、保持するだけ。"""
+        log = get_logger("rec", False, flight_recorder=3)
+        for i in range(5):
+            log.debug("step %d", i)
+        log.info("info")
+
+        assert capsys.readouterr().err.count("\n") == 1
+        recorder = recorder_of(log)
+        assert [r.getMessage() for r in recorder.buffer] == [
+            "step 3",
+            "step 4",
+            "info",
+        ]
+
+    def test_not_formatted(self, capsys):
+        """ダンプするまで、フォーマットしない。"""
+        log = get_logger("rec_lazy", False, flight_recorder=10)
+        arg = Lazy()
+        log.debug("value=%s", arg)
+        assert arg.calls == 0
+
+        out = io.StringIO()
+        recorder_of(log).dump("test", out)
+        assert arg.calls == 1
+        assert "value=lazy" in out.getvalue()
+        assert "flight recorder: test (last 1 records)" in out.getvalue()
+        assert out.getvalue().endswith(FOOTER + "\n")
+
+        # ダンプした後は空になる
+        out = io.StringIO()
+        recorder_of(log).dump("again", out)
+        assert out.getvalue() == ""
+
+    def test_debug_true(self, capsys):
+        """debug=True なら、通常どおり出力もする。"""
+        log = get_logger("rec_debug", True, flight_recorder=10)
+        log.debug("visible")
+        assert "visible" in capsys.readouterr().err
+        assert len(recorder_of(log).buffer) == 1
+
+    def test_reconfigure(self, capsys):
+        """オプションなしで取得し直すと、レコーダーを外す。"""
+        log = get_logger("rec_re", False, flight_recorder=10)
+        assert log.level == 10  # DEBUG
+        log = get_logger("rec_re", False)
+        assert not any(isinstance(h, FlightRecorder) for h in log.handlers)
+        log.debug("hidden")
+        assert capsys.readouterr().err == ""
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            get_logger("rec_invalid", flight_recorder=0)
+
+    @pytest.mark.parametrize("enable_first", [True, False])
+    def test_queue_mode(self, capsys, enable_first):
+        """キューモードでも、レコーダーは同期のまま保持する。"""
+        if enable_first:
+            enable_queue_logging()
+        log = get_logger(
+            f"rec_queue_{enable_first}", False, flight_recorder=10
+        )
+        if not enable_first:
+            enable_queue_logging()
+        try:
+            log.debug("hidden")
+            log.info("shown")
+        finally:
+            disable_queue_logging()
+
+        err = capsys.readouterr().err
+        assert "Logging error" not in err
+        assert "shown" in err
+        assert "hidden" not in err
+        assert [r.getMessage() for r in recorder_of(log).buffer] == [
+            "hidden",
+            "shown",
+        ]
+
+
+SCRIPT = """
+import os, signal, sys, time
+from pyclickutils import get_logger
+
+log = get_logger("main", False, flight_recorder=100)
+for i in range(3):
+    log.debug("working on %d", i)
+log.info("running")
+{action}
+print("continued", flush=True)
+"""
+
+
+def run_script(action):
+    code = textwrap.dedent(SCRIPT).format(action=action)
+    return subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True
+    )
+
+
+class TestDump:
+    def test_normal_exit(self):
+        """正常終了では、何も出力しない。"""
+        proc = run_script("")
+        assert proc.returncode == 0
+        assert "flight recorder" not in proc.stderr
+        assert "working on" not in proc.stderr
+
+    def test_uncaught_exception(self):
+        proc = run_script("raise RuntimeError('boom')")
+        assert proc.returncode == 1
+        assert "flight recorder: uncaught RuntimeError" in proc.stderr
+        assert "working on 2" in proc.stderr
+        # その後に、通常の traceback
+        assert proc.stderr.rstrip().endswith("RuntimeError: boom")
+
+    def test_thread_exception(self):
+        proc = run_script(
+            "import threading\n"
+            "t = threading.Thread(target=lambda: 1 / 0, name='worker')\n"
+            "t.start(); t.join()"
+        )
+        assert "uncaught ZeroDivisionError in thread worker" in proc.stderr
+        assert "continued" in proc.stdout
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="POSIX signals")
+    def test_sigterm(self):
+        """SIGTERM: 出力してから、終了する。"""
+        proc = run_script("os.kill(os.getpid(), signal.SIGTERM)")
+        assert proc.returncode == -signal.SIGTERM
+        assert "flight recorder: signal SIGTERM" in proc.stderr
+        assert "working on 0" in proc.stderr
+        assert "continued" not in proc.stdout
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="POSIX signals")
+    def test_first_recorder_in_thread(self):
+        """最初のレコーダーをスレッドで作っても、後でシグナルを設定する。"""
+        code = textwrap.dedent(
+            """
+            import os, signal, threading
+            from pyclickutils import get_logger
+
+            t = threading.Thread(
+                target=lambda: get_logger("t", False, flight_recorder=10)
+            )
+            t.start(); t.join()
+            log = get_logger("main", False, flight_recorder=10)
+            log.debug("after thread")
+            os.kill(os.getpid(), signal.SIGUSR1)
+            print("continued", flush=True)
+            """
+        )
+        proc = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True
+        )
+        assert proc.returncode == 0
+        assert "flight recorder: signal SIGUSR1" in proc.stderr
+        assert "after thread" in proc.stderr
+        assert "continued" in proc.stdout
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="POSIX signals")
+    def test_sigusr1(self):
+        """SIGUSR1: 出力して、実行を続ける。"""
+        proc = run_script("os.kill(os.getpid(), signal.SIGUSR1)")
+        assert proc.returncode == 0
+        assert "flight recorder: signal SIGUSR1" in proc.stderr
+        assert "continued" in proc.stdout
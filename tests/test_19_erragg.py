@@ -0,0 +1,180 @@
+# tests/test_19_erragg.py
+#
+# 例外の集計のテスト
+#
+import io
+import threading
+
+import click
+import pytest
+from click.testing import CliRunner
+
+from pyclickutils import ErrorAggregator, click_common_opts, error_aggregator
+from pyclickutils.erragg import fingerprint
+
+
+class MyError(Exception):
+    pass
+
+
+def parse(value):
+    if not value.isdigit():
+        raise ValueError(f"bad value: {value}")
+    return int(value)
+
+
+def fail_elsewhere():
+    raise ValueError("other site")
+
+
+class TestFingerprint:
+    def test_same_site(self):
+        """型と raise した場所が同じなら、メッセージが違っても同じ。"""
+        prints = set()
+        for value in ("a", "b"):
+            try:
+                parse(value)
+            except ValueError as e:
+                prints.add(fingerprint(e))
+        assert len(prints) == 1
+        name, filename, func, _lineno = prints.pop()
+        assert name == "builtins.ValueError"
+        assert filename.endswith("test_19_erragg.py")
+        assert func == "parse"
+
+    def test_different_site(self):
+        prints = set()
+        for func in (lambda: parse("x"), fail_elsewhere):
+            try:
+                func()
+            except ValueError as e:
+                prints.add(fingerprint(e))
+        assert len(prints) == 2
+
+    def test_not_raised(self):
+        assert fingerprint(MyError("x"))[1:] == (None, None, None)
+
+
+class TestErrorAggregator:
+    def test_count(self):
+        agg = ErrorAggregator()
+        for i in range(1000):
+            with agg.catch():
+                parse("x" if i % 10 else str(i))
+                if i % 10 == 0:
+                    raise MyError("mine")
+
+        assert agg.total == 1000
+        assert len(agg.entries) == 2
+        lines = agg.summary()
+        assert lines[0] == "errors: 1000 in 2 kinds"
+        assert lines[1].startswith("  900 x ValueError: bad value: x  (")
+        assert "test_19_erragg.py:" in lines[1]
+        assert "in parse)" in lines[1]
+        assert lines[2].startswith(
+            f"  100 x {MyError.__module__}.MyError: mine"
+        )
+
+    def test_one_traceback(self):
+        """traceback は、分類ごとに一つだけ保持する。"""
+        agg = ErrorAggregator()
+        for value in ("a", "b", "c"):
+            with agg.catch(ValueError):
+                parse(value)
+
+        tracebacks = agg.tracebacks()
+        assert len(tracebacks) == 1
+        assert "Traceback (most recent call last)" in tracebacks[0]
+        assert "ValueError: bad value: a" in tracebacks[0]
+
+    def test_catch_types(self):
+        """指定しない型の例外は、そのまま伝わる。"""
+        agg = ErrorAggregator()
+        with pytest.raises(KeyError):
+            with agg.catch(ValueError):
+                raise KeyError("k")
+        assert agg.total == 0
+
+    def test_bounded(self):
+        """分類の数は上限まで。"""
+        agg = ErrorAggregator(max_fingerprints=2)
+        sites = [
+            lambda: parse("x"),
+            fail_elsewhere,
+            lambda: {}["k"],
+            lambda: [][1],
+        ]
+        for func in sites * 3:
+            with agg.catch():
+                func()
+
+        assert len(agg.entries) == 2
+        assert agg.total == 12
+        assert agg.untracked == 6
+        assert agg.summary()[-1] == "  6 x (other kinds, table is full)"
+
+    def test_threads(self):
+        """複数のスレッドから数えても、数と上限が正しい。"""
+        agg = ErrorAggregator(max_fingerprints=3)
+        sites = [
+            lambda: parse("x"),
+            fail_elsewhere,
+            lambda: {}["k"],
+            lambda: [][1],
+            lambda: 1 / 0,
+        ]
+
+        def run():
+            for _ in range(200):
+                for func in sites:
+                    with agg.catch():
+                        func()
+
+        threads = [threading.Thread(target=run) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert agg.total == 8 * 200 * len(sites)
+        assert len(agg.entries) == 3
+        counted = sum(e.count for e in agg.entries.values())
+        assert counted + agg.untracked == agg.total
+
+    def test_report(self):
+        agg = ErrorAggregator()
+        out = io.StringIO()
+        agg.report(out)
+        assert out.getvalue() == ""
+
+        with agg.catch():
+            parse("x")
+        agg.report(out, tracebacks=True)
+        text = out.getvalue()
+        assert text.index("Traceback") < text.index("errors: 1 in 1 kinds")
+
+
+@click.command()
+@click.argument("values", nargs=-1)
+@click_common_opts("1.0.0")
+def load(ctx, values, debug):
+    agg = error_aggregator(ctx)
+    assert error_aggregator(ctx) is agg
+    total = 0
+    for value in values:
+        with agg.catch():
+            total += parse(value)
+    click.echo(f"total {total}")
+
+
+class TestClick:
+    def test_report_at_exit(self):
+        result = CliRunner().invoke(load, ["1", "x", "2", "y"])
+        assert result.exit_code == 0
+        assert result.stdout == "total 3\n"
+        assert "errors: 2 in 1 kinds" in result.stderr
+        assert "2 x ValueError: bad value: x" in result.stderr
+
+    def test_no_errors(self):
+        result = CliRunner().invoke(load, ["1"])
+        assert result.stderr == ""
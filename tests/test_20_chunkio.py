@@ -0,0 +1,141 @@
+# tests/test_20_chunkio.py
+#
+# チャンク単位の入力のテスト
+#
+import io
+from typing import BinaryIO, cast
+
+import click
+import pytest
+from click.testing import CliRunner
+
+from pyclickutils import ChunkedFile, ChunkReader, click_common_opts
+
+DATA = (
+    b"".join(b"line %d %s\r\n" % (i, b"x" * (i % 37)) for i in range(500))
+    + b"no newline at end"
+)
+LINES = DATA.split(b"\n")
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / "data.txt"
+    path.write_bytes(DATA)
+    return str(path)
+
+
+CHUNK_SIZES = [1, 7, 64, 1 << 20]
+
+
+class TestChunkReader:
+    @pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+    def test_mmap(self, data_file, chunk_size):
+        """通常のファイルは mmap する。"""
+        with ChunkReader(data_file, chunk_size) as reader:
+            assert reader.mmapped
+            chunks = list(reader.chunks())
+            assert all(isinstance(c, memoryview) for c in chunks)
+            assert all(c.nbytes <= chunk_size for c in chunks)
+            assert b"".join(chunks) == DATA
+            assert list(reader.lines()) == LINES
+
+    @pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+    def test_stream(self, chunk_size):
+        """ストリームは、バッファに読み込む。"""
+        reader = ChunkReader(io.BytesIO(DATA), chunk_size)
+        assert not reader.mmapped
+        assert b"".join(bytes(c) for c in reader.chunks()) == DATA
+
+        reader = ChunkReader(io.BytesIO(DATA), chunk_size)
+        assert list(reader.lines()) == LINES
+
+    def test_reuse_buffer(self):
+        """ストリームのチャンクは、同じバッファを使う。"""
+        reader = ChunkReader(io.BytesIO(DATA), 64)
+        buffers = {id(chunk.obj) for chunk in reader.chunks()}
+        assert len(buffers) == 1
+
+    def test_line_batches(self, data_file):
+        with ChunkReader(data_file, 256) as reader:
+            batches = list(reader.line_batches())
+        assert len(batches) > 1
+        assert [line for batch in batches for line in batch] == LINES
+
+    @pytest.mark.parametrize(
+        "data, expected",
+        [
+            (b"", []),
+            (b"\n", [b""]),
+            (b"a\n\nb\n", [b"a", b"", b"b"]),
+            (b"a" * 100 + b"\nb", [b"a" * 100, b"b"]),
+        ],
+    )
+    @pytest.mark.parametrize("mmap", [True, False])
+    def test_lines_edge(self, tmp_path, data, expected, mmap):
+        path = tmp_path / "edge.txt"
+        path.write_bytes(data)
+        with ChunkReader(str(path), 8, use_mmap=mmap) as reader:
+            assert list(reader.lines()) == expected
+
+    def test_long_line_short_reads(self):
+        """チャンクよりずっと長い行を、少しずつ返すストリームから読む。"""
+
+        class ShortReads(io.RawIOBase):
+            def __init__(self, data):
+                self.data = memoryview(data)
+                self.pos = 0
+
+            def readable(self):
+                return True
+
+            def readinto(self, b):
+                start = self.pos
+                end = min(start + 5, len(self.data))
+                n = end - start
+                b[:n] = self.data[start:end]
+                self.pos = end
+                return n
+
+        data = b"x" * 10000 + b"\nshort\n" + b"y" * 5000
+        stream = cast(BinaryIO, ShortReads(data))
+        reader = ChunkReader(stream, chunk_size=64)
+        assert list(reader.lines()) == [b"x" * 10000, b"short", b"y" * 5000]
+
+    def test_stdin(self, monkeypatch):
+        stdin = io.TextIOWrapper(io.BytesIO(DATA))
+        monkeypatch.setattr("sys.stdin", stdin)
+        reader = ChunkReader("-")
+        assert not reader.mmapped
+        assert list(reader.lines()) == LINES
+        reader.close()
+        assert not stdin.closed
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            ChunkReader(io.BytesIO(b""), chunk_size=0)
+
+
+@click.command()
+@click.argument("infile", type=ChunkedFile(chunk_size=128))
+@click_common_opts("1.0.0")
+def count(ctx, infile, debug):
+    n_lines = sum(len(batch) for batch in infile.line_batches())
+    click.echo(f"{n_lines} lines, mmap={infile.mmapped}")
+
+
+class TestChunkedFile:
+    def test_file(self, data_file):
+        result = CliRunner().invoke(count, [data_file])
+        assert result.exit_code == 0
+        assert result.output == f"{len(LINES)} lines, mmap=True\n"
+
+    def test_stdin(self):
+        result = CliRunner().invoke(count, ["-"], input=DATA)
+        assert result.exit_code == 0
+        assert result.output == f"{len(LINES)} lines, mmap=False\n"
+
+    def test_not_found(self, tmp_path):
+        result = CliRunner().invoke(count, [str(tmp_path / "no_such")])
+        assert result.exit_code == 2
+        assert "No such file or directory" in result.output